@@ -0,0 +1,3 @@
+"""
+Market data sources, downloaders and loaders
+"""
@@ -1,31 +1,74 @@
 import os
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional, List, Dict, Any, Union
 from datetime import datetime, timedelta
+from pathlib import Path
 import pandas as pd
-from databento import DBNStore, Dataset
-import yaml
-from dotenv import load_dotenv
 import logging
+from data.env import load_env
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# yfinance interval -> Databento interval
+_INTERVAL_MAP = {
+    '1m': '1min',
+    '2m': '2min',
+    '5m': '5min',
+    '15m': '15min',
+    '30m': '30min',
+    '60m': '1h',
+    '90m': '90min',
+    '1h': '1h',
+    '1d': '1d',
+    '5d': '5d',
+    '1wk': '1w',
+    '1mo': '1mo',
+    '3mo': '3mo'
+}
+
+# yfinance period -> lookback in days ('ytd' is computed from the current date)
+_PERIOD_DAYS = {
+    '1d': 1,
+    '5d': 5,
+    '1mo': 30,
+    '3mo': 90,
+    '6mo': 180,
+    '1y': 365,
+    '2y': 730,
+    '5y': 1825,
+    '10y': 3650
+}
 
 class DatabentoDownloader:
     """
     A class to download market data from Databento that can be used as a drop-in replacement for yfinance.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        cache_size: int = 32,
+        cache_dir: str = "data/cache",
+        max_workers: int = 8,
+        dtype_prices: str = "float32"
+    ):
+        load_env()
         self.api_key = os.getenv('DATABENTO_API_KEY')
         if not self.api_key:
             raise ValueError("DATABENTO_API_KEY not found in environment variables")
         
+        from databento import DBNStore, Dataset
         self.client = DBNStore(key=self.api_key)
-        self.cache = {}  # Simple in-memory cache
+        self.dataset = Dataset.GLBX_MDP3  # Use appropriate dataset for your subscription
+        self.cache = OrderedDict()  # Bounded in-memory LRU cache
+        self.cache_size = cache_size
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self.dtype_prices = dtype_prices  # Use 'float64' when full price precision is needed
     
     def download(
         self,
@@ -70,28 +113,10 @@ class DatabentoDownloader:
         # Handle period parameter to determine start and end dates
         if period and not (start and end):
             end = datetime.now()
-            if period == "1d":
-                start = end - timedelta(days=1)
-            elif period == "5d":
-                start = end - timedelta(days=5)
-            elif period == "1mo":
-                start = end - timedelta(days=30)
-            elif period == "3mo":
-                start = end - timedelta(days=90)
-            elif period == "6mo":
-                start = end - timedelta(days=180)
-            elif period == "1y":
-                start = end - timedelta(days=365)
-            elif period == "2y":
-                start = end - timedelta(days=730)
-            elif period == "5y":
-                start = end - timedelta(days=1825)
-            elif period == "10y":
-                start = end - timedelta(days=3650)
-            elif period == "ytd":
+            if period == "ytd":
                 start = datetime(end.year, 1, 1)
-            else:  # default to 1 month
-                start = end - timedelta(days=30)
+            else:  # unknown periods default to 1 month
+                start = end - timedelta(days=_PERIOD_DAYS.get(period, 30))
             
             start = start.strftime("%Y-%m-%d")
             end = end.strftime("%Y-%m-%d")
@@ -101,36 +126,56 @@ class DatabentoDownloader:
         
         # Check cache first
         cache_key = f"{','.join(tickers)}_{start}_{end}_{interval}"
-        if cache_key in self.cache:
+        cached = self._cache_get(cache_key)
+        if cached is not None:
             logger.info(f"Using cached data for {tickers}")
-            return self.cache[cache_key]
+            return cached
+        
+        # Fall back to the on-disk cache shared across processes
+        cache_path = self._get_cache_path(tickers, start, end, interval, group_by)
+        if cache_path.exists():
+            logger.info(f"Loading cached data from {cache_path}")
+            result_df = pd.read_parquet(cache_path, engine='pyarrow')
+            self._cache_put(cache_key, result_df)
+            return result_df
         
         logger.info(f"Downloading data for {tickers} from {start} to {end}")
         
-        # Create empty DataFrame to store results
-        result_df = pd.DataFrame()
+        # Collect per-ticker frames and concatenate once at the end
+        frames = []
         
         try:
+            # Fetch every ticker in a single request and split locally
+            raw_df = self._fetch_range(tickers, start, end)
+            ticker_frames = self._split_by_symbol(raw_df, tickers)
+            if ticker_frames is None:
+                # Response can't be attributed to tickers; fetch them individually instead
+                ticker_frames = self._fetch_concurrently(tickers, start, end)
+            
             # Process each ticker
             for ticker in tickers:
-                df = self._download_single_ticker(ticker, start, end, databento_interval)
+                df = self._format_ticker_frame(ticker_frames.get(ticker), databento_interval)
                 
                 if df is not None and not df.empty:
                     if group_by == "ticker":
                         # Add ticker as a column if grouping by ticker
                         df['Ticker'] = ticker
-                        result_df = pd.concat([result_df, df])
                     else:
                         # For column-wise, store each ticker as a separate column level
-                        df_columns = pd.MultiIndex.from_product([[ticker], df.columns])
-                        df.columns = df_columns
-                        if result_df.empty:
-                            result_df = df
-                        else:
-                            result_df = pd.concat([result_df, df], axis=1)
+                        df.columns = pd.MultiIndex.from_product([[ticker], df.columns])
+                    frames.append(df)
+            
+            if not frames:
+                result_df = pd.DataFrame()
+            elif group_by == "ticker":
+                result_df = pd.concat(frames, axis=0, copy=False)
+            else:
+                result_df = pd.concat(frames, axis=1, copy=False)
             
             # Cache the result
-            self.cache[cache_key] = result_df
+            self._cache_put(cache_key, result_df)
+            if not result_df.empty:
+                result_df.to_parquet(cache_path, engine='pyarrow', compression='zstd')
             
             return result_df
             
@@ -138,66 +183,110 @@ class DatabentoDownloader:
             logger.error(f"Error downloading data: {str(e)}")
             return pd.DataFrame()  # Return empty DataFrame on error
     
+    def _get_cache_path(self, tickers: List[str], start: str, end: str, interval: str, group_by: str) -> Path:
+        """Generate a cache file path from a hash of the query parameters."""
+        query = f"{','.join(tickers)}|{start}|{end}|{interval}|{group_by}|{self.dtype_prices}"
+        key = hashlib.sha256(query.encode()).hexdigest()
+        return self.cache_dir / f"{key}.parquet"
+    
+    def _cache_get(self, key: str) -> Optional[pd.DataFrame]:
+        """Return a cached result and mark it as most recently used."""
+        if key not in self.cache:
+            return None
+        self.cache.move_to_end(key)
+        return self.cache[key]
+    
+    def _cache_put(self, key: str, df: pd.DataFrame):
+        """Store a result, evicting the least recently used entries beyond cache_size."""
+        self.cache[key] = df
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+    
+    def _fetch_range(self, tickers: List[str], start: str, end: str) -> pd.DataFrame:
+        """Fetch raw OHLCV records for all tickers with a single request."""
+        # For equity data
+        return self.client.timeseries.get_range(
+            dataset=self.dataset,
+            symbols=tickers,
+            schema="ohlcv",
+            start=start,
+            end=end,
+            time_format="nanos",
+            session_filter="RTH"  # Regular Trading Hours
+        )
+    
+    def _split_by_symbol(self, df: pd.DataFrame, tickers: List[str]) -> Optional[Dict[str, pd.DataFrame]]:
+        """Split a multi-symbol response into per-ticker frames, or None if it has no symbol column."""
+        if df is None or df.empty:
+            return {}
+        if 'symbol' not in df.columns:
+            # Without a symbol column the records can only belong to one ticker
+            return {tickers[0]: df} if len(tickers) == 1 else None
+        return {symbol: group for symbol, group in df.groupby('symbol', sort=False)}
+    
+    def _fetch_concurrently(self, tickers: List[str], start: str, end: str) -> Dict[str, pd.DataFrame]:
+        """Fetch raw records one ticker per request, overlapping the requests in a thread pool."""
+        ticker_frames = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tickers))) as executor:
+            futures = {
+                executor.submit(self._fetch_range, [ticker], start, end): ticker
+                for ticker in tickers
+            }
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    ticker_frames[ticker] = future.result()
+                except Exception as e:
+                    logger.error(f"Error downloading data for {ticker}: {str(e)}")
+        return ticker_frames
+    
     def _download_single_ticker(self, ticker: str, start: str, end: str, interval: str) -> pd.DataFrame:
         """Download data for a single ticker."""
         try:
-            # For equity data
-            df = self.client.timeseries.get_range(
-                dataset=Dataset.GLBX_MDP3,  # Use appropriate dataset for your subscription
-                symbols=[ticker],
-                schema="ohlcv",
-                start=start,
-                end=end,
-                time_format="nanos",
-                session_filter="RTH"  # Regular Trading Hours
-            )
-            
-            # Rename columns to match yfinance format
-            if not df.empty:
-                df = df.rename(columns={
-                    'open': 'Open',
-                    'high': 'High',
-                    'low': 'Low',
-                    'close': 'Close',
-                    'volume': 'Volume'
-                })
-                
-                # Set ts_event as index and convert to datetime
-                if 'ts_event' in df.columns:
-                    df['Date'] = pd.to_datetime(df['ts_event'], unit='ns')
-                    df = df.set_index('Date')
-                
-                # Drop unnecessary columns
-                columns_to_keep = ['Open', 'High', 'Low', 'Close', 'Volume']
-                df = df[columns_to_keep]
-                
-                # Resample data to the requested interval
-                df = self._resample_data(df, interval)
-            
-            return df
+            df = self._fetch_range([ticker], start, end)
+            return self._format_ticker_frame(df, interval)
             
         except Exception as e:
             logger.error(f"Error downloading data for {ticker}: {str(e)}")
             return pd.DataFrame()
     
-    def _convert_interval(self, yf_interval: str) -> str:
+    def _format_ticker_frame(self, df: Optional[pd.DataFrame], interval: str) -> pd.DataFrame:
+        """Convert raw records for one ticker into a yfinance-style OHLCV frame."""
+        if df is None or df.empty:
+            return pd.DataFrame()
+        
+        # Rename columns to match yfinance format
+        df = df.rename(columns={
+            'open': 'Open',
+            'high': 'High',
+            'low': 'Low',
+            'close': 'Close',
+            'volume': 'Volume'
+        })
+        
+        # Set ts_event as index and convert to datetime
+        if 'ts_event' in df.columns:
+            dates = pd.to_datetime(df['ts_event'].to_numpy(), unit='ns', cache=True, utc=True)
+            df = df.set_index(dates.rename('Date'))
+        
+        # Drop unnecessary columns
+        columns_to_keep = ['Open', 'High', 'Low', 'Close', 'Volume']
+        df = df[columns_to_keep].astype({
+            'Open': self.dtype_prices,
+            'High': self.dtype_prices,
+            'Low': self.dtype_prices,
+            'Close': self.dtype_prices,
+            'Volume': 'int64'
+        })
+        
+        # Resample data to the requested interval
+        return self._resample_data(df, interval)
+    
+    @staticmethod
+    def _convert_interval(yf_interval: str) -> str:
         """Convert yfinance interval format to Databento format."""
-        interval_map = {
-            '1m': '1min',
-            '2m': '2min',
-            '5m': '5min',
-            '15m': '15min',
-            '30m': '30min',
-            '60m': '1h',
-            '90m': '90min',
-            '1h': '1h',
-            '1d': '1d',
-            '5d': '5d',
-            '1wk': '1w',
-            '1mo': '1mo',
-            '3mo': '3mo'
-        }
-        return interval_map.get(yf_interval, '1d')
+        return _INTERVAL_MAP.get(yf_interval, '1d')
     
     def _resample_data(self, df: pd.DataFrame, interval: str) -> pd.DataFrame:
         """Resample data to the requested interval."""
@@ -264,9 +353,9 @@ class DatabentoTicker:
             **kwargs
         )
         
-        # If data is grouped by ticker, filter for just this ticker
+        # Only this ticker was requested, so every row already belongs to it
         if 'Ticker' in df.columns:
-            df = df[df['Ticker'] == self.ticker].drop(columns=['Ticker'])
+            df = df.drop(columns=['Ticker'])
             
         self._history = df
         return df
@@ -1,23 +1,37 @@
 import os
-from typing import Optional, List
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, Optional, List
 from datetime import datetime
 import pandas as pd
-from databento import DBNStore, Dataset
-import yaml
-from dotenv import load_dotenv
+from data.env import load_env
 
-load_dotenv()
+# Parsed 'data' config sections, keyed by resolved config path
+_CONFIG_CACHE: Dict[str, dict] = {}
 
 class DatabentoLoader:
     def __init__(self, config_path: str = "../config/config.yaml"):
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)['data']
+        self.config_path = config_path
         
+        load_env()
         self.api_key = os.getenv('DATABENTO_API_KEY')
         if not self.api_key:
             raise ValueError("DATABENTO_API_KEY not found in environment variables")
         
+        from databento import DBNStore, Dataset
         self.client = DBNStore(key=self.api_key)
+        self.dataset = Dataset.OPTIONS
+    
+    @cached_property
+    def config(self) -> dict:
+        """The 'data' section of the YAML config, parsed once per config file."""
+        key = str(Path(self.config_path).resolve())
+        if key not in _CONFIG_CACHE:
+            import yaml
+            loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+            with open(key, 'r') as f:
+                _CONFIG_CACHE[key] = yaml.load(f, Loader=loader)['data']
+        return _CONFIG_CACHE[key]
         
     def download_option_data(
         self,
@@ -34,7 +48,7 @@ class DatabentoLoader:
         print(f"Downloading {symbol} options data from {start} to {end}")
         
         df = self.client.timeseries.get_range(
-            dataset=Dataset.OPTIONS,
+            dataset=self.dataset,
             symbols=[symbol],
             schema="ohlcv-1s",
             start=start,
@@ -42,20 +56,59 @@ class DatabentoLoader:
         )
         
         if save:
-            os.makedirs(self.config['data_dir'], exist_ok=True)
-            output_path = os.path.join(
+            output_dir = os.path.join(
                 self.config['data_dir'],
-                f"{symbol}_options_{start}_{end}.csv"
+                f"{symbol}_options_{start}_{end}"
             )
-            df.to_csv(output_path, index=False)
-            print(f"Data saved to {output_path}")
+            self._write_partitioned(df, output_dir)
+            print(f"Data saved to {output_dir}")
         
         return df
     
-    def load_local_data(self, file_path: str) -> pd.DataFrame:
-        """Load previously downloaded data from local file."""
-        return pd.read_csv(file_path)
+    def _write_partitioned(self, df: pd.DataFrame, output_dir: str):
+        """Write records as a Parquet dataset partitioned by trading date (hive layout)."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        
+        if 'ts_event' not in df.columns and df.index.name == 'ts_event':
+            df = df.reset_index()
+        dates = pd.DatetimeIndex(pd.to_datetime(df['ts_event'], utc=True)).strftime('%Y-%m-%d')
+        
+        table = pa.Table.from_pandas(df.assign(date=dates), preserve_index=False)
+        ds.write_dataset(
+            table,
+            base_dir=output_dir,
+            format='parquet',
+            partitioning=ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive'),
+            file_options=ds.ParquetFileFormat().make_write_options(compression='zstd'),
+            existing_data_behavior='overwrite_or_ignore'
+        )
+    
+    def load_local_data(
+        self,
+        file_path: str,
+        date: Optional[str] = None,
+        columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Load previously downloaded data from local file or partitioned dataset.
+        
+        Args:
+            file_path: CSV/Parquet file, or a directory written by download_option_data
+            date: Only read this trading date (YYYY-MM-DD) from a partitioned dataset
+            columns: Only read these columns
+        """
+        if file_path.endswith('.csv'):
+            return pd.read_csv(file_path, usecols=columns)
+        if not os.path.isdir(file_path):
+            return pd.read_parquet(file_path, engine='pyarrow', columns=columns)
+        
+        import pyarrow.dataset as ds
+        dataset = ds.dataset(file_path, format='parquet', partitioning='hive')
+        row_filter = ds.field('date') == date if date else None
+        return dataset.to_table(filter=row_filter, columns=columns).to_pandas()
 
+# Run from the project root as a module: python -m data.databento_loader
 if __name__ == "__main__":
     loader = DatabentoLoader()
     data = loader.download_option_data() 
\ No newline at end of file
@@ -1,23 +1,30 @@
 import os
+import time
+from functools import lru_cache
 from typing import Optional, Union
 from datetime import datetime, date
 import pandas as pd
-from databento import Historical
-from dotenv import load_dotenv
 from pathlib import Path
+from data.env import load_env
 
 class DatabentoDownloader:
     """Handles data downloading and caching from Databento."""
     
-    def __init__(self, cache_dir: str = "data/cache"):
-        load_dotenv()
+    def __init__(self, cache_dir: str = "data/cache", datasets_ttl: float = 3600):
+        load_env()
         self.api_key = os.getenv("DATABENTO_API_KEY")
         if not self.api_key:
             raise ValueError("DATABENTO_API_KEY not found in environment variables")
         
+        from databento import Historical
         self.client = Historical(api_key=self.api_key)
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Dataset listings change rarely, so keep them for datasets_ttl seconds
+        self.datasets_ttl = datasets_ttl
+        self._datasets = None
+        self._datasets_ts = 0.0
     
     def _get_cache_path(self, symbol: str, start: str, end: str, schema: str) -> Path:
         """Generate a cache file path based on parameters."""
@@ -81,7 +88,11 @@ class DatabentoDownloader:
     
     def list_available_datasets(self) -> list:
         """List all available datasets from Databento."""
-        return self.client.metadata.list_datasets()
+        now = time.monotonic()
+        if self._datasets is None or now - self._datasets_ts > self.datasets_ttl:
+            self._datasets = self.client.metadata.list_datasets()
+            self._datasets_ts = now
+        return self._datasets
     
     def clear_cache(self, symbol: Optional[str] = None):
         """
@@ -100,10 +111,15 @@ class DatabentoDownloader:
             file.unlink()
             print(f"Deleted cache file: {file}")
 
-# Create a global instance
-downloader = DatabentoDownloader()
+@lru_cache(maxsize=1)
+def get_downloader() -> DatabentoDownloader:
+    """Return the shared downloader, creating it on first use."""
+    return DatabentoDownloader()
 
+# Run from the project root as a module: python -m data.downloader
 if __name__ == "__main__":
+    downloader = get_downloader()
+    
     # Test the downloader
     print("Available datasets:", downloader.list_available_datasets())
     
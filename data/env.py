@@ -0,0 +1,13 @@
+"""
+Load environment variables from .env once per process.
+"""
+
+_DOTENV_LOADED = False
+
+def load_env():
+    """Load environment variables from .env on first use."""
+    global _DOTENV_LOADED
+    if not _DOTENV_LOADED:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _DOTENV_LOADED = True
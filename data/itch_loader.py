@@ -1,34 +1,45 @@
 import pandas as pd
-import json
+import orjson
+from functools import cached_property, lru_cache
 from pathlib import Path
 from typing import Dict, Optional, Union
 import numpy as np
+from data.itch_numba import NUMBA_AVAILABLE, ohlcv_kernel
+
+NS_PER_DAY = 86_400_000_000_000
+MBO_COLUMNS = ['timestamp', 'price', 'shares']
 
 class ITCHDataLoader:
     """Loader for ITCH Market By Order (MBO) data."""
     
-    def __init__(self, data_dir: Union[str, Path] = "data"):
+    # Parsed JSON files shared by all loaders, keyed by resolved path
+    _JSON_CACHE: Dict[Path, Dict] = {}
+    
+    def __init__(self, data_dir: Union[str, Path] = "data", dtype_prices: str = "float32"):
         self.data_dir = Path(data_dir)
-        self._load_metadata()
-        self._load_symbology()
+        self.dtype_prices = dtype_prices  # Use 'float64' when full price precision is needed
     
-    def _load_metadata(self):
-        """Load metadata information."""
-        try:
-            with open(self.data_dir / "metadata.json", "r") as f:
-                self.metadata = json.load(f)
-        except FileNotFoundError:
-            print("⚠️ Warning: metadata.json not found")
-            self.metadata = {}
+    @cached_property
+    def metadata(self) -> Dict:
+        """Metadata information, loaded on first access."""
+        return self._load_json("metadata.json")
     
-    def _load_symbology(self):
-        """Load symbol mapping information."""
-        try:
-            with open(self.data_dir / "symbology.json", "r") as f:
-                self.symbology = json.load(f)
-        except FileNotFoundError:
-            print("⚠️ Warning: symbology.json not found")
-            self.symbology = {}
+    @cached_property
+    def symbology(self) -> Dict:
+        """Symbol mapping information, loaded on first access."""
+        return self._load_json("symbology.json")
+    
+    def _load_json(self, file_name: str) -> Dict:
+        """Load a JSON file from the data directory, reusing previously parsed results."""
+        path = (self.data_dir / file_name).resolve()
+        if path not in self._JSON_CACHE:
+            try:
+                with open(path, "rb") as f:
+                    self._JSON_CACHE[path] = orjson.loads(f.read())
+            except FileNotFoundError:
+                print(f"⚠️ Warning: {file_name} not found")
+                return {}
+        return self._JSON_CACHE[path]
     
     def load_mbo_data(self, file_name: str = "xnas-itch-20220610.mbo.csv") -> pd.DataFrame:
         """
@@ -40,24 +51,51 @@ class ITCHDataLoader:
         Returns:
             Processed DataFrame with OHLCV data
         """
-        # Load raw MBO data
-        df = pd.read_csv(self.data_dir / file_name)
-        
-        # Convert timestamp to datetime
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ns')
+        # Load raw MBO data, reading only the columns needed for OHLCV
+        df = pd.read_parquet(
+            self._ensure_parquet(file_name),
+            engine='pyarrow',
+            columns=MBO_COLUMNS
+        )
         
-        # Set timestamp as index
-        df.set_index('timestamp', inplace=True)
+        # Convert timestamp to datetime and use it as the index
+        timestamps = pd.to_datetime(df['timestamp'].to_numpy(), unit='ns', cache=True, utc=True)
+        df = df.drop(columns=['timestamp']).set_index(timestamps.rename('timestamp'))
         
         # Convert price to dollars
-        if 'price' in df.columns:
-            df['price'] = df['price'] / 10000  # Convert from 4 decimal places
+        df['price'] = df['price'].to_numpy() * 1e-4  # Convert from 4 decimal places
         
         # Create OHLCV data
         ohlcv = self._create_ohlcv(df)
         
         return ohlcv
     
+    def _ensure_parquet(self, file_name: str) -> Path:
+        """
+        Return the Parquet copy of an MBO file, converting it from CSV once if needed.
+        
+        Args:
+            file_name: Name of the MBO data file (CSV or Parquet)
+            
+        Returns:
+            Path to the Parquet file
+        """
+        source_path = self.data_dir / file_name
+        if source_path.suffix == '.parquet':
+            return source_path
+        
+        parquet_path = source_path.with_suffix('.parquet')
+        if not parquet_path.exists() or parquet_path.stat().st_mtime < source_path.stat().st_mtime:
+            # Parse only the columns used for OHLCV, as integers
+            df = pd.read_csv(
+                source_path,
+                usecols=MBO_COLUMNS,
+                dtype={column: 'int64' for column in MBO_COLUMNS},
+                engine='c'
+            )
+            df.to_parquet(parquet_path, engine='pyarrow', compression='zstd', index=False)
+        return parquet_path
+    
     def _create_ohlcv(self, df: pd.DataFrame, freq: str = '1min') -> pd.DataFrame:
         """
         Create OHLCV data from MBO data.
@@ -69,23 +107,80 @@ class ITCHDataLoader:
         Returns:
             OHLCV DataFrame
         """
-        # Resample to desired frequency
-        ohlcv = pd.DataFrame()
-        
-        # Calculate OHLCV
-        ohlcv['open'] = df['price'].resample(freq).first()
-        ohlcv['high'] = df['price'].resample(freq).max()
-        ohlcv['low'] = df['price'].resample(freq).min()
-        ohlcv['close'] = df['price'].resample(freq).last()
-        ohlcv['volume'] = df['shares'].resample(freq).sum()
+        bucket_ns = self._fixed_freq_ns(freq)
+        if NUMBA_AVAILABLE and bucket_ns and not df.empty:
+            ohlcv = self._aggregate_ohlcv_numba(df, bucket_ns)
+        else:
+            # Calculate OHLCV and the price*volume sum in a single resampling pass
+            ohlcv = df.assign(pv=df['price'] * df['shares']).resample(freq).agg(
+                open=('price', 'first'),
+                high=('price', 'max'),
+                low=('price', 'min'),
+                close=('price', 'last'),
+                volume=('shares', 'sum'),
+                pv_sum=('pv', 'sum')
+            )
+        pv_sum = ohlcv.pop('pv_sum')
         
         # Forward fill missing values
-        ohlcv.ffill(inplace=True)
+        ohlcv = ohlcv.ffill()
         
         # Calculate additional metrics
-        ohlcv['vwap'] = (df['price'] * df['shares']).resample(freq).sum() / df['shares'].resample(freq).sum()
+        ohlcv['vwap'] = pv_sum / ohlcv['volume']
         
-        return ohlcv
+        # Store prices in the configured precision
+        return ohlcv.astype({
+            column: self.dtype_prices for column in ('open', 'high', 'low', 'close', 'vwap')
+        })
+    
+    @staticmethod
+    def _fixed_freq_ns(freq: str) -> Optional[int]:
+        """Return the bucket width in nanoseconds if freq is fixed and divides a day evenly."""
+        try:
+            bucket_ns = pd.Timedelta(freq).value
+        except ValueError:
+            return None
+        if bucket_ns <= 0 or NS_PER_DAY % bucket_ns:
+            return None
+        return bucket_ns
+    
+    def _aggregate_ohlcv_numba(self, df: pd.DataFrame, bucket_ns: int) -> pd.DataFrame:
+        """
+        Aggregate ticks into OHLCV bars with the numba kernel.
+        
+        Args:
+            df: Raw MBO DataFrame indexed by timestamp
+            bucket_ns: Bar width in nanoseconds
+            
+        Returns:
+            OHLCV DataFrame with a pv_sum column, matching the resample() layout
+        """
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index(kind='stable')
+        
+        ts_ns = df.index.asi8
+        t0 = ts_ns[0] - ts_ns[0] % bucket_ns
+        n_buckets = int((ts_ns[-1] - t0) // bucket_ns) + 1
+        
+        o, h, l, c, v, pv = ohlcv_kernel(
+            ts_ns,
+            df['price'].to_numpy(dtype=np.float64),
+            df['shares'].to_numpy(dtype=np.int64),
+            t0,
+            bucket_ns,
+            n_buckets
+        )
+        
+        tz = df.index.tz
+        index = pd.to_datetime(t0 + np.arange(n_buckets, dtype=np.int64) * bucket_ns, unit='ns', utc=tz is not None)
+        if tz is not None:
+            index = index.tz_convert(tz)
+        index.name = df.index.name
+        
+        return pd.DataFrame(
+            {'open': o, 'high': h, 'low': l, 'close': c, 'volume': v, 'pv_sum': pv},
+            index=index
+        )
     
     def get_symbol_info(self, symbol: str) -> Dict:
         """Get symbol mapping information."""
@@ -104,10 +199,15 @@ class ITCHDataLoader:
             }
         return {}
 
-# Create a global instance
-itch_loader = ITCHDataLoader()
+@lru_cache(maxsize=1)
+def get_itch_loader() -> ITCHDataLoader:
+    """Return the shared loader, creating it on first use."""
+    return ITCHDataLoader()
 
+# Run from the project root as a module: python -m data.itch_loader
 if __name__ == "__main__":
+    itch_loader = get_itch_loader()
+    
     # Test the loader
     print("Loading ITCH MBO data...")
     df = itch_loader.load_mbo_data()
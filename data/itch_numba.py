@@ -0,0 +1,62 @@
+"""
+Numba kernels for aggregating ITCH ticks into OHLCV bars.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback decorator used when numba is not installed."""
+        def decorator(func):
+            return func
+        return decorator
+
+
+@njit(cache=True)
+def ohlcv_kernel(ts_ns, price, shares, t0, bucket_ns, n_buckets):
+    """
+    Aggregate sorted ticks into fixed-width OHLCV buckets in a single pass.
+
+    Args:
+        ts_ns: Sorted int64 nanosecond timestamps
+        price: float64 trade prices
+        shares: int64 trade sizes
+        t0: Start of the first bucket in nanoseconds
+        bucket_ns: Bucket width in nanoseconds
+        n_buckets: Number of buckets to emit
+
+    Returns:
+        Tuple of (open, high, low, close, volume, pv_sum) arrays; empty buckets
+        have NaN prices and zero volume
+    """
+    o = np.full(n_buckets, np.nan)
+    h = np.full(n_buckets, np.nan)
+    l = np.full(n_buckets, np.nan)
+    c = np.full(n_buckets, np.nan)
+    v = np.zeros(n_buckets, dtype=np.int64)
+    pv = np.zeros(n_buckets)
+
+    for i in range(ts_ns.shape[0]):
+        b = (ts_ns[i] - t0) // bucket_ns
+        p = price[i]
+        v[b] += shares[i]
+        if np.isnan(p):
+            continue
+        if np.isnan(o[b]):
+            o[b] = p
+            h[b] = p
+            l[b] = p
+        else:
+            if p > h[b]:
+                h[b] = p
+            if p < l[b]:
+                l[b] = p
+        c[b] = p
+        pv[b] += p * shares[i]
+
+    return o, h, l, c, v, pv
@@ -1,56 +1,14 @@
 """
-市场数据接口定义
+期权分析器，基于 BaseDataSource 数据源接口
 """
 
-from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
-from datetime import datetime
-import pandas as pd
-
-class MarketDataSource(ABC):
-    """市场数据源接口"""
-    
-    @abstractmethod
-    def get_option_chain(self, symbol: str) -> pd.DataFrame:
-        """
-        获取期权链数据
-        返回数据包含：
-        - 行权价
-        - 到期日
-        - 看涨/看跌
-        - 隐含波动率
-        - 成交量
-        - Delta/Gamma/Theta/Vega
-        """
-        pass
-        
-    @abstractmethod
-    def get_historical_data(self, symbol: str, start_date: datetime, 
-                          end_date: datetime) -> pd.DataFrame:
-        """
-        获取历史K线数据
-        返回OHLCV数据
-        """
-        pass
-        
-    @abstractmethod
-    def get_realtime_quote(self, symbol: str) -> Dict:
-        """
-        获取实时报价
-        返回最新价、买一卖一、成交量等
-        """
-        pass
-        
-    @abstractmethod
-    def get_greeks(self, symbol: str, option_type: str, 
-                   strike: float, expiry: datetime) -> Dict:
-        """获取期权希腊字母"""
-        pass
+from typing import Dict, List
+from .base_data_source import BaseDataSource
 
 class OptionAnalyzer:
     """期权分析器"""
     
-    def __init__(self, data_source: MarketDataSource):
+    def __init__(self, data_source: BaseDataSource):
         self.data_source = data_source
         
     def analyze_pressure_points(self, symbol: str) -> Dict:
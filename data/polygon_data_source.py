@@ -1,15 +1,16 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
-from polygon import RESTClient
-from polygon.rest.models import Agg
 
 class PolygonDataSource:
     """
     Polygon.io data source for real-time market data
     """
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, dtype_prices: str = "float32"):
+        from polygon import RESTClient
         self.client = RESTClient(api_key)
+        self.dtype_prices = dtype_prices  # Use 'float64' when full price precision is needed
         
     def get_minute_bars(self, 
                        symbol: str, 
@@ -49,20 +50,39 @@ class PolygonDataSource:
         if not bars:
             return pd.DataFrame()
             
-        df = pd.DataFrame([{
-            'timestamp': b.timestamp,
-            'open': b.open,
-            'high': b.high,
-            'low': b.low,
-            'close': b.close,
-            'volume': b.volume,
-            'vwap': b.vwap,
-            'transactions': b.transactions
-        } for b in bars])
+        # Fill preallocated column arrays instead of building a dict per bar
+        n = len(bars)
+        timestamp = np.empty(n, dtype=np.int64)
+        open_ = np.empty(n, dtype=self.dtype_prices)
+        high = np.empty(n, dtype=self.dtype_prices)
+        low = np.empty(n, dtype=self.dtype_prices)
+        close = np.empty(n, dtype=self.dtype_prices)
+        volume = np.empty(n, dtype=np.float64)
+        vwap = np.empty(n, dtype=self.dtype_prices)
+        transactions = np.empty(n, dtype=np.float64)
+        for i, b in enumerate(bars):
+            timestamp[i] = b.timestamp
+            open_[i] = b.open
+            high[i] = b.high
+            low[i] = b.low
+            close[i] = b.close
+            volume[i] = b.volume
+            vwap[i] = np.nan if b.vwap is None else b.vwap
+            transactions[i] = np.nan if b.transactions is None else b.transactions
         
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
-        return df
+        index = pd.DatetimeIndex(
+            pd.to_datetime(timestamp, unit='ms', utc=True, cache=True),
+            name='timestamp'
+        )
+        return pd.DataFrame({
+            'open': open_,
+            'high': high,
+            'low': low,
+            'close': close,
+            'volume': volume,
+            'vwap': vwap,
+            'transactions': transactions
+        }, index=index)
         
     def get_option_chain(self, 
                         underlying_symbol: str,
@@ -2,77 +2,258 @@
 Yahoo Finance 数据源实现
 """
 
-import yfinance as yf
+import threading
+import time
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 from .base_data_source import BaseDataSource
 
+if TYPE_CHECKING:
+    import yfinance as yf
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Yahoo 单次请求的最大股票数量
+_BATCH_SIZE = 20
+
+_OHLCV_RENAME = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Adj Close": "adj_close",
+    "Volume": "volume"
+}
+
+_OPT_RENAME = {
+    'lastPrice': 'last',
+    'bid': 'bid',
+    'ask': 'ask',
+    'change': 'change',
+    'percentChange': 'change_percent',
+    'volume': 'volume',
+    'openInterest': 'open_interest',
+    'impliedVolatility': 'implied_volatility'
+}
+
+# 期权链中按价格/成交量处理的列（原始 Yahoo 列名）
+_OPT_FLOAT_COLUMNS = ("lastPrice", "bid", "ask", "change", "percentChange", "impliedVolatility")
+_OPT_INT_COLUMNS = ("volume", "openInterest")
+
+# pandas >= 1.5 且安装了 pyarrow 时使用 Arrow 类型
+_ARROW_DTYPES = pa is not None and hasattr(pd, "ArrowDtype")
+
 class YahooDataSource(BaseDataSource):
     """Yahoo Finance 数据源"""
     
+    def __init__(self, option_chain_ttl: float = 30, float_dtype: str = "float32"):
+        """
+        Args:
+            option_chain_ttl: 期权链缓存时间（秒），轮询窗口内不重复请求
+            float_dtype: 价格列的浮点类型，需要 float64 精度时传入 "float64"
+        """
+        self.option_chain_ttl = option_chain_ttl
+        self.float_dtype = float_dtype
+        self._tickers: Dict[str, "yf.Ticker"] = {}
+        self._option_chains: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+    
+    def _ticker(self, symbol: str) -> "yf.Ticker":
+        """获取（复用）股票的 yf.Ticker 对象"""
+        import yfinance as yf
+        
+        with self._lock:
+            ticker = self._tickers.get(symbol)
+            if ticker is None:
+                ticker = self._tickers[symbol] = yf.Ticker(symbol)
+            return ticker
+    
+    def _option_chain(self, symbol: str, expiry: str):
+        """获取期权链列数组 (calls, puts)，列名已转换，option_chain_ttl 秒内复用上次结果"""
+        key = (symbol, expiry)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._option_chains.get(key)
+        if cached is not None and now - cached[0] < self.option_chain_ttl:
+            return cached[1]
+        
+        opt = self._ticker(symbol).option_chain(expiry)
+        opt = (self._option_arrays(opt.calls), self._option_arrays(opt.puts))
+        with self._lock:
+            # 顺便清理过期条目，避免缓存无限增长
+            self._option_chains = {
+                k: v for k, v in self._option_chains.items()
+                if now - v[0] < self.option_chain_ttl
+            }
+            self._option_chains[key] = (now, opt)
+        return opt
+    
+    def _option_arrays(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        期权链按列转为 NumPy 数组：价格/隐含波动率列为 float_dtype，成交量/持仓量为 float64，
+        缺失值为 NaN；其余列保持原类型
+        """
+        dtypes = {c: self.float_dtype for c in _OPT_FLOAT_COLUMNS}
+        dtypes.update({c: np.float64 for c in _OPT_INT_COLUMNS})
+        return {
+            _OPT_RENAME.get(c, c): df[c].to_numpy(dtype=dtypes[c], na_value=np.nan) if c in dtypes else df[c].to_numpy()
+            for c in df.columns
+        }
+    
+    def _convert_frame(self, df: pd.DataFrame, float_cols: List[str], int_cols: List[str], int_dtype: str) -> pd.DataFrame:
+        """
+        价格列转为 float_dtype，数量列转为 int_dtype；有 pyarrow 时使用 Arrow 类型，
+        整数列中的缺失值保留为 null。没有 pyarrow 时整数列保持原样（NumPy 整数无法表示 NaN）
+        """
+        if _ARROW_DTYPES:
+            float_type = pd.ArrowDtype(pa.type_for_alias(self.float_dtype))
+            int_type = pd.ArrowDtype(pa.type_for_alias(int_dtype))
+            dtypes = {c: float_type for c in float_cols}
+            dtypes.update({c: int_type for c in int_cols})
+        else:
+            dtypes = {c: self.float_dtype for c in float_cols}
+        return df.astype(dtypes) if dtypes else df
+    
+    def _convert_ohlcv_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """OHLC 列转为 float_dtype，成交量转为 int64"""
+        return self._convert_frame(
+            df,
+            [c for c in ("open", "high", "low", "close", "adj_close") if c in df.columns],
+            ["volume"] if "volume" in df.columns else [],
+            "int64"
+        )
+    
     def get_stock_data(self, 
                        symbol: str, 
                        start_date: str, 
                        end_date: str, 
                        interval: str = "1d") -> pd.DataFrame:
         """获取股票历史数据"""
-        df = yf.download(symbol, start=start_date, end=end_date, interval=interval)
-        df = df.rename(columns={
-            "Open": "open",
-            "High": "high",
-            "Low": "low",
-            "Close": "close",
-            "Adj Close": "adj_close",
-            "Volume": "volume"
-        })
-        return df
+        data = self.get_stock_data_many([symbol], start_date, end_date, interval)
+        return data.get(symbol, pd.DataFrame())
+
+    def get_stock_data_many(self, 
+                            symbols: List[str], 
+                            start_date: str, 
+                            end_date: str, 
+                            interval: str = "1d") -> Dict[str, pd.DataFrame]:
+        """
+        批量获取多只股票的历史数据
+        Args:
+            symbols: 股票代码列表
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            interval: 时间间隔
+        Returns:
+            Dict mapping symbol to DataFrame with columns: open, high, low, close, adj_close, volume
+        """
+        # 每批最多 _BATCH_SIZE 只股票，批次依次下载（yf.download 使用模块级共享状态，不能并发调用，
+        # 单个批次内部已通过 threads=True 并发请求）
+        import yfinance as yf
+        
+        batches = [symbols[i:i + _BATCH_SIZE] for i in range(0, len(symbols), _BATCH_SIZE)]
+        results = [
+            yf.download(
+                batch,
+                start=start_date,
+                end=end_date,
+                interval=interval,
+                group_by='ticker',
+                threads=True,
+                progress=False
+            )
+            for batch in batches
+        ]
+        
+        data = {}
+        for batch, df_all in zip(batches, results):
+            for symbol in batch:
+                if isinstance(df_all.columns, pd.MultiIndex):
+                    if symbol not in df_all.columns.get_level_values(0):
+                        continue
+                    # 多股票结果按交易日对齐，去掉该股票无数据的行
+                    df = df_all[symbol].dropna(how='all')
+                else:
+                    df = df_all
+                # 直接替换列标签，避免 rename 的额外拷贝
+                df.columns = [_OHLCV_RENAME.get(c, c) for c in df.columns]
+                data[symbol] = self._convert_ohlcv_frame(df)
+        return data
 
     def get_option_chain(self, 
                         symbol: str, 
                         expiry: Optional[str] = None) -> Dict:
         """获取期权链数据"""
-        ticker = yf.Ticker(symbol)
-        
+        # 由缓存的列数组构建 DataFrame，不复制数据；每次调用都是新的 DataFrame，调用方增删列不影响缓存
+        chain = self.get_option_chain_arrays(symbol, expiry)
+        return {
+            "calls": pd.DataFrame(chain["calls"], copy=False),
+            "puts": pd.DataFrame(chain["puts"], copy=False),
+            "expiry": chain["expiry"]
+        }
+    
+    def get_option_chain_arrays(self, 
+                                symbol: str, 
+                                expiry: Optional[str] = None) -> Dict:
+        """
+        获取期权链的列数组，适合只读取数值列的轮询逻辑（不构建 DataFrame，可直接传给 numba 等向量化代码）
+        Args:
+            symbol: 股票代码
+            expiry: 到期日，默认最近的到期日
+        Returns:
+            {"calls": {列名: np.ndarray}, "puts": {列名: np.ndarray}, "expiry": 到期日}
+            数组与缓存共享，请勿原地修改
+        """
         # 如果没有指定到期日，使用最近的到期日
         if expiry is None:
-            expiry = ticker.options[0]
-            
-        # 获取期权链
-        opt = ticker.option_chain(expiry)
-        
-        # 处理列名
-        calls = opt.calls.rename(columns={
-            'lastPrice': 'last',
-            'bid': 'bid',
-            'ask': 'ask',
-            'change': 'change',
-            'percentChange': 'change_percent',
-            'volume': 'volume',
-            'openInterest': 'open_interest',
-            'impliedVolatility': 'implied_volatility'
-        })
-        
-        puts = opt.puts.rename(columns={
-            'lastPrice': 'last',
-            'bid': 'bid',
-            'ask': 'ask',
-            'change': 'change',
-            'percentChange': 'change_percent',
-            'volume': 'volume',
-            'openInterest': 'open_interest',
-            'impliedVolatility': 'implied_volatility'
-        })
+            expiry = self._ticker(symbol).options[0]
         
+        calls, puts = self._option_chain(symbol, expiry)
         return {
-            "calls": calls,
-            "puts": puts,
+            "calls": dict(calls),
+            "puts": dict(puts),
             "expiry": expiry
         }
         
-    def get_realtime_quote(self, symbol: str) -> Dict:
-        """获取实时报价"""
-        ticker = yf.Ticker(symbol)
+    def get_realtime_quote(self, symbol: str, include_book: bool = False) -> Dict:
+        """
+        获取实时报价
+        Args:
+            symbol: 股票代码
+            include_book: 是否获取买一卖一（需要请求完整的 info，较慢）
+        """
+        ticker = self._ticker(symbol)
+        
+        # fast_info 只请求轻量行情接口，比完整的 info 快得多
+        try:
+            fast_info = ticker.fast_info
+            last = fast_info.last_price
+            previous_close = fast_info.previous_close
+            quote = {
+                "last": last,
+                "change": last - previous_close,
+                "change_percent": (last - previous_close) / previous_close * 100,
+                "volume": fast_info.last_volume,
+                "bid": None,
+                "ask": None,
+                "timestamp": datetime.now().isoformat()
+            }
+        except (AttributeError, KeyError, TypeError, ZeroDivisionError):
+            return self._quote_from_info(ticker)
+        
+        if include_book:
+            info = ticker.info
+            quote["bid"] = info.get("bid", None)
+            quote["ask"] = info.get("ask", None)
+        return quote
+    
+    def _quote_from_info(self, ticker: "yf.Ticker") -> Dict:
+        """从完整的 info 字典构建报价"""
         info = ticker.info
         
         return {
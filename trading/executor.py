@@ -1,8 +1,14 @@
-from typing import Optional
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Optional
 from datetime import datetime
-import alpaca_trade_api as tradeapi
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
 from enum import Enum
 
+if TYPE_CHECKING:
+    import alpaca_trade_api as tradeapi
+
 class OrderSide(Enum):
     BUY = "buy"
     SELL = "sell"
@@ -13,6 +19,32 @@ class OrderType(Enum):
     STOP = "stop"
     STOP_LIMIT = "stop_limit"
 
+# Order types that take a limit_price / stop_price
+_PRICE_ORDER_TYPES = frozenset({OrderType.LIMIT, OrderType.STOP_LIMIT})
+_STOP_ORDER_TYPES = frozenset({OrderType.STOP, OrderType.STOP_LIMIT})
+
+@lru_cache(maxsize=None)
+def _get_rest_client(api_key: Optional[str],
+                     api_secret: Optional[str],
+                     base_url: str) -> "tradeapi.REST":
+    """
+    Get a shared Alpaca REST client for a set of credentials, with a larger connection pool
+    """
+    import alpaca_trade_api as tradeapi
+    
+    api = tradeapi.REST(
+        api_key,
+        api_secret,
+        base_url,
+        api_version='v2'
+    )
+    session = getattr(api, '_session', None)
+    if session is not None:
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=3)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+    return api
+
 class TradingExecutor:
     """
     Trading executor using Alpaca as broker
@@ -20,13 +52,33 @@ class TradingExecutor:
     def __init__(self,
                  api_key: Optional[str] = None,
                  api_secret: Optional[str] = None,
-                 base_url: str = "https://paper-api.alpaca.markets"):
-        self.api = tradeapi.REST(
-            api_key,
-            api_secret,
-            base_url,
-            api_version='v2'
-        )
+                 base_url: str = "https://paper-api.alpaca.markets",
+                 cache_ttl: float = 0.5):
+        self.api = _get_rest_client(api_key, api_secret, base_url)
+        
+        # Short-lived cache for account/position reads, keyed by ('position', symbol) / ('account',)
+        self.cache_ttl = cache_ttl
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        
+    def _cached(self, key: tuple, fresh: bool, fetch: Callable):
+        """Return a cached broker read younger than cache_ttl, or fetch and cache it"""
+        if not fresh:
+            with self._cache_lock:
+                entry = self._cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.cache_ttl:
+                return entry[1]
+                
+        value = fetch()
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic(), value)
+        return value
+        
+    def _invalidate(self, *keys: tuple):
+        """Drop cached broker reads"""
+        with self._cache_lock:
+            for key in keys:
+                self._cache.pop(key, None)
         
     def execute_trade(self,
                      symbol: str,
@@ -54,6 +106,15 @@ class TradingExecutor:
             Order details
         """
         try:
+            # Attach stop loss / take profit legs server-side so Alpaca activates them on fill
+            legs = {}
+            if stop_loss:
+                legs['stop_loss'] = {'stop_price': stop_loss}
+            if take_profit:
+                legs['take_profit'] = {'limit_price': take_profit}
+            if legs:
+                legs['order_class'] = 'bracket' if len(legs) == 2 else 'oto'
+            
             # Submit the primary order
             order = self.api.submit_order(
                 symbol=symbol,
@@ -61,32 +122,14 @@ class TradingExecutor:
                 side=side.value,
                 type=order_type.value,
                 time_in_force=time_in_force,
-                limit_price=price if order_type in [OrderType.LIMIT, OrderType.STOP_LIMIT] else None,
-                stop_price=price if order_type in [OrderType.STOP, OrderType.STOP_LIMIT] else None
+                limit_price=price if order_type in _PRICE_ORDER_TYPES else None,
+                stop_price=price if order_type in _STOP_ORDER_TYPES else None,
+                **legs
             )
             
-            # Set stop loss if specified
-            if stop_loss and order.status == 'filled':
-                self.api.submit_order(
-                    symbol=symbol,
-                    qty=quantity,
-                    side=OrderSide.SELL.value if side == OrderSide.BUY else OrderSide.BUY.value,
-                    type=OrderType.STOP.value,
-                    time_in_force=time_in_force,
-                    stop_price=stop_loss
-                )
-                
-            # Set take profit if specified
-            if take_profit and order.status == 'filled':
-                self.api.submit_order(
-                    symbol=symbol,
-                    qty=quantity,
-                    side=OrderSide.SELL.value if side == OrderSide.BUY else OrderSide.BUY.value,
-                    type=OrderType.LIMIT.value,
-                    time_in_force=time_in_force,
-                    limit_price=take_profit
-                )
-                
+            # The trade changes this position and the account balances
+            self._invalidate(('position', symbol), ('account',))
+            
             return {
                 'order_id': order.id,
                 'status': order.status,
@@ -97,23 +140,36 @@ class TradingExecutor:
         except Exception as e:
             raise Exception(f"Failed to execute trade: {str(e)}")
             
-    def get_position(self, symbol: str) -> Optional[dict]:
-        """Get current position for a symbol"""
+    def get_position(self, symbol: str, fresh: bool = False) -> Optional[dict]:
+        """Get current position for a symbol (fresh=True bypasses the cache)"""
+        return self._cached(('position', symbol), fresh, lambda: self._fetch_position(symbol))
+        
+    def _fetch_position(self, symbol: str) -> Optional[dict]:
+        """Fetch current position for a symbol from the broker"""
+        from alpaca_trade_api.rest import APIError
+        
         try:
             position = self.api.get_position(symbol)
-            return {
-                'symbol': position.symbol,
-                'qty': float(position.qty),
-                'market_value': float(position.market_value),
-                'avg_entry_price': float(position.avg_entry_price),
-                'unrealized_pl': float(position.unrealized_pl),
-                'current_price': float(position.current_price)
-            }
-        except:
-            return None
+        except APIError as e:
+            # 404 means there is no open position for the symbol
+            if getattr(e, 'status_code', None) == 404:
+                return None
+            raise
+        return {
+            'symbol': position.symbol,
+            'qty': float(position.qty),
+            'market_value': float(position.market_value),
+            'avg_entry_price': float(position.avg_entry_price),
+            'unrealized_pl': float(position.unrealized_pl),
+            'current_price': float(position.current_price)
+        }
             
-    def get_account(self) -> dict:
-        """Get account information"""
+    def get_account(self, fresh: bool = False) -> dict:
+        """Get account information (fresh=True bypasses the cache)"""
+        return self._cached(('account',), fresh, self._fetch_account)
+        
+    def _fetch_account(self) -> dict:
+        """Fetch account information from the broker"""
         account = self.api.get_account()
         return {
             'cash': float(account.cash),
@@ -2,8 +2,7 @@
 DeepSeek AI API Client
 """
 import os
-import json
-import requests
+from utils.ai.session import create_session, dumps, loads
 
 class DeepSeekClient:
     """DeepSeek client implementation"""
@@ -12,35 +11,58 @@ class DeepSeekClient:
         self.api_key = api_key or os.environ.get("DEEPSEEK_API_KEY")
         self.api_base = api_base or os.environ.get("DEEPSEEK_API_BASE") or "https://api.siliconflow.cn/v1"
         self.model = model or os.environ.get("DEEPSEEK_MODEL") or "deepseek-ai/DeepSeek-V3"
-        
-    def completion(self, prompt, model=None, temperature=0.7, max_tokens=2000):
-        """Generate text completion"""
-        if not self.api_key:
-            return {"error": "API key not set"}
-        
-        model_to_use = model or self.model
-            
-        headers = {
+        self._headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self._session = create_session()
+        self._aclient = None
+    
+    @property
+    def aclient(self):
+        """Async HTTP/2 client, created on first use"""
+        if self._aclient is None:
+            import httpx
+            self._aclient = httpx.AsyncClient(
+                http2=True,
+                timeout=60,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+            )
+        return self._aclient
         
-        data = {
-            "model": model_to_use,
-            "messages": [{"role": "user", "content": prompt}],
+    def _build_request(self, prompt, model, temperature, max_tokens, system_prompt):
+        """Build the chat completion request body"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return {
+            "model": model or self.model,
+            "messages": messages,
             "temperature": temperature,
             "max_tokens": max_tokens
         }
         
+    def completion(self, prompt, model=None, temperature=0.7, max_tokens=2000, system_prompt=None, stream=False):
+        """Generate text completion; with stream=True, return a generator of text chunks"""
+        if not self.api_key:
+            return {"error": "API key not set"}
+        
+        data = self._build_request(prompt, model, temperature, max_tokens, system_prompt)
+        model_to_use = data["model"]
+        endpoint = f"{self.api_base}/chat/completions"
+        
+        if stream:
+            return self._stream_completion(endpoint, data)
+        
         try:
-            endpoint = f"{self.api_base}/chat/completions"
             print(f"Calling API: {endpoint}")
             print(f"Using model: {model_to_use}")
             
-            response = requests.post(
+            response = self._session.post(
                 endpoint, 
-                headers=headers, 
-                json=data,
+                headers=self._headers, 
+                data=dumps(data).encode(),
                 timeout=60
             )
             
@@ -49,10 +71,79 @@ class DeepSeekClient:
                 print(f"Response: {response.text}")
                 return {"error": f"API call failed: HTTP {response.status_code}"}
                 
-            return response.json()
+            return loads(response.content)
+        except Exception as e:
+            print(f"Call exception: {str(e)}")
+            return {"error": f"API call failed: {str(e)}"}
+    
+    def _stream_completion(self, endpoint, data):
+        """Yield content deltas from the server-sent event stream"""
+        data = dict(data, stream=True)
+        try:
+            with self._session.post(
+                endpoint,
+                headers=self._headers,
+                data=dumps(data).encode(),
+                timeout=60,
+                stream=True
+            ) as response:
+                if response.status_code != 200:
+                    print(f"API error: {response.status_code}")
+                    print(f"Response: {response.text}")
+                    return
+                    
+                for line in response.iter_lines():
+                    if not line.startswith(b"data: "):
+                        continue
+                    payload = line[len(b"data: "):]
+                    if payload == b"[DONE]":
+                        break
+                    choices = loads(payload).get("choices") or [{}]
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        yield content
+        except Exception as e:
+            print(f"Call exception: {str(e)}")
+    
+    async def acompletion(self, prompt, model=None, temperature=0.7, max_tokens=2000, system_prompt=None):
+        """Generate text completion without blocking the event loop"""
+        if not self.api_key:
+            return {"error": "API key not set"}
+        
+        data = self._build_request(prompt, model, temperature, max_tokens, system_prompt)
+        
+        try:
+            response = await self.aclient.post(
+                f"{self.api_base}/chat/completions",
+                headers=self._headers,
+                content=dumps(data).encode()
+            )
+            
+            if response.status_code != 200:
+                print(f"API error: {response.status_code}")
+                print(f"Response: {response.text}")
+                return {"error": f"API call failed: HTTP {response.status_code}"}
+                
+            return loads(response.content)
         except Exception as e:
             print(f"Call exception: {str(e)}")
             return {"error": f"API call failed: {str(e)}"}
+    
+    def close(self):
+        """Close pooled connections"""
+        self._session.close()
+        
+    async def aclose(self):
+        """Close the async client; a new one is created on next use"""
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 def create_client(api_key=None, api_base=None, model=None):
     """Create client"""
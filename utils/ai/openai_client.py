@@ -1,9 +1,8 @@
 # OpenAI API Client
 
 import os
-import json
 import time
-import requests
+from utils.ai.session import create_session, dumps, loads
 
 class OpenAIClient:
     """Simplified OpenAI client implementation"""
@@ -11,34 +10,88 @@ class OpenAIClient:
     def __init__(self, api_key=None):
         self.api_key = api_key or os.environ.get('OPENAI_API_KEY')
         self.api_base = "https://api.openai.com/v1"
-        
-    def completion(self, prompt, model="gpt-3.5-turbo", temperature=0.7, max_tokens=2000):
-        """Generate text completion"""
-        if not self.api_key:
-            return {"error": "API key not set, please set OPENAI_API_KEY in .env file"}
-            
-        headers = {
+        self._headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self._session = create_session()
+        self._aclient = None
+    
+    @property
+    def aclient(self):
+        """Async HTTP/2 client, created on first use"""
+        if self._aclient is None:
+            import httpx
+            self._aclient = httpx.AsyncClient(
+                http2=True,
+                timeout=60,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+            )
+        return self._aclient
         
-        data = {
+    def _build_request(self, prompt, model, temperature, max_tokens, system_prompt):
+        """Build the chat completion request body"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return {
             "model": model,
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": messages,
             "temperature": temperature,
             "max_tokens": max_tokens
         }
         
+    def completion(self, prompt, model="gpt-3.5-turbo", temperature=0.7, max_tokens=2000, system_prompt=None):
+        """Generate text completion"""
+        if not self.api_key:
+            return {"error": "API key not set, please set OPENAI_API_KEY in .env file"}
+        
+        data = self._build_request(prompt, model, temperature, max_tokens, system_prompt)
+        
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.api_base}/chat/completions", 
-                headers=headers, 
-                json=data,
+                headers=self._headers, 
+                data=dumps(data).encode(),
                 timeout=60
             )
-            return response.json()
+            return loads(response.content)
+        except Exception as e:
+            return {"error": f"API call failed: {str(e)}"}
+    
+    async def acompletion(self, prompt, model="gpt-3.5-turbo", temperature=0.7, max_tokens=2000, system_prompt=None):
+        """Generate text completion without blocking the event loop"""
+        if not self.api_key:
+            return {"error": "API key not set, please set OPENAI_API_KEY in .env file"}
+        
+        data = self._build_request(prompt, model, temperature, max_tokens, system_prompt)
+        
+        try:
+            response = await self.aclient.post(
+                f"{self.api_base}/chat/completions",
+                headers=self._headers,
+                content=dumps(data).encode()
+            )
+            return loads(response.content)
         except Exception as e:
             return {"error": f"API call failed: {str(e)}"}
+    
+    def close(self):
+        """Close pooled connections"""
+        self._session.close()
+        
+    async def aclose(self):
+        """Close the async client; a new one is created on next use"""
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 # Convenience function
 def create_client(api_key=None):
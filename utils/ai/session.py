@@ -0,0 +1,42 @@
+"""
+Shared HTTP session and JSON helpers for the LLM clients
+"""
+import json
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    
+    def dumps(obj):
+        """Serialize to a compact JSON string"""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    loads = orjson.loads
+except ImportError:
+    def dumps(obj):
+        """Serialize to a compact JSON string"""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    
+    loads = json.loads
+
+def create_session(headers=None, pool_maxsize=32, backoff_factor=0.2):
+    """Create a keep-alive session with pooled connections and retries on 429/5xx"""
+    session = requests.Session()
+    if headers:
+        session.headers.update(headers)
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=pool_maxsize,
+        # urllib3 does not retry POST by default; completions are safe to resend
+        max_retries=Retry(
+            total=3,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset({"GET", "POST"})
+        )
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
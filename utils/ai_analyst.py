@@ -10,7 +10,10 @@ AI 操盘手模块
 
 
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, List, Optional
+
+
+import asyncio
 
 
 import json
@@ -22,19 +25,247 @@ import logging
 from datetime import datetime
 
 
-import pandas as pd
+import os
+
+
+import time
 
 
-import numpy as np
+from utils.ai.deepseek_client import DeepSeekClient
 
 
-import os
+from utils.deepseek_api import get_deepseek_response
 
 
-from dotenv import load_dotenv
 
 
-import time
+
+try:
+
+
+    import orjson
+
+
+except ImportError:
+
+
+    orjson = None
+
+
+
+
+
+ANALYSIS_SYSTEM_PROMPT = """You are a professional market analyst. Please provide clear, concise analysis based on the provided data. Focus on actionable insights and avoid vague conclusions."""
+
+
+
+
+
+# 提示词的固定部分，调用时只拼接中间的市场数据上下文
+
+
+_ANALYSIS_PROMPT_HEAD = """
+
+
+Please analyze the following market data and provide insights:
+
+
+"""
+
+
+_ANALYSIS_PROMPT_TAIL = """
+
+
+Please provide:
+
+
+1. Market trend analysis
+
+
+2. Key support/resistance levels
+
+
+3. Volume analysis
+
+
+4. Technical indicator interpretation
+
+
+5. Risk assessment
+
+
+6. Trading recommendations
+
+
+"""
+
+
+
+
+
+_OPTION_PROMPT_HEAD = """
+
+
+你是一个经验丰富的期权操盘手，请基于以下市场数据进行分析：
+
+
+
+
+
+"""
+
+
+_OPTION_PROMPT_TAIL = """
+
+
+
+
+
+请从以下维度进行分析：
+
+
+
+
+
+1. 技术面分析
+
+
+   - 当前价格位置与支撑/阻力关系
+
+
+   - 技术指标信号强度（EMA/RSI/MACD）
+
+
+   - 成交量配合情况
+
+
+
+
+
+2. 市场环境分析
+
+
+   - 大盘趋势与VIX水平
+
+
+   - 行业板块表现
+
+
+   - 隐含波动率变化
+
+
+
+
+
+3. 情绪面分析
+
+
+   - 新闻舆情方向
+
+
+   - 社交媒体情绪
+
+
+   - 机构资金流向
+
+
+
+
+
+请给出：
+
+
+1. 交易建议（做多/做空/观望）
+
+
+2. 信号强度评分（1-100）
+
+
+3. 具体操作建议：
+
+
+   - 建议仓位比例
+
+
+   - 止损位置
+
+
+   - 目标价位
+
+
+   - 建议持仓时间
+
+
+4. 风险提示：
+
+
+   - 主要风险点
+
+
+   - 风控建议
+
+
+5. 历史形态对比（如有）
+
+
+
+
+
+请用专业、理性的语气，模拟交易部内部决策报告的风格。
+
+
+"""
+
+
+
+
+
+# 通知模板: 风险/风控列表和历史对比在 format_analysis_for_notification 中预先拼好
+
+
+_NOTIFICATION_TEMPLATE = (
+
+
+    "🤖 AI操盘手分析报告\n\n"
+
+
+    "📊 交易建议: {recommendation}\n"
+
+
+    "💪 信号强度: {confidence}/100\n\n"
+
+
+    "🎯 操作建议:\n"
+
+
+    "- 建议仓位: {position_size}\n"
+
+
+    "- 止损位置: {stop_loss}\n"
+
+
+    "- 目标价位: {target_price}\n"
+
+
+    "- 持仓时间: {holding_period}\n\n"
+
+
+    "⚠️ 风险提示:\n{risks_block}\n"
+
+
+    "🛡️ 风控建议:\n{controls_block}\n"
+
+
+    "{historical_block}"
+
+
+    "📝 分析总结: {analysis_summary}"
+
+
+)
+
+
+_NOTIFICATION_HISTORY = "📈 历史形态对比: {}\n\n"
 
 
 
@@ -70,6 +301,9 @@ class AIAnalyst:
         self.api_key = api_key or os.environ.get("DEEPSEEK_API_KEY")
 
 
+        self.client = DeepSeekClient(api_key=self.api_key)
+
+
         
 
 
@@ -133,13 +367,13 @@ class AIAnalyst:
         
 
 
-    def _build_analysis_context(self, market_data: Dict[str, Any]) -> str:
+    def analyze_market_stream(self, market_data: Dict[str, Any]) -> Iterator[str]:
 
 
         """
 
 
-        Build analysis context
+        Analyze market data, yielding the analysis text as it is generated
 
 
         Args:
@@ -151,460 +385,484 @@ class AIAnalyst:
         Returns:
 
 
-            Formatted context string
+            Iterator over analysis text chunks
 
 
         """
 
 
-        context = "Market Analysis Context:\n\n"
+        context = self._build_analysis_context(market_data)
 
 
-        
+        chunks = self.client.completion(
 
 
-        # Add price data
+            self._analysis_prompt(context),
 
 
-        if "price" in market_data:
+            system_prompt=ANALYSIS_SYSTEM_PROMPT,
 
 
-            context += "Price Data:\n"
+            max_tokens=1000,
 
 
-            context += f"Current: {market_data['price'].get('current', 'N/A')}\n"
+            temperature=0.3,
 
 
-            context += f"Change: {market_data['price'].get('change', 'N/A')}\n"
+            stream=True
 
 
-            context += f"Change %: {market_data['price'].get('change_pct', 'N/A')}\n\n"
+        )
 
 
-            
+        
 
 
-        # Add volume data
+        if isinstance(chunks, dict):
 
 
-        if "volume" in market_data:
+            yield chunks["error"]
 
 
-            context += "Volume Data:\n"
+            return
 
 
-            context += f"Current: {market_data['volume'].get('current', 'N/A')}\n"
+        yield from chunks
 
 
-            context += f"Average: {market_data['volume'].get('average', 'N/A')}\n"
+        
 
 
-            context += f"Change: {market_data['volume'].get('change', 'N/A')}\n\n"
+    def analyze_many(self, market_data_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 
 
-            
+        """
 
 
-        # Add technical indicators
+        Analyze several market data dictionaries concurrently
 
 
-        if "indicators" in market_data:
+        Args:
 
 
-            context += "Technical Indicators:\n"
+            market_data_list: List of market data dictionaries
 
 
-            for name, value in market_data["indicators"].items():
+        Returns:
 
 
-                context += f"{name}: {value}\n"
+            Analysis results, in the same order as the input
 
 
-            context += "\n"
+        """
 
 
-            
+        # Inside a running event loop asyncio.run is not allowed; async callers should await aanalyze_many
 
 
-        # Add market sentiment
+        try:
 
 
-        if "sentiment" in market_data:
+            asyncio.get_running_loop()
 
 
-            context += "Market Sentiment:\n"
+        except RuntimeError:
 
 
-            context += f"Overall: {market_data['sentiment'].get('overall', 'N/A')}\n"
+            return asyncio.run(self.aanalyze_many(market_data_list))
 
 
-            context += f"Strength: {market_data['sentiment'].get('strength', 'N/A')}\n"
+        return [self.analyze_market(market_data) for market_data in market_data_list]
 
 
-            context += f"Trend: {market_data['sentiment'].get('trend', 'N/A')}\n\n"
+        
 
 
-            
+    async def aanalyze_many(self, market_data_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 
 
-        return context
+        """Async counterpart of analyze_many; runs all analyses on the current loop, then releases the async client"""
 
 
-        
+        try:
 
 
-    def _generate_analysis(self, context: str) -> str:
+            return await asyncio.gather(*[self._acall(market_data) for market_data in market_data_list])
 
 
-        """
+        finally:
 
 
-        Generate market analysis
+            await self.client.aclose()
 
 
-        Args:
+            
 
 
-            context: Analysis context
+    async def _acall(self, market_data: Dict[str, Any]) -> Dict[str, Any]:
 
 
-        Returns:
+        """Async counterpart of analyze_market"""
 
 
-            Analysis text
+        context = self._build_analysis_context(market_data)
 
 
-        """
+        response = await self.client.acompletion(
 
 
-        prompt = f"""
+            self._analysis_prompt(context),
 
 
-Please analyze the following market data and provide insights:
+            system_prompt=ANALYSIS_SYSTEM_PROMPT,
 
 
-{context}
+            max_tokens=1000,
 
 
-Please provide:
+            temperature=0.3
 
 
-1. Market trend analysis
+        )
 
 
-2. Key support/resistance levels
+        
 
 
-3. Volume analysis
+        if "error" in response:
 
 
-4. Technical indicator interpretation
+            analysis = response["error"]
 
 
-5. Risk assessment
+        else:
 
 
-6. Trading recommendations
+            analysis = response["choices"][0]["message"]["content"]
 
 
-"""
+        
 
 
-        
+        return {
+
+
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+
+
+            "analysis": analysis,
 
 
-        system_prompt = """You are a professional market analyst. Please provide clear, concise analysis based on the provided data. Focus on actionable insights and avoid vague conclusions."""
+            "raw_data": market_data
+
+
+        }
 
 
         
 
 
-        analysis = get_deepseek_response(
+    def _generate_analysis(self, context: str) -> str:
 
 
-            prompt=prompt,
+        """
 
 
-            system_prompt=system_prompt,
+        Generate market analysis
 
 
-            max_tokens=1000,
+        Args:
 
 
-            temperature=0.3
+            context: Analysis context
 
 
-        )
+        Returns:
 
 
-        
+            Analysis text
 
 
-        return analysis
+        """
 
 
-        
+        analysis = get_deepseek_response(
 
 
-    def _build_analysis_context(self, 
+            prompt=self._analysis_prompt(context),
 
 
-                              symbol: str,
+            system_prompt=ANALYSIS_SYSTEM_PROMPT,
 
 
-                              technical_data: Dict[str, Any],
+            max_tokens=1000,
 
 
-                              market_data: Dict[str, Any],
+            temperature=0.3
 
 
-                              sentiment_data: Dict[str, Any]) -> str:
+        )
 
 
-        """
+        
 
 
-        构建分析上下文
+        return analysis
 
 
-        Args:
+        
 
 
-            symbol: 股票代码
+    def _analysis_prompt(self, context: str) -> str:
 
 
-            technical_data: 技术指标数据
+        """
 
 
-            market_data: 市场数据
+        Build the market analysis prompt
 
 
-            sentiment_data: 情绪数据
+        Args:
+
+
+            context: Analysis context
 
 
         Returns:
 
 
-            格式化后的上下文字符串
+            Prompt text
 
 
         """
 
 
-        context = {
+        return _ANALYSIS_PROMPT_HEAD + context + _ANALYSIS_PROMPT_TAIL
 
 
-            "symbol": symbol,
+        
 
 
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    def _build_analysis_context(self, 
 
 
-            "technical": {
+                              market_data: Dict[str, Any],
 
 
-                "price": technical_data.get("price", 0),
+                              symbol: Optional[str] = None,
 
 
-                "ema_cross": technical_data.get("ema_cross", "无交叉"),
+                              technical_data: Optional[Dict[str, Any]] = None,
 
 
-                "rsi": technical_data.get("rsi", 0),
+                              sentiment_data: Optional[Dict[str, Any]] = None) -> str:
 
 
-                "macd": technical_data.get("macd", 0),
+        """
 
 
-                "volume": technical_data.get("volume", 0),
+        构建分析上下文
 
 
-                "support": technical_data.get("support", 0),
+        Args:
 
 
-                "resistance": technical_data.get("resistance", 0)
+            market_data: 市场数据；未传 symbol 时为 analyze_market 的完整行情字典
 
 
-            },
+                         （price/volume/indicators/sentiment）
 
 
-            "market": {
+            symbol: 股票代码
 
 
-                "sp500_trend": market_data.get("sp500_trend", "未知"),
+            technical_data: 技术指标数据
 
 
-                "vix_level": market_data.get("vix_level", 0),
+            sentiment_data: 情绪数据
 
 
-                "sector_performance": market_data.get("sector_performance", {}),
+        Returns:
 
 
-                "iv_shift": market_data.get("iv_shift", 0)
+            格式化后的上下文字符串
 
 
-            },
+        """
 
 
-            "sentiment": {
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
-                "news_sentiment": sentiment_data.get("news_sentiment", "中性"),
+        
 
 
-                "social_sentiment": sentiment_data.get("social_sentiment", "中性"),
+        if symbol is None:
 
 
-                "institutional_flow": sentiment_data.get("institutional_flow", "未知")
+            context = {"timestamp": timestamp}
 
 
-            }
+            for section in ("price", "volume", "indicators", "sentiment"):
 
 
-        }
+                if section in market_data:
 
 
-        
+                    context[section] = market_data[section]
 
 
-        return json.dumps(context, ensure_ascii=False, indent=2)
+            return self._dump_context(context)
 
 
         
 
 
-    def _build_prompt(self, context: str) -> str:
+        technical_data = technical_data or {}
 
 
-        """
+        sentiment_data = sentiment_data or {}
 
 
-        构建分析提示词
+        context = {
 
 
-        Args:
+            "symbol": symbol,
 
 
-            context: 分析上下文
+            "timestamp": timestamp,
 
 
-        Returns:
+            "technical": {
 
 
-            格式化后的提示词
+                "price": technical_data.get("price", 0),
 
 
-        """
+                "ema_cross": technical_data.get("ema_cross", "无交叉"),
 
 
-        return f"""
+                "rsi": technical_data.get("rsi", 0),
 
 
-你是一个经验丰富的期权操盘手，请基于以下市场数据进行分析：
+                "macd": technical_data.get("macd", 0),
 
 
+                "volume": technical_data.get("volume", 0),
 
 
+                "support": technical_data.get("support", 0),
 
-{context}
 
+                "resistance": technical_data.get("resistance", 0)
 
 
+            },
 
 
-请从以下维度进行分析：
+            "market": {
 
 
+                "sp500_trend": market_data.get("sp500_trend", "未知"),
 
 
+                "vix_level": market_data.get("vix_level", 0),
 
-1. 技术面分析
 
+                "sector_performance": market_data.get("sector_performance", {}),
 
-   - 当前价格位置与支撑/阻力关系
 
+                "iv_shift": market_data.get("iv_shift", 0)
 
-   - 技术指标信号强度（EMA/RSI/MACD）
 
+            },
 
-   - 成交量配合情况
 
+            "sentiment": {
 
 
+                "news_sentiment": sentiment_data.get("news_sentiment", "中性"),
 
 
-2. 市场环境分析
+                "social_sentiment": sentiment_data.get("social_sentiment", "中性"),
 
 
-   - 大盘趋势与VIX水平
+                "institutional_flow": sentiment_data.get("institutional_flow", "未知")
 
 
-   - 行业板块表现
+            }
 
 
-   - 隐含波动率变化
+        }
 
 
+        
 
 
+        return self._dump_context(context)
 
-3. 情绪面分析
 
+        
 
-   - 新闻舆情方向
 
+    @staticmethod
 
-   - 社交媒体情绪
 
+    def _dump_context(context: Dict[str, Any]) -> str:
 
-   - 机构资金流向
 
+        """序列化上下文为缩进 JSON（保留中文字符）"""
 
 
+        if orjson is None:
 
 
-请给出：
+            return json.dumps(context, ensure_ascii=False, indent=2, default=str)
 
 
-1. 交易建议（做多/做空/观望）
+        return orjson.dumps(
 
 
-2. 信号强度评分（1-100）
+            context,
 
 
-3. 具体操作建议：
+            default=str,
 
 
-   - 建议仓位比例
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
 
 
-   - 止损位置
+        ).decode()
 
 
-   - 目标价位
+        
 
 
-   - 建议持仓时间
+    def _build_prompt(self, context: str) -> str:
 
 
-4. 风险提示：
+        """
 
 
-   - 主要风险点
+        构建分析提示词
 
 
-   - 风控建议
+        Args:
 
 
-5. 历史形态对比（如有）
+            context: 分析上下文
+
 
+        Returns:
 
 
+            格式化后的提示词
 
 
-请用专业、理性的语气，模拟交易部内部决策报告的风格。
+        """
 
 
-"""
+        return _OPTION_PROMPT_HEAD + context + _OPTION_PROMPT_TAIL
 
 
         
@@ -823,100 +1081,31 @@ Please provide:
             
 
 
-        message = f"🤖 AI操盘手分析报告\n\n"
-
-
-        
-
-
-        # 交易建议
-
-
-        message += f"📊 交易建议: {analysis['recommendation']}\n"
-
-
-        message += f"💪 信号强度: {analysis['confidence']}/100\n\n"
-
-
-        
-
-
-        # 操作建议
-
-
-        message += "🎯 操作建议:\n"
-
-
-        message += f"- 建议仓位: {analysis['position_size']}\n"
-
-
-        message += f"- 止损位置: {analysis['stop_loss']}\n"
-
-
-        message += f"- 目标价位: {analysis['target_price']}\n"
-
-
-        message += f"- 持仓时间: {analysis['holding_period']}\n\n"
-
-
-        
-
-
-        # 风险提示
+        fields = {
 
 
-        message += "⚠️ 风险提示:\n"
+            **analysis,
 
 
-        for risk in analysis['risks']:
+            'risks_block': "".join(f"- {risk}\n" for risk in analysis['risks']),
 
 
-            message += f"- {risk}\n"
+            'controls_block': "".join(f"- {control}\n" for control in analysis['risk_control']),
 
 
-        message += "\n"
-
-
-        
-
+            'historical_block': (
 
-        # 风控建议
 
+                _NOTIFICATION_HISTORY.format(analysis['historical_comparison'])
 
-        message += "🛡️ 风控建议:\n"
 
+                if 'historical_comparison' in analysis else ""
 
-        for control in analysis['risk_control']:
-
-
-            message += f"- {control}\n"
-
-
-        message += "\n"
-
-
-        
 
+            ),
 
-        # 历史对比
 
-
-        if 'historical_comparison' in analysis:
-
-
-            message += f"📈 历史形态对比: {analysis['historical_comparison']}\n\n"
-
-
-            
-
-
-        # 分析总结
-
-
-        message += f"📝 分析总结: {analysis['analysis_summary']}"
-
-
-        
+        }
 
 
-        return message 
\ No newline at end of file
+        return _NOTIFICATION_TEMPLATE.format_map(fields) 
\ No newline at end of file
@@ -1,29 +1,183 @@
 from typing import Dict, Any, Optional, List
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import copy
+import logging
 import os
 import json
+import random
+import threading
+import time
 import requests
+from dataclasses import asdict, dataclass, replace
 from datetime import datetime
 from dotenv import load_dotenv
+from .ai.session import create_session, dumps, loads
+from .response_cache import ResponseCache
 from .preset_strategy_prompt import PresetStrategyPrompt, StrategyPromptContext, get_strategy_preset
+from .prompt_compactor import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# .env 只在导入时读取一次
+load_dotenv()
+_API_KEY = os.getenv('DEEPSEEK_API_KEY')
+_HEADERS = (
+    {"Authorization": f"Bearer {_API_KEY}", "Content-Type": "application/json"}
+    if _API_KEY else {"Content-Type": "application/json"}
+)
+
+# (连接超时, 读取超时)，LLM 生成较慢，读取超时放宽
+_REQUEST_TIMEOUT = (3.05, 60)
+
+# 需要退避重试的 HTTP 状态码及最大重试次数
+_RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+_MAX_RETRIES = 3
+
+class _RateLimiter:
+    """按每分钟请求数 (RPM) 和 token 数 (TPM) 限流的令牌桶，线程安全"""
+    
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self, tokens: int) -> float:
+        """
+        预占一个请求和 tokens 个 token
+        Returns:
+            发送请求前需要等待的秒数
+        """
+        tokens = min(tokens, self.tpm)
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60) - 1
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60) - tokens
+            # 余额为负时，等待其恢复到 0 所需的时间
+            return max(0.0, -self._requests * 60 / self.rpm, -self._tokens * 60 / self.tpm)
+    
+    def acquire(self, tokens: int):
+        """阻塞直到可以发送消耗 tokens 个 token 的请求"""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+# 进程内所有 AIAnalyst 共享同一个限流器
+_RATE_LIMITER = _RateLimiter(
+    rpm=int(os.getenv("DEEPSEEK_RPM", "60")),
+    tpm=int(os.getenv("DEEPSEEK_TPM", "120000"))
+)
+
+# 没有 API key 时返回的模拟分析结果
+_MOCK_ANALYSIS = {
+    "action": "Hold",
+    "confidence": 0.5,
+    "risk_level": "MEDIUM",
+    "explanation": "API key not available. This is a mock response.",
+    "suggested_strategy": {
+        "entry_price": 0,
+        "target_price": 0,
+        "stop_loss": 0,
+        "position_size": "SMALL"
+    },
+    "risk_factors": ["API key not available"]
+}
+
+# 从市场数据中提取的技术指标字段
+_INDICATOR_KEYS = ('RSI', 'MACD', 'BB_Upper', 'BB_Lower', 'SMA_20', 'SMA_50', 'SMA_200', 'Volatility')
+
+# 风险等级排序，数值越小越保守
+_RISK_LEVEL_RANK = {"LOW": 0, "MEDIUM": 1, "HIGH": 2}
+
+# 共识偏向到信号方向的映射，其余为 NEUTRAL
+_BIAS_MAP = {"STRONG": "BULLISH", "BULLISH": "BULLISH", "WEAK": "BEARISH", "BEARISH": "BEARISH"}
+
+# 风险收益比计算用的仓位和风险等级权重
+_POSITION_SIZE_MAP = {"SMALL": 1, "MEDIUM": 2, "LARGE": 3}
+_RISK_LEVEL_MAP = {"LOW": 3, "MEDIUM": 2, "HIGH": 1}
+
+# 单次回复允许的最大 token 数
+_MAX_OUTPUT_TOKENS = 8000
+
+# 合并多个分析请求时的说明，后面依次接 "1) ...", "2) ..."
+_MULTI_PROMPT_HEAD = (
+    "以下共有 {count} 个相互独立的分析请求。请返回一个 JSON 数组，"
+    "第 i 个元素是第 i 个请求要求的 JSON 结果，只返回 JSON 数组，不要其他内容。\n"
+)
+
+# 场景固定时让模型按时间周期分别作答，接在完整提示词之后
+_PER_TIMEFRAME_PROMPT_TAIL = (
+    "\n请分别针对以下每个时间周期给出分析：{timeframes}。返回一个 JSON 对象，"
+    "键为时间周期，值为该时间周期按上述格式要求的 JSON 结果，只返回该 JSON 对象，不要其他内容。"
+)
+
+@dataclass
+class MarketAnalysis:
+    """市场状况"""
+    __slots__ = ("scenario", "market_sentiment", "volatility", "sector_strength")
+    scenario: str
+    market_sentiment: str
+    volatility: str
+    sector_strength: str
+
+@dataclass
+class RiskAssessment:
+    """风险评估"""
+    __slots__ = ("risk_factors", "confidence")
+    risk_factors: List[Any]
+    confidence: float
+
+@dataclass
+class AnalysisResult:
+    """单次分析结果，发送通知或合并结果时才用 asdict 转为字典"""
+    __slots__ = ("timestamp", "symbol", "market_analysis", "strategy_analysis", "risk_assessment", "llm_analysis")
+    timestamp: str
+    symbol: str
+    market_analysis: MarketAnalysis
+    strategy_analysis: Dict[str, Any]
+    risk_assessment: RiskAssessment
+    llm_analysis: Dict[str, Any]
 
 class AIAnalyst:
     """增强版 AI 分析器"""
     
-    def __init__(self, notifier_dispatcher=None):
-        load_dotenv()
-        self.api_key = os.getenv('DEEPSEEK_API_KEY')
+    def __init__(self, notifier_dispatcher=None, cache_size: int = 1024, cache_ttl: float = 300):
+        """
+        Args:
+            notifier_dispatcher: 通知调度器
+            cache_size: 缓存的 LLM 响应数量上限
+            cache_ttl: 相同提示词的响应缓存时间（秒）
+        """
+        self.api_key = _API_KEY
         self.api_url = "https://api.deepseek.com/v1/chat/completions"
+        self.api_base = self.api_url.rsplit("/chat/completions", 1)[0]
+        self.headers = _HEADERS
         
+        if not self.api_key:
+            logger.warning("DEEPSEEK_API_KEY not found in .env file. AI analysis will be limited.")
+        
+        self.session = create_session(self.headers, pool_maxsize=16, backoff_factor=0.5)
+        
+        # 是否有 API key 在初始化时确定，之后每次调用不再判断
         if self.api_key:
-            self.headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
+            self._call_deepseek_api = self._call_deepseek_api_real
+            self._call_deepseek_api_async = self._call_deepseek_api_async_real
         else:
-            print("Warning: DEEPSEEK_API_KEY not found in .env file. AI analysis will be limited.")
-            self.headers = {
-                "Content-Type": "application/json"
-            }
+            self._call_deepseek_api = self._call_deepseek_api_mock
+            self._call_deepseek_api_async = self._call_deepseek_api_async_mock
+        self._rate_limiter = _RATE_LIMITER
+        
+        # 最近一次 API 调用失败的原因，调用成功时清空
+        self.last_error: Optional[str] = None
+        
+        # LLM 响应缓存，按 LRU 淘汰
+        self._response_cache = ResponseCache(cache_size, cache_ttl)
         
         # 初始化提示词生成器
         self.prompt_builder = PresetStrategyPrompt()
@@ -34,68 +188,192 @@ class AIAnalyst:
         # 通知调度器
         self.notifier_dispatcher = notifier_dispatcher
         
-        # 定义分析结果的数据结构
-        self.analysis_result = {
-            "timestamp": "",
-            "symbol": "",
-            "market_analysis": {},
-            "strategy_analysis": {},
-            "risk_assessment": {},
-            "llm_analysis": {}
-        }
+        # 最近一次的分析结果
+        self.analysis_result: Optional[AnalysisResult] = None
     
     def set_strategy_preset(self, preset_name: str):
         """设置预设策略配置"""
         preset = get_strategy_preset(preset_name)
         if preset:
             self.current_preset = preset
-            print(f"Set strategy preset: {preset.get('name')} - {preset.get('description')}")
+            logger.debug("Set strategy preset: %s - %s", preset.get('name'), preset.get('description'))
             return True
         else:
-            print(f"Strategy preset '{preset_name}' not found")
+            logger.warning("Strategy preset '%s' not found", preset_name)
             return False
     
-    def _call_deepseek_api(self, prompt: str) -> Optional[Dict[str, Any]]:
+    def _call_deepseek_api_real(self, prompt: str, max_tokens: int = 2000) -> Optional[Dict[str, Any]]:
         """调用 DeepSeek API"""
         try:
-            # Check if API key is available
-            if not self.api_key:
-                print("DeepSeek API key not available. Returning mock analysis.")
-                # Return a mock response for testing
-                return {
-                    "action": "Hold",
-                    "confidence": 0.5,
-                    "risk_level": "MEDIUM",
-                    "explanation": "API key not available. This is a mock response.",
-                    "suggested_strategy": {
-                        "entry_price": 0,
-                        "target_price": 0,
-                        "stop_loss": 0,
-                        "position_size": "SMALL"
-                    },
-                    "risk_factors": ["API key not available"]
-                }
+            cached = self._response_cache.get(prompt)
+            if cached is not None:
+                return cached
                 
-            payload = {
-                "model": "deepseek-ai/DeepSeek-V3",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.7,
-                "max_tokens": 2000
-            }
+            payload = self._build_payload(prompt, max_tokens=max_tokens)
+            payload["stream"] = True
+            # 429/5xx 的指数退避由 session 的 Retry 处理
+            self._rate_limiter.acquire(self._estimate_tokens(prompt, payload))
+            with self.session.post(self.api_url, data=dumps(payload).encode(), timeout=_REQUEST_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+                content = self._read_stream(response)
             
-            response = requests.post(self.api_url, headers=self.headers, json=payload)
+            result = loads(content)
+            self._response_cache.put(prompt, result)
+            self.last_error = None
+            return result
+            
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning("Error calling DeepSeek API: %s", e)
+            return None
+    
+    def _call_deepseek_api_mock(self, prompt: str, max_tokens: int = 2000) -> Optional[Dict[str, Any]]:
+        """没有 API key 时代替 _call_deepseek_api"""
+        return self._mock_analysis()
+    
+    async def _call_deepseek_api_async_real(self, prompt: str, client) -> Optional[Dict[str, Any]]:
+        """异步调用 DeepSeek API，client 为共享的 httpx.AsyncClient"""
+        try:
+            cached = self._response_cache.get(prompt)
+            if cached is not None:
+                return cached
+                
+            payload = self._build_payload(prompt)
+            body = dumps(payload).encode()
+            tokens = self._estimate_tokens(prompt, payload)
+            
+            # httpx 没有内置重试，对 429/5xx 做有限次数的指数退避
+            for attempt in range(_MAX_RETRIES + 1):
+                await asyncio.sleep(self._rate_limiter.reserve(tokens))
+                response = await client.post(self.api_url, headers=self.headers, content=body)
+                if response.status_code not in _RETRY_STATUS or attempt == _MAX_RETRIES:
+                    break
+                await asyncio.sleep(min(2 ** attempt + random.random(), 30))
             response.raise_for_status()
             
-            result = response.json()
-            content = result['choices'][0]['message']['content']
+            result = self._parse_response(loads(response.content))
+            self._response_cache.put(prompt, result)
+            self.last_error = None
+            return result
+            
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning("Error calling DeepSeek API: %s", e)
+            return None
+    
+    async def _call_deepseek_api_async_mock(self, prompt: str, client) -> Optional[Dict[str, Any]]:
+        """没有 API key 时代替 _call_deepseek_api_async"""
+        return self._mock_analysis()
+    
+    def _call_deepseek_api_multi(self, prompts: List[str]) -> Optional[List[Optional[Dict[str, Any]]]]:
+        """
+        用一次请求完成多个分析
+        Returns:
+            与 prompts 顺序一致的结果列表；返回内容无法解析为等长 JSON 数组时返回 None
+        """
+        if not self.api_key:
+            return [self._mock_analysis() for _ in prompts]
+        
+        # 只请求缓存中没有的提示词
+        results = [self._response_cache.get(p) for p in prompts]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+        if len(missing) == 1:
+            results[missing[0]] = self._call_deepseek_api(prompts[missing[0]])
+            return results
+        
+        try:
+            prompt = _MULTI_PROMPT_HEAD.format(count=len(missing)) + "".join(
+                f"\n{n}) {prompts[i]}\n" for n, i in enumerate(missing, 1)
+            )
+            payload = self._build_payload(prompt, max_tokens=min(2000 * len(missing), _MAX_OUTPUT_TOKENS))
+            
+            self._rate_limiter.acquire(self._estimate_tokens(prompt, payload))
+            response = self.session.post(self.api_url, data=dumps(payload).encode(), timeout=_REQUEST_TIMEOUT)
+            response.raise_for_status()
             
-            # 解析返回的 JSON 字符串
-            return json.loads(content)
+            answers = self._parse_response(loads(response.content))
+            if not isinstance(answers, list) or len(answers) != len(missing):
+                logger.warning("Batched DeepSeek response does not match the request count")
+                return None
+            for i, answer in zip(missing, answers):
+                if isinstance(answer, dict):
+                    self._response_cache.put(prompts[i], answer)
+                    results[i] = answer
+            self.last_error = None
+            return results
             
         except Exception as e:
-            print(f"Error calling DeepSeek API: {str(e)}")
+            self.last_error = str(e)
+            logger.warning("Error calling DeepSeek API: %s", e)
             return None
     
+    def _call_deepseek_api_fused(self, 
+                                 context: StrategyPromptContext, 
+                                 scenario: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        场景固定时用一个提示词分析所有时间周期
+        Returns:
+            与 context.timeframes 顺序一致的结果列表；返回内容缺少某个时间周期时返回 None
+        """
+        if not self.api_key:
+            return [self._mock_analysis() for _ in context.timeframes]
+        
+        prompt = self.prompt_builder.build_prompt(context, scenario) + _PER_TIMEFRAME_PROMPT_TAIL.format(
+            timeframes=", ".join(context.timeframes)
+        )
+        answers = self._call_deepseek_api(
+            prompt, max_tokens=min(2000 * len(context.timeframes), _MAX_OUTPUT_TOKENS)
+        )
+        if not isinstance(answers, dict) or not all(
+            isinstance(answers.get(timeframe), dict) for timeframe in context.timeframes
+        ):
+            return None
+        return [answers[timeframe] for timeframe in context.timeframes]
+    
+    @staticmethod
+    def _estimate_tokens(prompt: str, payload: Dict[str, Any]) -> int:
+        """估算一次请求消耗的 token 数（输入 + 最大输出）"""
+        return count_tokens(prompt) + payload["max_tokens"]
+    
+    def _build_payload(self, prompt: str, max_tokens: int = 2000) -> Dict[str, Any]:
+        """构建请求体"""
+        return {
+            "model": "deepseek-ai/DeepSeek-V3",
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.7,
+            "max_tokens": max_tokens
+        }
+    
+    @staticmethod
+    def _read_stream(response: requests.Response) -> str:
+        """边接收边解析 SSE 数据块，拼接出完整的回复内容"""
+        parts = []
+        for line in response.iter_lines():
+            if not line.startswith(b"data: "):
+                continue
+            data = line[6:]
+            if data == b"[DONE]":
+                break
+            choices = loads(data).get("choices")
+            if choices:
+                parts.append(choices[0].get("delta", {}).get("content") or "")
+        return "".join(parts)
+    
+    @staticmethod
+    def _parse_response(result: Dict[str, Any]) -> Dict[str, Any]:
+        """解析返回的 JSON 字符串"""
+        content = result['choices'][0]['message']['content']
+        return loads(content)
+    
+    @staticmethod
+    def _mock_analysis() -> Dict[str, Any]:
+        """没有 API key 时返回的模拟分析结果"""
+        logger.debug("DeepSeek API key not available. Returning mock analysis.")
+        # 调用方可能修改返回值，返回副本
+        return copy.deepcopy(_MOCK_ANALYSIS)
+    
     def _determine_market_scenario(self, context: StrategyPromptContext) -> str:
         """根据市场数据确定最适合的策略场景"""
         # 如果已设置预设策略，则使用该策略
@@ -110,7 +388,7 @@ class AIAnalyst:
         else:
             return "TREND_FOLLOWING"
     
-    def analyze_market(self, context: StrategyPromptContext) -> Optional[Dict[str, Any]]:
+    def analyze_market(self, context: StrategyPromptContext) -> Optional[AnalysisResult]:
         """分析市场数据"""
         try:
             # 确定市场场景
@@ -123,61 +401,65 @@ class AIAnalyst:
             analysis_result = self._call_deepseek_api(prompt)
             
             if analysis_result:
-                # 更新分析结果
-                self.analysis_result = {
-                    "timestamp": datetime.now().isoformat(),
-                    "symbol": context.symbol,
-                    "market_analysis": {
-                        "scenario": scenario,
-                        "market_sentiment": context.market_sentiment,
-                        "volatility": context.volatility,
-                        "sector_strength": context.sector_strength
-                    },
-                    "strategy_analysis": analysis_result.get("suggested_strategy", {}),
-                    "risk_assessment": {
-                        "risk_factors": analysis_result.get("risk_factors", []),
-                        "confidence": analysis_result.get("confidence", 0)
-                    },
-                    "llm_analysis": analysis_result
-                }
-                
-                # 如果有通知调度器，则发送通知
-                if self.notifier_dispatcher:
-                    self.notifier_dispatcher.dispatch_ai_insight(self.analysis_result)
-                
-                return self.analysis_result
+                return self._record_analysis(context, scenario, analysis_result)
             
             return None
             
         except Exception as e:
-            print(f"Error in market analysis: {str(e)}")
+            logger.warning("Error in market analysis: %s", e)
             return None
     
+    def _record_analysis(self, 
+                         context: StrategyPromptContext, 
+                         scenario: str, 
+                         analysis_result: Dict[str, Any]) -> AnalysisResult:
+        """更新分析结果并发送通知"""
+        self.analysis_result = AnalysisResult(
+            timestamp=datetime.now().isoformat(),
+            symbol=context.symbol,
+            market_analysis=MarketAnalysis(
+                scenario=scenario,
+                market_sentiment=context.market_sentiment,
+                volatility=context.volatility,
+                sector_strength=context.sector_strength
+            ),
+            strategy_analysis=analysis_result.get("suggested_strategy", {}),
+            risk_assessment=RiskAssessment(
+                risk_factors=analysis_result.get("risk_factors", []),
+                confidence=analysis_result.get("confidence", 0)
+            ),
+            llm_analysis=analysis_result
+        )
+        
+        # 如果有通知调度器，则发送通知
+        if self.notifier_dispatcher:
+            self.notifier_dispatcher.dispatch_ai_insight(asdict(self.analysis_result))
+        
+        return self.analysis_result
+    
     def analyze_multiple_timeframes(self, context: StrategyPromptContext) -> Optional[Dict[str, Any]]:
         """分析多个时间周期"""
         try:
-            results = {}
+            contexts = [self._timeframe_context(context, timeframe) for timeframe in context.timeframes]
+            scenarios = [self._determine_market_scenario(c) for c in contexts]
             
-            # 对每个时间周期进行分析
-            for timeframe in context.timeframes:
-                # 更新上下文中的时间周期
-                timeframe_context = StrategyPromptContext(
-                    symbol=context.symbol,
-                    timeframes=[timeframe],
-                    market_sentiment=context.market_sentiment,
-                    volatility=context.volatility,
-                    news_summary=context.news_summary,
-                    sector_strength=context.sector_strength,
-                    technical_indicators=context.technical_indicators,
-                    volume_profile=context.volume_profile,
-                    options_chain=context.options_chain,
-                    ask=context.ask
-                )
+            responses = None
+            if self.current_preset and 'scenario' in self.current_preset and len(context.timeframes) > 1:
+                # 预设策略固定了场景，各时间周期的提示词只差时间周期字段，用一个提示词按周期作答
+                responses = self._call_deepseek_api_fused(context, scenarios[0])
+            
+            if responses is None:
+                prompts = [self.prompt_builder.build_prompt(c, scenario) for c, scenario in zip(contexts, scenarios)]
                 
-                # 分析当前时间周期
-                result = self.analyze_market(timeframe_context)
-                if result:
-                    results[timeframe] = result
+                # 所有时间周期合并为一次请求；批量结果无法解析时改为逐个并发请求
+                responses = self._call_deepseek_api_multi(prompts)
+                if responses is None:
+                    responses = self._call_deepseek_api_each(prompts)
+            
+            results = {}
+            for timeframe, c, scenario, analysis_result in zip(context.timeframes, contexts, scenarios, responses):
+                if analysis_result:
+                    results[timeframe] = self._record_analysis(c, scenario, analysis_result)
             
             if results:
                 # 合并多个时间周期的分析结果
@@ -192,10 +474,141 @@ class AIAnalyst:
             return None
             
         except Exception as e:
-            print(f"Error in multiple timeframe analysis: {str(e)}")
+            logger.warning("Error in multiple timeframe analysis: %s", e)
+            return None
+    
+    def _timeframe_context(self, context: StrategyPromptContext, timeframe: str) -> StrategyPromptContext:
+        """替换为单个时间周期的浅拷贝，其余字段与原上下文共享"""
+        return replace(context, timeframes=(timeframe,))
+    
+    def _call_deepseek_api_each(self, prompts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """逐个请求多个提示词：没有运行中的事件循环时并发发送，否则（如在异步处理函数中调用）依次同步请求"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._gather_deepseek_api(prompts))
+        return [self._call_deepseek_api(prompt) for prompt in prompts]
+    
+    async def _gather_deepseek_api(self, prompts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """通过共享的连接池并发发送多个请求"""
+        import httpx
+        
+        limits = httpx.Limits(max_connections=10, max_keepalive_connections=10)
+        async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+            return await asyncio.gather(
+                *[self._call_deepseek_api_async(prompt, client) for prompt in prompts]
+            )
+    
+    def analyze_batch(self, 
+                      contexts: List[StrategyPromptContext], 
+                      poll_interval: float = 5.0, 
+                      timeout: float = 24 * 3600) -> Optional[Dict[str, AnalysisResult]]:
+        """
+        通过 OpenAI 兼容的 Batch API 离线分析多个上下文，每个时间周期一条请求
+        适合对延迟不敏感的批量任务（批量价格更低且不占用同步接口的 RPM），服务商需支持 /files 与 /batches
+        Args:
+            contexts: 分析上下文列表
+            poll_interval: 首次轮询间隔（秒），之后指数增长，最长 60 秒
+            timeout: 等待批处理完成的最长时间（秒）
+        Returns:
+            {"symbol:timeframe": 分析结果}，批处理失败时返回 None
+        """
+        entries = {}
+        for context in contexts:
+            for timeframe in context.timeframes:
+                timeframe_context = self._timeframe_context(context, timeframe)
+                scenario = self._determine_market_scenario(timeframe_context)
+                prompt = self.prompt_builder.build_prompt(timeframe_context, scenario)
+                entries[f"{context.symbol}:{timeframe}"] = (timeframe_context, scenario, prompt)
+        
+        if not self.api_key:
+            return {
+                custom_id: self._record_analysis(c, scenario, self._mock_analysis())
+                for custom_id, (c, scenario, _) in entries.items()
+            }
+        
+        try:
+            lines = "".join(
+                dumps({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": self._build_payload(prompt)
+                }) + "\n"
+                for custom_id, (_, _, prompt) in entries.items()
+            )
+            
+            # 上传文件使用 multipart，去掉 session 默认的 JSON Content-Type
+            response = self.session.post(
+                f"{self.api_base}/files",
+                files={"file": ("batch.jsonl", lines.encode(), "application/jsonl")},
+                data={"purpose": "batch"},
+                headers={"Content-Type": None},
+                timeout=_REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            input_file_id = loads(response.content)["id"]
+            
+            response = self.session.post(
+                f"{self.api_base}/batches",
+                data=dumps({
+                    "input_file_id": input_file_id,
+                    "endpoint": "/v1/chat/completions",
+                    "completion_window": "24h"
+                }).encode(),
+                timeout=_REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            batch = loads(response.content)
+            
+            # 指数退避轮询批处理状态
+            deadline = time.monotonic() + timeout
+            interval = poll_interval
+            while batch["status"] not in ("completed", "failed", "expired", "cancelled"):
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Batch {batch['id']} not finished after {timeout}s")
+                time.sleep(interval)
+                interval = min(interval * 2, 60)
+                response = self.session.get(f"{self.api_base}/batches/{batch['id']}", timeout=_REQUEST_TIMEOUT)
+                response.raise_for_status()
+                batch = loads(response.content)
+            
+            if batch["status"] != "completed":
+                raise RuntimeError(f"Batch {batch['id']} ended with status {batch['status']}")
+            
+            response = self.session.get(
+                f"{self.api_base}/files/{batch['output_file_id']}/content",
+                timeout=_REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            
+            results = {}
+            for line in response.content.splitlines():
+                if not line.strip():
+                    continue
+                item = loads(line)
+                custom_id = item.get("custom_id")
+                body = (item.get("response") or {}).get("body")
+                if custom_id not in entries or not body:
+                    continue
+                try:
+                    analysis_result = self._parse_response(body)
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    logger.warning("Error parsing batch result %s: %s", custom_id, e)
+                    continue
+                timeframe_context, scenario, prompt = entries[custom_id]
+                self._response_cache.put(prompt, analysis_result)
+                results[custom_id] = self._record_analysis(timeframe_context, scenario, analysis_result)
+            
+            self.last_error = None
+            return results
+            
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning("Error in batch analysis: %s", e)
             return None
     
-    def analyze(self, symbol: str, market_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def analyze(self, symbol: str, market_data: Dict[str, Any]) -> Optional[AnalysisResult]:
         """分析单一股票市场数据，适配 StrategyExecutor"""
         try:
             # 从市场数据创建分析上下文
@@ -205,23 +618,38 @@ class AIAnalyst:
             return self.analyze_market(context)
             
         except Exception as e:
-            print(f"Error analyzing market data: {str(e)}")
+            logger.warning("Error analyzing market data: %s", e)
             return None
     
+    def analyze_many(self, symbols_data: Dict[str, Dict[str, Any]], max_workers: int = 8) -> Dict[str, Optional[AnalysisResult]]:
+        """
+        并发分析多只股票，请求等待网络期间会释放 GIL
+        Args:
+            symbols_data: {股票代码: 市场数据}
+            max_workers: 并发线程数，不应超过 session 连接池大小
+        Returns:
+            {股票代码: 分析结果}
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.analyze, symbol, data): symbol
+                for symbol, data in symbols_data.items()
+            }
+            return {futures[future]: future.result() for future in as_completed(futures)}
+    
     def _create_context_from_market_data(self, symbol: str, data: Dict[str, Any]) -> StrategyPromptContext:
         """从市场数据创建分析上下文"""
         # 提取技术指标
         technical_indicators = {}
+        last_row = None
+        columns = frozenset()
         if isinstance(data, dict):
-            for key in ['RSI', 'MACD', 'BB_Upper', 'BB_Lower', 'SMA_20', 'SMA_50', 'SMA_200', 'Volatility']:
-                if key in data:
-                    technical_indicators[key] = float(data[key])
+            technical_indicators = {key: float(data[key]) for key in _INDICATOR_KEYS if key in data}
         elif hasattr(data, 'iloc') and len(data) > 0:
-            # pandas DataFrame
+            # pandas DataFrame：一次取出最后一行和列名集合，后面复用
             last_row = data.iloc[-1]
-            for col in data.columns:
-                if col in ['RSI', 'MACD', 'BB_Upper', 'BB_Lower', 'SMA_20', 'SMA_50', 'SMA_200', 'Volatility']:
-                    technical_indicators[col] = float(last_row[col])
+            columns = frozenset(data.columns)
+            technical_indicators = {key: float(last_row[key]) for key in _INDICATOR_KEYS if key in columns}
         
         # 提取成交量数据
         volume_profile = {
@@ -232,9 +660,8 @@ class AIAnalyst:
         
         if isinstance(data, dict) and 'Volume' in data:
             volume_profile["relative_volume"] = float(data['Volume']) / data.get('Volume_SMA20', 1.0)
-        elif hasattr(data, 'iloc') and 'Volume' in data.columns:
-            if 'Volume_SMA20' in data.columns:
-                volume_profile["relative_volume"] = float(data.iloc[-1]['Volume']) / data.iloc[-1]['Volume_SMA20']
+        elif 'Volume' in columns and 'Volume_SMA20' in columns:
+            volume_profile["relative_volume"] = float(last_row['Volume']) / float(last_row['Volume_SMA20'])
         
         # 创建上下文
         context = StrategyPromptContext(
@@ -252,64 +679,60 @@ class AIAnalyst:
         
         return context
     
-    def _merge_timeframe_analysis(self, results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    def _merge_timeframe_analysis(self, results: Dict[str, AnalysisResult]) -> Dict[str, Any]:
         """合并多个时间周期的分析结果"""
         try:
-            # 初始化合并结果
+            # 初始化合并结果，各时间周期的结果转为字典以便序列化和发送通知
             merged = {
                 "timestamp": datetime.now().isoformat(),
-                "symbol": next(iter(results.values())).get("symbol", "Unknown"),
-                "timeframe_analysis": results,
-                "consensus": {
-                    "bias": self._get_consensus_bias(results),
-                    "confidence": self._get_consensus_confidence(results),
-                    "strategy": self._get_consensus_strategy(results)
-                }
+                "symbol": next(iter(results.values())).symbol,
+                "timeframe_analysis": {timeframe: asdict(result) for timeframe, result in results.items()},
+                "consensus": self._compute_consensus(results)
             }
             
             return merged
             
         except Exception as e:
-            print(f"Error merging timeframe analysis: {str(e)}")
+            logger.warning("Error merging timeframe analysis: %s", e)
             return None
     
-    def _get_consensus_bias(self, results: Dict[str, Dict[str, Any]]) -> str:
-        """获取多个时间周期的市场偏向共识"""
-        biases = []
-        for result in results.values():
-            if "llm_analysis" in result:
-                analysis = result["llm_analysis"]
-                if "trend_analysis" in analysis:
-                    biases.append(analysis["trend_analysis"].get("strength", "NEUTRAL"))
-                elif "breakout_analysis" in analysis:
-                    biases.append(analysis["breakout_analysis"].get("type", "NEUTRAL"))
-                elif "reversal_analysis" in analysis:
-                    biases.append(analysis["reversal_analysis"].get("type", "NEUTRAL"))
+    def _compute_consensus(self, results: Dict[str, AnalysisResult]) -> Dict[str, Any]:
+        """
+        一次遍历计算多个时间周期的共识
+        Returns:
+            bias: 最常见的市场偏向
+            confidence: 平均置信度
+            strategy: 风险等级最低的策略
+        """
+        biases = Counter()
+        confidence_sum = 0
+        confidence_count = 0
+        strategy = {}
+        strategy_risk = None
         
-        # 返回最常见的偏向
-        return max(set(biases), key=biases.count) if biases else "NEUTRAL"
-    
-    def _get_consensus_confidence(self, results: Dict[str, Dict[str, Any]]) -> float:
-        """获取多个时间周期的置信度共识"""
-        confidences = []
         for result in results.values():
-            if "risk_assessment" in result:
-                confidences.append(result["risk_assessment"].get("confidence", 0))
-        
-        # 返回平均置信度
-        return sum(confidences) / len(confidences) if confidences else 0
-    
-    def _get_consensus_strategy(self, results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
-        """获取多个时间周期的策略共识"""
-        strategies = []
-        for result in results.values():
-            if "strategy_analysis" in result:
-                strategies.append(result["strategy_analysis"])
+            analysis = result.llm_analysis
+            if "trend_analysis" in analysis:
+                biases[analysis["trend_analysis"].get("strength", "NEUTRAL")] += 1
+            elif "breakout_analysis" in analysis:
+                biases[analysis["breakout_analysis"].get("type", "NEUTRAL")] += 1
+            elif "reversal_analysis" in analysis:
+                biases[analysis["reversal_analysis"].get("type", "NEUTRAL")] += 1
+            
+            confidence_sum += result.risk_assessment.confidence
+            confidence_count += 1
+            
+            # 按风险等级数值比较，取最保守的策略
+            risk = _RISK_LEVEL_RANK.get(result.strategy_analysis.get("risk_level", "HIGH"), _RISK_LEVEL_RANK["HIGH"])
+            if strategy_risk is None or risk < strategy_risk:
+                strategy = result.strategy_analysis
+                strategy_risk = risk
         
-        # 返回最保守的策略
-        if strategies:
-            return min(strategies, key=lambda x: x.get("risk_level", "HIGH"))
-        return {}
+        return {
+            "bias": biases.most_common(1)[0][0] if biases else "NEUTRAL",
+            "confidence": confidence_sum / confidence_count if confidence_count else 0,
+            "strategy": strategy
+        }
     
     def _send_consensus_analysis(self, merged_analysis: Dict[str, Any]) -> None:
         """发送多时间周期分析共识结果"""
@@ -327,7 +750,7 @@ class AIAnalyst:
             "type": "multi_timeframe_analysis",
             "symbol": symbol,
             "strategy": strategy.get("type", "Unknown"),
-            "direction": "BULLISH" if bias in ["STRONG", "BULLISH"] else "BEARISH" if bias in ["WEAK", "BEARISH"] else "NEUTRAL",
+            "direction": _BIAS_MAP.get(bias, "NEUTRAL"),
             "confidence": confidence,
             "price": 0,  # 需要从其他地方获取当前价格
             "ai_insight": self._extract_consensus_insight(merged_analysis),
@@ -355,11 +778,8 @@ class AIAnalyst:
         """计算风险收益比"""
         # 简单实现，实际应用中需要更复杂的计算
         if "position_size" in strategy and "risk_level" in strategy:
-            position_size_map = {"SMALL": 1, "MEDIUM": 2, "LARGE": 3}
-            risk_level_map = {"LOW": 3, "MEDIUM": 2, "HIGH": 1}
-            
-            position_size = position_size_map.get(strategy.get("position_size", "MEDIUM"), 2)
-            risk_level = risk_level_map.get(strategy.get("risk_level", "MEDIUM"), 2)
+            position_size = _POSITION_SIZE_MAP.get(strategy["position_size"], 2)
+            risk_level = _RISK_LEVEL_MAP.get(strategy["risk_level"], 2)
             
             return position_size * risk_level / 2
         
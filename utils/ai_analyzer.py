@@ -4,60 +4,116 @@ AI-powered market analysis module using SiliconFlow API
 
 import os
 from typing import Dict, Optional, Any
-import requests
 import pandas as pd
 import json
 from datetime import datetime
 from dotenv import load_dotenv
+from utils.ai.session import create_session, dumps, loads
+from utils.response_cache import ResponseCache
+from utils.prompt_compactor import compact_json, frame_to_csv
+
+# .env 只在导入时读取一次
+load_dotenv()
+_API_KEY = os.getenv('DEEPSEEK_API_KEY')
+_HEADERS = (
+    {"Authorization": f"Bearer {_API_KEY}", "Content-Type": "application/json"}
+    if _API_KEY else {"Content-Type": "application/json"}
+)
+
+# (连接超时, 读取超时)，LLM 生成较慢，读取超时放宽
+_REQUEST_TIMEOUT = (3.05, 60)
+
+# AIAnalyzer._build_prompt 的固定部分
+_PROMPT_HEAD = """你是一位拥有20年经验的美股期权交易专家。请根据以下市场数据进行分析：
+
+市场数据：
+"""
+_PROMPT_TAIL = """
+
+请提供以下分析：
+1. 当前市场趋势和情绪分析
+2. 技术面和期权链分析
+3. 是否存在异常资金行为
+4. 交易建议（包括具体的期权策略）
+
+请以JSON格式返回，包含以下字段：
+- bias: 市场偏向（BULLISH/NEUTRAL/BEARISH）
+- confidence: 置信度（0-1）
+- logic_chain: 分析逻辑链
+- risk_factors: 风险因素
+- suggested_strategy: 建议的期权策略
+"""
+
+# analyze_market_data / analyze_option_chain 的消息模板
+_MARKET_DATA_SYSTEM_MESSAGE = {"role": "system", "content": "你是一位专业的市场分析师，请基于提供的数据进行分析并给出建议。"}
+_MARKET_DATA_USER_TEMPLATE = """请分析以下市场数据并提供见解：
+            
+{data_summary}
+
+请从以下几个方面进行分析，并以JSON格式返回（只返回JSON，不要其他内容）：
+{{
+    "market_trend": "详细分析市场趋势，包括短期和中期走势",
+    "support_resistance": "分析关键支撑位和阻力位，给出具体价格",
+    "volume_analysis": "分析成交量变化及其含义",
+    "trading_signals": "基于以上分析给出具体的交易建议"
+}}"""
+
+_OPTION_CHAIN_SYSTEM_MESSAGE = {"role": "system", "content": "你是一位专业的期权交易员，请基于提供的数据进行分析并给出交易建议。"}
+_OPTION_CHAIN_USER_TEMPLATE = """请分析以下期权数据并提供交易建议：
+
+看涨期权数据：
+{calls_summary}
+
+看跌期权数据：
+{puts_summary}
+
+请从以下几个方面进行分析，并以JSON格式返回（只返回JSON，不要其他内容）：
+{{
+    "sentiment": "分析期权市场情绪，包括看涨看跌比率和成交量分布",
+    "volatility": "分析隐含波动率水平及趋势",
+    "strategies": "推荐具体的期权交易策略，包括选择哪个到期日、行权价和具体操作",
+    "risk_assessment": "评估当前市场风险和建议的止损止盈位置"
+}}"""
 
 class AIAnalyzer:
     """AI-powered market analysis using SiliconFlow API"""
     
-    def __init__(self):
-        load_dotenv()
-        self.api_key = os.getenv('DEEPSEEK_API_KEY')
+    def __init__(self, cache_size: int = 1024, cache_ttl: float = 300):
+        """
+        Args:
+            cache_size: 缓存的 LLM 响应数量上限
+            cache_ttl: 相同提示词的响应缓存时间（秒）
+        """
+        self.api_key = _API_KEY
         if not self.api_key:
             raise ValueError("DEEPSEEK_API_KEY not found in .env file")
         
         self.api_url = "https://api.deepseek.com/v1/chat/completions"
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        self.headers = _HEADERS
         self.model = "deepseek-chat"  # 使用免费模型
+        self.session = create_session(self.headers, pool_maxsize=16, backoff_factor=0.5)
+        
+        # LLM 响应缓存，按 LRU 淘汰
+        self._response_cache = ResponseCache(cache_size, cache_ttl)
 
     def _build_market_context(self, symbol: str, market_data: Dict[str, Any]) -> Dict[str, Any]:
-        """构建市场上下文数据"""
+        """构建市场上下文数据（不含时间戳，相同行情生成相同提示词以命中响应缓存，时间戳在结果中添加）"""
         return {
             "symbol": symbol,
-            "timestamp": datetime.now().isoformat(),
             "market_data": market_data,
             "analysis_type": "option_trading"
         }
     
     def _build_prompt(self, market_context: Dict[str, Any]) -> str:
         """构建专业操盘手风格的 prompt"""
-        return f"""你是一位拥有20年经验的美股期权交易专家。请根据以下市场数据进行分析：
-
-市场数据：
-{json.dumps(market_context, indent=2, ensure_ascii=False)}
-
-请提供以下分析：
-1. 当前市场趋势和情绪分析
-2. 技术面和期权链分析
-3. 是否存在异常资金行为
-4. 交易建议（包括具体的期权策略）
-
-请以JSON格式返回，包含以下字段：
-- bias: 市场偏向（BULLISH/NEUTRAL/BEARISH）
-- confidence: 置信度（0-1）
-- logic_chain: 分析逻辑链
-- risk_factors: 风险因素
-- suggested_strategy: 建议的期权策略
-"""
+        return _PROMPT_HEAD + compact_json(market_context, drop_order=("analysis_type",)) + _PROMPT_TAIL
     
     def _call_llm_api(self, prompt: str) -> Dict[str, Any]:
         """调用 DeepSeek API"""
+        cached = self._response_cache.get(prompt)
+        if cached is not None:
+            return cached
+        
         try:
             payload = {
                 "model": "deepseek-chat",
@@ -66,18 +122,21 @@ class AIAnalyzer:
                 "max_tokens": 2000
             }
             
-            response = requests.post(self.api_url, headers=self.headers, json=payload)
+            response = self.session.post(self.api_url, data=dumps(payload).encode(), timeout=_REQUEST_TIMEOUT)
             response.raise_for_status()
             
-            result = response.json()
+            result = loads(response.content)
             content = result['choices'][0]['message']['content']
             
             # 解析返回的 JSON 字符串
-            return json.loads(content)
+            result = loads(content)
             
         except Exception as e:
             print(f"Error calling DeepSeek API: {str(e)}")
             return None
+        
+        self._response_cache.put(prompt, result)
+        return result
     
     def analyze_market(self, symbol: str, market_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """分析市场数据并生成交易信号"""
@@ -112,24 +171,14 @@ class AIAnalyzer:
         """
         # Prepare market data summary
         latest_data = stock_data.tail(5)
-        data_summary = latest_data.to_string()
+        data_summary = frame_to_csv(latest_data)
         
         messages = [
-            {"role": "system", "content": "你是一位专业的市场分析师，请基于提供的数据进行分析并给出建议。"},
-            {"role": "user", "content": f"""请分析以下市场数据并提供见解：
-            
-{data_summary}
-
-请从以下几个方面进行分析，并以JSON格式返回（只返回JSON，不要其他内容）：
-{{
-    "market_trend": "详细分析市场趋势，包括短期和中期走势",
-    "support_resistance": "分析关键支撑位和阻力位，给出具体价格",
-    "volume_analysis": "分析成交量变化及其含义",
-    "trading_signals": "基于以上分析给出具体的交易建议"
-}}"""}
+            _MARKET_DATA_SYSTEM_MESSAGE,
+            {"role": "user", "content": _MARKET_DATA_USER_TEMPLATE.format(data_summary=data_summary)}
         ]
 
-        response = self._call_llm_api(json.dumps(messages))
+        response = self._call_llm_api(dumps(messages))
         
         try:
             if "choices" in response and response["choices"]:
@@ -141,7 +190,7 @@ class AIAnalyzer:
                 if content.endswith("```"):
                     content = content[:-3]
                 content = content.strip()
-                analysis = json.loads(content)
+                analysis = loads(content)
             else:
                 analysis = {
                     "error": "Invalid API response format",
@@ -164,29 +213,15 @@ class AIAnalyzer:
             Dict containing analysis results
         """
         # Prepare option chain summary
-        calls_summary = option_chain['calls'].head().to_string()
-        puts_summary = option_chain['puts'].head().to_string()
+        calls_summary = frame_to_csv(option_chain['calls'].head(), index=False)
+        puts_summary = frame_to_csv(option_chain['puts'].head(), index=False)
         
         messages = [
-            {"role": "system", "content": "你是一位专业的期权交易员，请基于提供的数据进行分析并给出交易建议。"},
-            {"role": "user", "content": f"""请分析以下期权数据并提供交易建议：
-
-看涨期权数据：
-{calls_summary}
-
-看跌期权数据：
-{puts_summary}
-
-请从以下几个方面进行分析，并以JSON格式返回（只返回JSON，不要其他内容）：
-{{
-    "sentiment": "分析期权市场情绪，包括看涨看跌比率和成交量分布",
-    "volatility": "分析隐含波动率水平及趋势",
-    "strategies": "推荐具体的期权交易策略，包括选择哪个到期日、行权价和具体操作",
-    "risk_assessment": "评估当前市场风险和建议的止损止盈位置"
-}}"""}
+            _OPTION_CHAIN_SYSTEM_MESSAGE,
+            {"role": "user", "content": _OPTION_CHAIN_USER_TEMPLATE.format(calls_summary=calls_summary, puts_summary=puts_summary)}
         ]
 
-        response = self._call_llm_api(json.dumps(messages))
+        response = self._call_llm_api(dumps(messages))
         
         try:
             if "choices" in response and response["choices"]:
@@ -198,7 +233,7 @@ class AIAnalyzer:
                 if content.endswith("```"):
                     content = content[:-3]
                 content = content.strip()
-                analysis = json.loads(content)
+                analysis = loads(content)
             else:
                 analysis = {
                     "error": "Invalid API response format",
@@ -14,18 +14,84 @@ As a key component of AI Quantitative System 6.0
 
 
 import os
+import re
 import json
+import asyncio
+import contextlib
+import hashlib
+import heapq
 import logging
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from operator import itemgetter
+from pathlib import Path
 from typing import Dict, List, Any, Optional, Union, Tuple
-from .deepseek_api import get_deepseek_response
+from .deepseek_api import get_deepseek_response, aget_deepseek_response, run_deepseek_batch, is_error_response
 from .ai_knowledge_base import AIKnowledgeBase
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+    
+    def _dumps_indented(obj) -> str:
+        """序列化为缩进 2 格的 JSON 字符串"""
+        return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+except ImportError:
+    def _dumps_indented(obj) -> str:
+        """序列化为缩进 2 格的 JSON 字符串"""
+        return json.dumps(obj, indent=2, default=str)
+
+# 嵌入提示词的回测结果字段，其余字段（如原始行情、逐笔明细）不发送给 LLM
+PROMPT_RESULT_KEYS = ("strategy_name", "start_date", "end_date", "parameters", 
+                      "metrics", "monthly_returns", "signal_performance", "trades")
+
+# 提示词中保留的最好/最差交易数量
+PROMPT_SAMPLE_TRADES = 5
+
+# 提示词中浮点数保留的小数位数，15 位的浮点数会白白消耗 token
+PROMPT_FLOAT_DIGITS = 6
+
+def _shrink(obj: Any, ndigits: int = PROMPT_FLOAT_DIGITS) -> Any:
+    """递归地将浮点数（含 numpy 浮点数组）取整，用于嵌入提示词前压缩数据"""
+    if isinstance(obj, (float, np.floating)):
+        return round(float(obj), ndigits)
+    if isinstance(obj, dict):
+        return {k: _shrink(v, ndigits) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_shrink(v, ndigits) for v in obj]
+    if isinstance(obj, np.ndarray) and obj.dtype.kind == "f":
+        return obj.round(ndigits)
+    return obj
+
+# 回测结果少于该数量时，离线批处理改为直接并发请求
+BATCH_API_MIN_RESULTS = 8
+
+# DeepSeek 请求遇到限流（429）或服务端错误（5xx）时的重试次数
+API_MAX_RETRIES = 4
+
+# 提示词中交易明细的字段及缺失时的默认值
+TRADE_FIELD_DEFAULTS = {
+    "entry_date": "Unknown",
+    "direction": "Unknown",
+    "symbol": "Unknown",
+    "entry_price": 0,
+    "exit_price": 0,
+    "pnl": 0,
+    "duration": 0
+}
+
+# 改进建议章节：标题行之后到下一个 Markdown 标题或文本结尾
+_SUGGESTION_SECTION_RE = re.compile(
+    r'(?:Improvement Suggestions|Strategy Improvement|Improvement Direction|Optimization Suggestions)[^\n]*$(.*?)(?=^\s*#|\Z)',
+    re.S | re.M | re.I
+)
+
+# 章节中的编号或列表项，捕获去掉编号/符号后的内容
+_SUGGESTION_ITEM_RE = re.compile(r'^[ \t]*(?:\d+[.\u3001)][ \t]*|[-•][ \t]*)(\S.*?)[ \t]*$', re.M)
+
 # 回测分析提示模板
 
 
@@ -158,6 +224,33 @@ Please provide specific, quantifiable pattern descriptions based on data, avoidi
 
 
 
+# 回测总结系统提示
+
+
+SUMMARY_SYSTEM_PROMPT = """You are a professional quantitative strategy analyst, skilled in analyzing trading strategy backtest results and providing failure attribution.
+
+
+Your analysis must be data-driven, objective, and specific, avoiding vague conclusions. For identified issues, provide concrete improvement directions."""
+
+
+
+
+
+# 交易模式分析系统提示
+
+
+TRADE_PATTERN_SYSTEM_PROMPT = """You are a professional trading pattern analyst, skilled in identifying trading failure patterns and common characteristics.
+
+
+Please provide objective analysis based on data, identifying specific failure patterns, avoiding general conclusions."""
+
+
+
+
+
+
+
+
 class AIBacktestSummarizer:
 
 
@@ -167,7 +260,10 @@ class AIBacktestSummarizer:
     
 
 
-    def __init__(self, api_key=None, knowledge_base=None):
+    def __init__(self, api_key=None, knowledge_base=None, max_concurrency=8, 
+
+
+                 cache_dir="data/backtest_results/summary_cache"):
 
 
         """
@@ -188,6 +284,12 @@ class AIBacktestSummarizer:
             knowledge_base: Knowledge base instance for querying historical backtest results
 
 
+            max_concurrency (int): Maximum number of DeepSeek requests in flight at once
+
+
+            cache_dir (str): Directory for cached summaries keyed by prompt hash, None disables the cache
+
+
         """
 
 
@@ -200,6 +302,30 @@ class AIBacktestSummarizer:
         self.analysis_history = []
 
 
+        self.max_concurrency = max_concurrency
+
+
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
+
+        # asyncio.Semaphore is bound to one event loop, recreated for each asyncio.run
+
+
+        self._sem = None
+
+
+        self._sem_loop = None
+
+
+        # Pooled HTTP client shared by all requests in flight, closed when the last one finishes
+
+
+        self._http_client = None
+
+
+        self._http_users = 0
+
+
     
 
 
@@ -209,7 +335,7 @@ class AIBacktestSummarizer:
         """
 
 
-        Summarize backtest results
+        Summarize backtest results (synchronous wrapper around asummarize_backtest)
 
 
         
@@ -236,67 +362,100 @@ class AIBacktestSummarizer:
         """
 
 
-        # Build prompt
+        return asyncio.run(self.asummarize_backtest(backtest_results, market_data))
+
 
+    
 
-        prompt = f"""
 
+    async def asummarize_backtest(self, backtest_results: Dict[str, Any], market_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
 
-Backtest Results:
 
+        """
 
-{json.dumps(backtest_results, indent=2)}
 
+        Summarize backtest results, running the summary and losing trade pattern analysis concurrently
 
 
+        
 
 
-Market Data:
+        Args:
 
 
-{json.dumps(market_data, indent=2) if market_data else "Not provided"}
+            backtest_results: Backtest results dictionary
 
 
+            market_data: Optional market data for context analysis, a DataFrame is also used for pattern analysis
 
 
+            
 
-Please analyze the backtest results and provide:
 
+        Returns:
 
-1. Overall performance summary
 
+            Summary dictionary
 
-2. Key metrics analysis
 
+        """
 
-3. Risk assessment
 
+        summary_prompt = self._build_summary_prompt(backtest_results, market_data)
 
-4. Strategy strengths and weaknesses
 
+        pattern_prompt = None
 
-5. Improvement suggestions
 
+        if self._has_sufficient_losing_trades(backtest_results):
 
-"""
+
+            market_frame = market_data if isinstance(market_data, pd.DataFrame) else None
+
+
+            pattern_prompt = self._build_trade_pattern_prompt(backtest_results, market_frame)
 
 
         
 
 
-        # Call API
+        # Unchanged results produce the same prompts, reuse the stored answers
 
 
-        system_prompt = """You are a professional quantitative strategy analyst, skilled in analyzing trading strategy backtest results and providing failure attribution.
+        cache_path = self._summary_cache_path(summary_prompt, pattern_prompt)
 
 
-        Your analysis must be data-driven, objective, and specific, avoiding vague conclusions. For identified issues, provide concrete improvement directions."""
+        analysis = self._load_cached_summary(cache_path)
 
 
-        
+        if analysis is None:
+
+
+            tasks = [self._acall_api(summary_prompt, SUMMARY_SYSTEM_PROMPT)]
+
+
+            if pattern_prompt is not None:
+
+
+                tasks.append(self._acall_api(pattern_prompt, TRADE_PATTERN_SYSTEM_PROMPT, max_tokens=1200, temperature=0.3))
+
+
+            
+
+
+            async with self._http_session():
+
 
+                summary, *patterns = await asyncio.gather(*tasks)
 
-        analysis = self._call_api(prompt, system_prompt)
+
+            analysis = {"summary": summary, "pattern_analysis": patterns[0] if patterns else None}
+
+
+            if not any(is_error_response(text) for text in [summary, *patterns]):
+
+
+                self._save_cached_summary(cache_path, analysis)
 
 
         
@@ -305,7 +464,7 @@ Please analyze the backtest results and provide:
         return {
 
 
-            "summary": analysis,
+            **analysis,
 
 
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -320,610 +479,1258 @@ Please analyze the backtest results and provide:
     
 
 
-    def _format_backtest_params(self, strategy_params: Dict[str, Any]) -> str:
+    def batch_summarize(self, results_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 
 
-        """Format backtest parameters as text format"""
+        """
 
 
-        result = ""
+        Summarize multiple backtest results (synchronous wrapper around abatch_summarize)
 
 
         
 
 
-        # Basic strategy information
+        Args:
 
 
-        result += f"Strategy Name: {strategy_params.get('strategy_name', 'Unnamed Strategy')}\n"
+            results_list: List of backtest results
 
 
-        result += f"Asset Class: {strategy_params.get('asset_class', 'Unspecified')}\n"
+            
 
 
-        result += f"Backtest Period: {strategy_params.get('start_date', 'Unspecified')} to {strategy_params.get('end_date', 'Unspecified')}\n"
+        Returns:
 
 
-        
+            List of summary dictionaries, in the same order as results_list
 
 
-        # Strategy specific parameters
+        """
 
 
-        if "parameters" in strategy_params:
+        return asyncio.run(self.abatch_summarize(results_list))
 
 
-            result += "\nStrategy Parameters:\n"
+    
 
 
-            for name, value in strategy_params["parameters"].items():
+    async def abatch_summarize(self, results_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+
+
+        """
 
 
-                result += f"- {name}: {value}\n"
+        Summarize multiple backtest results concurrently, limited by max_concurrency
 
 
         
 
 
-        # Risk management parameters
+        Args:
 
 
-        if "risk_management" in strategy_params:
+            results_list: List of backtest results
 
 
-            result += "\nRisk Management Settings:\n"
+            
 
 
-            for name, value in strategy_params["risk_management"].items():
+        Returns:
 
 
-                result += f"- {name}: {value}\n"
+            List of summary dictionaries, in the same order as results_list
 
 
-        
+        """
+
 
+        async with self._http_session():
 
-        return result
+
+            return await asyncio.gather(*[self.asummarize_backtest(r) for r in results_list])
 
 
     
 
 
-    def _format_performance_metrics(self, backtest_result: Dict[str, Any]) -> str:
+    def batch_summarize_offline(self, results_list: List[Dict[str, Any]], 
 
 
-        """Format performance metrics as text format"""
+                                poll_interval: float = 5.0, 
 
 
-        metrics = backtest_result.get("metrics", {})
+                                timeout: float = 24 * 3600) -> List[Dict[str, Any]]:
+
+
+        """
 
 
-        result = ""
+        Summarize multiple backtest results through the Batch API, for nightly / offline reviews
 
 
         
 
 
-        # Core performance metrics
+        Fewer than BATCH_API_MIN_RESULTS results, or a failed batch, fall back to batch_summarize
 
 
-        result += f"Total Return: {metrics.get('total_return', 0):.2%}\n"
+        
 
 
-        result += f"Annual Return: {metrics.get('annual_return', 0):.2%}\n"
+        Args:
 
 
-        result += f"Sharpe Ratio: {metrics.get('sharpe_ratio', 0):.2f}\n"
+            results_list: List of backtest results
 
 
-        result += f"Maximum Drawdown: {metrics.get('max_drawdown', 0):.2%}\n"
+            poll_interval: Initial batch status polling interval in seconds
 
 
-        result += f"Calmar Ratio: {metrics.get('calmar_ratio', 0):.2f}\n"
+            timeout: Maximum time to wait for the batch in seconds
 
 
-        
+            
 
 
-        # Trade statistics
+        Returns:
 
 
-        result += f"\nTrade Statistics:\n"
+            List of summary dictionaries, in the same order as results_list
 
 
-        result += f"Total Trades: {metrics.get('total_trades', 0)}\n"
+        """
 
 
-        result += f"Winning Trades: {metrics.get('winning_trades', 0)}\n"
+        if len(results_list) < BATCH_API_MIN_RESULTS:
 
 
-        result += f"Losing Trades: {metrics.get('losing_trades', 0)}\n"
+            return self.batch_summarize(results_list)
 
 
-        result += f"Win Rate: {metrics.get('win_rate', 0):.2%}\n"
+        
 
 
-        result += f"Profit Factor: {metrics.get('profit_factor', 0):.2f}\n"
+        requests_by_id = {}
 
 
-        result += f"Average Profit: {metrics.get('avg_profit', 0):.2%}\n"
+        for i, backtest_results in enumerate(results_list):
 
 
-        result += f"Average Loss: {metrics.get('avg_loss', 0):.2%}\n"
+            requests_by_id[f"{i}:summary"] = {
 
 
-        result += f"Maximum Consecutive Wins: {metrics.get('max_consecutive_wins', 0)}\n"
+                "prompt": self._build_summary_prompt(backtest_results),
 
 
-        result += f"Maximum Consecutive Losses: {metrics.get('max_consecutive_losses', 0)}\n"
+                "system_prompt": SUMMARY_SYSTEM_PROMPT,
 
 
-        
+                "max_tokens": 2000,
 
 
-        # Risk metrics
+                "temperature": 0.3
 
 
-        result += f"\nRisk Metrics:\n"
+            }
 
 
-        result += f"Volatility: {metrics.get('volatility', 0):.2%}\n"
+            if self._has_sufficient_losing_trades(backtest_results):
 
 
-        result += f"Sortino Ratio: {metrics.get('sortino_ratio', 0):.2f}\n"
+                requests_by_id[f"{i}:patterns"] = {
 
 
-        result += f"Beta: {metrics.get('beta', 0):.2f}\n"
+                    "prompt": self._build_trade_pattern_prompt(backtest_results),
 
 
-        result += f"Information Ratio: {metrics.get('information_ratio', 0):.2f}\n"
+                    "system_prompt": TRADE_PATTERN_SYSTEM_PROMPT,
 
 
-        
+                    "max_tokens": 1200,
 
 
-        return result
+                    "temperature": 0.3
 
 
-    
+                }
 
 
-    def _format_trade_summary(self, backtest_result: Dict[str, Any]) -> str:
+        
 
 
-        """Format trade summary as text summary"""
+        try:
 
 
-        trades = backtest_result.get("trades", [])
+            outputs = run_deepseek_batch(requests_by_id, api_key=self.api_key, 
 
 
-        if not trades:
+                                         poll_interval=poll_interval, timeout=timeout)
 
 
-            return "No trade records"
+        except Exception as e:
+
+
+            logger.error(f"Batch summarization failed, falling back to concurrent requests: {str(e)}")
+
+
+            return self.batch_summarize(results_list)
 
 
         
 
 
-        # Sort trades by performance
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
-        sorted_trades = sorted(trades, key=lambda x: x.get("pnl", 0), reverse=True)
+        return [
 
 
-        top_trades = sorted_trades[:5]  # Top 5 trades
+            {
 
 
-        bottom_trades = sorted_trades[-5:]  # Worst 5 trades
+                "summary": outputs.get(f"{i}:summary"),
 
 
-        
+                "pattern_analysis": outputs.get(f"{i}:patterns"),
+
+
+                "timestamp": timestamp,
+
 
+                "raw_results": backtest_results
 
-        result = "Top Trade Samples:\n"
 
+            }
 
-        for i, trade in enumerate(top_trades, 1):
 
+            for i, backtest_results in enumerate(results_list)
 
-            result += f"{i}. {trade.get('entry_date', 'Unknown')} {trade.get('direction', 'Unknown').upper()} "
 
+        ]
 
-            result += f"{trade.get('symbol', 'Unknown')} @ {trade.get('entry_price', 0):.2f}, "
+
+    
+
+
+    def _build_summary_prompt(self, backtest_results: Dict[str, Any], market_data: Optional[Dict[str, Any]] = None) -> str:
+
+
+        """Build the backtest summary prompt"""
+
+
+        if isinstance(market_data, pd.DataFrame):
 
 
-            result += f"Exit @ {trade.get('exit_price', 0):.2f}, "
+            market_text = market_data.tail(20).to_csv()
 
 
-            result += f"PnL {trade.get('pnl', 0):.2%}, "
+        else:
 
 
-            result += f"Holding {trade.get('duration', 0)} days\n"
+            market_text = _dumps_indented(_shrink(market_data)) if market_data else "Not provided"
 
 
         
 
 
-        result += "\nWorst Trade Samples:\n"
+        return f"""
 
 
-        for i, trade in enumerate(bottom_trades, 1):
+Backtest Results:
 
 
-            result += f"{i}. {trade.get('entry_date', 'Unknown')} {trade.get('direction', 'Unknown').upper()} "
+{_dumps_indented(_shrink(self._compact_payload(backtest_results)))}
 
 
-            result += f"{trade.get('symbol', 'Unknown')} @ {trade.get('entry_price', 0):.2f}, "
 
 
-            result += f"Exit @ {trade.get('exit_price', 0):.2f}, "
 
+Market Data:
 
-            result += f"PnL {trade.get('pnl', 0):.2%}, "
 
+{market_text}
 
-            result += f"Holding {trade.get('duration', 0)} days\n"
 
 
-        
 
 
-        # Trade distribution statistics
+Please analyze the backtest results and provide:
 
 
-        result += "\nTrade Distribution Statistics:\n"
+1. Overall performance summary
 
 
-        
+2. Key metrics analysis
 
 
-        # Monthly analysis
+3. Risk assessment
 
 
-        if "monthly_returns" in backtest_result:
+4. Strategy strengths and weaknesses
 
 
-            result += "Monthly Performance (Top 5):\n"
+5. Improvement suggestions
 
 
-            monthly = backtest_result["monthly_returns"]
+"""
 
 
-            for month, value in list(sorted(monthly.items(), key=lambda x: x[1], reverse=True))[:5]:
+    
 
 
-                result += f"- {month}: {value:.2%}\n"
+    def _compact_payload(self, backtest_results: Dict[str, Any]) -> Dict[str, Any]:
 
 
-        
+        """Keep only the result fields used in the prompt, with trades cut down to the best and worst samples"""
 
 
-        # Signal type analysis
+        payload = {key: backtest_results[key] for key in PROMPT_RESULT_KEYS if key in backtest_results}
 
 
-        if "signal_performance" in backtest_result:
+        trades = payload.get("trades")
 
 
-            result += "\nSignal Type Performance:\n"
+        if trades and len(trades) > 2 * PROMPT_SAMPLE_TRADES:
 
 
-            for signal, perf in backtest_result["signal_performance"].items():
+            top_trades, bottom_trades = self._top_bottom_trades(trades, PROMPT_SAMPLE_TRADES)
 
 
-                result += f"- {signal}: Trade Count {perf.get('count', 0)}, Win Rate {perf.get('win_rate', 0):.2%}, Average PnL {perf.get('avg_return', 0):.2%}\n"
+            payload["trades"] = top_trades + bottom_trades
 
 
-        
+            payload["total_trades"] = len(trades)
 
 
-        return result
+        return payload
 
 
     
 
 
-    def _has_sufficient_losing_trades(self, backtest_result: Dict[str, Any]) -> bool:
+    def _top_bottom_trades(self, trades: List[Dict[str, Any]], k: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
 
 
-        """Determine if there are enough losing trades for pattern analysis"""
+        """Return the k best trades (best first) and the k worst trades (ordered as in a descending sort)"""
 
 
-        trades = backtest_result.get("trades", [])
+        pnls = np.fromiter((t.get("pnl", 0) for t in trades), dtype=np.float64, count=len(trades))
 
 
-        losing_trades = [t for t in trades if t.get("pnl", 0) < 0]
+        if len(trades) <= k:
 
 
-        return len(losing_trades) >= 5  # At least 5 losing trades are needed
+            order = np.argsort(-pnls, kind="stable")
 
 
-    
+            sorted_trades = [trades[i] for i in order]
 
 
-    def _analyze_trade_patterns(self, backtest_result: Dict[str, Any], 
+            return sorted_trades, sorted_trades
 
 
-                               market_data: Optional[pd.DataFrame] = None) -> Optional[str]:
+        
 
 
-        """Analyze losing trade patterns"""
+        # Partial selection is O(N); only the k selected trades are sorted
 
 
-        trades = backtest_result.get("trades", [])
+        top_idx = np.argpartition(pnls, -k)[-k:]
 
 
-        losing_trades = [t for t in trades if t.get("pnl", 0) < 0]
+        top_idx = top_idx[np.argsort(-pnls[top_idx], kind="stable")]
 
 
-        
+        bottom_idx = np.argpartition(pnls, k - 1)[:k]
 
 
-        if not losing_trades:
+        bottom_idx = bottom_idx[np.argsort(-pnls[bottom_idx], kind="stable")]
 
 
-            return None
+        return [trades[i] for i in top_idx], [trades[i] for i in bottom_idx]
 
 
-        
+    
 
 
-        # Format losing trades
+    def _worst_losing_trades(self, trades: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
 
 
-        losing_trades_text = "Losing Trade Details:\n"
+        """Return up to k losing trades, worst first"""
 
 
-        for i, trade in enumerate(losing_trades[:10], 1):  # Limit to top 10 trades, avoid too long prompt
+        pnls = np.fromiter((t.get("pnl", 0) for t in trades), dtype=np.float64, count=len(trades))
 
 
-            losing_trades_text += f"{i}. {trade.get('entry_date', 'Unknown')} {trade.get('direction', 'Unknown').upper()} "
+        losing_idx = np.flatnonzero(pnls < 0)
 
 
-            losing_trades_text += f"{trade.get('symbol', 'Unknown')} @ {trade.get('entry_price', 0):.2f}, "
+        if len(losing_idx) > k:
 
 
-            losing_trades_text += f"Exit @ {trade.get('exit_price', 0):.2f}, "
+            losing_idx = losing_idx[np.argpartition(pnls[losing_idx], k - 1)[:k]]
 
 
-            losing_trades_text += f"PnL {trade.get('pnl', 0):.2%}, "
+        losing_idx = losing_idx[np.argsort(pnls[losing_idx], kind="stable")]
 
 
-            losing_trades_text += f"Holding {trade.get('duration', 0)} days\n"
+        return [trades[i] for i in losing_idx]
 
 
-            if "exit_reason" in trade:
+    
 
 
-                losing_trades_text += f"    Exit Reason: {trade['exit_reason']}\n"
+    def _summary_cache_path(self, *prompts: Optional[str]) -> Optional[Path]:
 
 
-        
+        """Cache file for the given prompts, named by their content hash"""
 
 
-        # Format market environment data (if available)
+        if self.cache_dir is None:
 
 
-        market_conditions_text = "Market Environment Data:\n"
+            return None
 
 
-        if market_data is not None:
+        digest = hashlib.blake2b(digest_size=16)
 
 
-            # Extract market data around each trade time point
+        for prompt in prompts:
 
 
-            for trade in losing_trades[:5]:  # Only analyze market environment around top 5 losing trades
+            digest.update((prompt or "").encode())
 
 
-                entry_date = trade.get("entry_date")
+            digest.update(b"\0")
 
 
-                if entry_date and entry_date in market_data.index:
+        return self.cache_dir / f"{digest.hexdigest()}.summary.json"
 
 
-                    # Get data from 5 trading days before and after the trade
+    
 
 
-                    idx = market_data.index.get_loc(entry_date)
+    def _load_cached_summary(self, cache_path: Optional[Path]) -> Optional[Dict[str, Any]]:
 
 
-                    start_idx = max(0, idx - 5)
+        """Load a cached summary, None if missing or unreadable"""
 
 
-                    end_idx = min(len(market_data), idx + 5)
+        if cache_path is None or not cache_path.exists():
+
 
+            return None
 
-                    trade_period = market_data.iloc[start_idx:end_idx]
 
+        try:
 
-                    
 
+            return json.loads(cache_path.read_text(encoding="utf-8"))
 
-                    # Add market state description
 
+        except (OSError, ValueError) as e:
 
-                    market_conditions_text += f"\nMarket State Around Trade {entry_date}:\n"
 
+            logger.warning(f"Failed to read summary cache {cache_path}: {str(e)}")
 
-                    
 
+            return None
 
-                    # Price movement
 
+    
 
-                    price_change = (trade_period['close'].iloc[-1] / trade_period['close'].iloc[0] - 1) * 100
 
+    def _save_cached_summary(self, cache_path: Optional[Path], analysis: Dict[str, Any]) -> None:
 
-                    market_conditions_text += f"- Price Change: {price_change:.2f}%\n"
 
+        """Persist a summary, written to a temporary file first so readers never see a partial file"""
 
-                    
 
+        if cache_path is None:
 
-                    # Volatility
 
+            return
 
-                    if 'close' in trade_period.columns:
 
+        try:
 
-                        volatility = trade_period['close'].pct_change().std() * 100
 
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
 
-                        market_conditions_text += f"- Volatility: {volatility:.2f}%\n"
 
+            tmp_path = cache_path.with_suffix(".tmp")
 
-                    
 
+            tmp_path.write_text(json.dumps(analysis, ensure_ascii=False), encoding="utf-8")
 
-                    # Volume
 
+            os.replace(tmp_path, cache_path)
 
-                    if 'volume' in trade_period.columns:
 
+        except OSError as e:
 
-                        avg_volume = trade_period['volume'].mean()
 
+            logger.warning(f"Failed to write summary cache {cache_path}: {str(e)}")
 
-                        volume_change = (trade_period['volume'].iloc[-1] / trade_period['volume'].iloc[0] - 1) * 100
 
+    
 
-                        market_conditions_text += f"- Average Volume: {avg_volume:.0f}, Volume Change: {volume_change:.2f}%\n"
 
+    @contextlib.asynccontextmanager
 
-        else:
 
+    async def _http_session(self):
 
-            market_conditions_text += "No available market environment data\n"
 
+        """Share one keep-alive httpx.AsyncClient (HTTP/2 when h2 is installed) across concurrent calls"""
 
-        
 
+        if self._http_client is None:
 
-        # Build pattern analysis prompt
 
+            import httpx
 
-        prompt = TRADE_PATTERN_TEMPLATE.format(
 
+            options = {
 
-            losing_trades=losing_trades_text,
 
+                "timeout": httpx.Timeout(60.0, connect=10.0),
 
-            market_conditions=market_conditions_text
 
+                "limits": httpx.Limits(max_connections=self.max_concurrency * 2, 
 
-        )
 
+                                       max_keepalive_connections=self.max_concurrency * 2),
 
-        
+
+            }
 
 
-        # Call API for analysis
+            try:
 
 
-        system_prompt = """You are a professional trading pattern analyst, skilled in identifying trading failure patterns and common characteristics.
+                self._http_client = httpx.AsyncClient(http2=True, **options)
 
 
-        Please provide objective analysis based on data, identifying specific failure patterns, avoiding general conclusions."""
+            except ImportError:
+
+
+                self._http_client = httpx.AsyncClient(**options)
 
 
         
 
 
-        return get_deepseek_response(
+        self._http_users += 1
 
 
-            prompt=prompt,
+        try:
 
 
-            api_key=self.api_key, 
+            yield self._http_client
 
 
-            system_prompt=system_prompt, 
+        finally:
 
 
-            max_tokens=1200,
+            self._http_users -= 1
 
 
-            temperature=0.3
+            if self._http_users == 0:
 
 
-        )
+                client, self._http_client = self._http_client, None
+
+
+                await client.aclose()
 
 
     
 
 
-    def _extract_improvement_suggestions(self, analysis_text: str) -> List[str]:
+    async def _acall_api(self, prompt: str, system_prompt: str, max_tokens: int = 2000, temperature: float = 0.3) -> str:
 
 
-        """Extract improvement suggestions from analysis text"""
+        """Call the DeepSeek API asynchronously, at most max_concurrency requests at a time, retrying 429/5xx with backoff"""
 
 
-        suggestions = []
+        loop = asyncio.get_running_loop()
 
 
-        lines = analysis_text.split("\n")
+        if self._sem_loop is not loop:
+
+
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+
+
+            self._sem_loop = loop
 
 
         
 
 
-        in_suggestion_section = False
+        async with self._http_session() as client, self._sem:
 
 
-        for line in lines:
+            return await aget_deepseek_response(
 
 
-            # Detect improvement suggestion section
+                prompt=prompt,
 
 
-            if "Improvement Suggestions" in line or "Strategy Improvement" in line or "Improvement Direction" in line or "Optimization Suggestions" in line:
+                api_key=self.api_key,
 
 
-                in_suggestion_section = True
+                system_prompt=system_prompt,
 
 
-                continue
+                max_tokens=max_tokens,
 
 
-            
+                temperature=temperature,
+
+
+                client=client,
+
 
+                max_retries=API_MAX_RETRIES
 
-            if in_suggestion_section and line.strip() and line.strip()[0] in ['-', '•', '1', '2', '3', '4', '5', '6', '7', '8', '9']:
 
+            )
 
-                # Clean format and add suggestion
+
+    
 
 
-                suggestion = line.strip()
+    def _format_backtest_params(self, strategy_params: Dict[str, Any]) -> str:
 
 
-                # Remove numbering or list symbols
+        """Format backtest parameters as text format"""
 
 
-                if suggestion[0].isdigit() and suggestion[1:3] in ['. ', '、', '. ']:
+        parts = []
 
 
-                    suggestion = suggestion[3:].strip()
+        
 
 
-                elif suggestion[0] in ['-', '•']:
+        # Basic strategy information
 
 
-                    suggestion = suggestion[1:].strip()
+        parts.append(f"Strategy Name: {strategy_params.get('strategy_name', 'Unnamed Strategy')}\n")
 
 
-                
+        parts.append(f"Asset Class: {strategy_params.get('asset_class', 'Unspecified')}\n")
 
 
-                suggestions.append(suggestion)
+        parts.append(f"Backtest Period: {strategy_params.get('start_date', 'Unspecified')} to {strategy_params.get('end_date', 'Unspecified')}\n")
 
 
         
 
 
-        return suggestions
+        # Strategy specific parameters
+
+
+        if "parameters" in strategy_params:
+
+
+            parts.append("\nStrategy Parameters:\n")
+
+
+            for name, value in strategy_params["parameters"].items():
+
+
+                parts.append(f"- {name}: {value}\n")
+
+
+        
+
+
+        # Risk management parameters
+
+
+        if "risk_management" in strategy_params:
+
+
+            parts.append("\nRisk Management Settings:\n")
+
+
+            for name, value in strategy_params["risk_management"].items():
+
+
+                parts.append(f"- {name}: {value}\n")
+
+
+        
+
+
+        return "".join(parts)
+
+
+    
+
+
+    def _format_performance_metrics(self, backtest_result: Dict[str, Any]) -> str:
+
+
+        """Format performance metrics as text format"""
+
+
+        metrics = backtest_result.get("metrics", {})
+
+
+        parts = []
+
+
+        
+
+
+        # Core performance metrics
+
+
+        parts.append(f"Total Return: {metrics.get('total_return', 0):.2%}\n")
+
+
+        parts.append(f"Annual Return: {metrics.get('annual_return', 0):.2%}\n")
+
+
+        parts.append(f"Sharpe Ratio: {metrics.get('sharpe_ratio', 0):.2f}\n")
+
+
+        parts.append(f"Maximum Drawdown: {metrics.get('max_drawdown', 0):.2%}\n")
+
+
+        parts.append(f"Calmar Ratio: {metrics.get('calmar_ratio', 0):.2f}\n")
+
+
+        
+
+
+        # Trade statistics
+
+
+        parts.append(f"\nTrade Statistics:\n")
+
+
+        parts.append(f"Total Trades: {metrics.get('total_trades', 0)}\n")
+
+
+        parts.append(f"Winning Trades: {metrics.get('winning_trades', 0)}\n")
+
+
+        parts.append(f"Losing Trades: {metrics.get('losing_trades', 0)}\n")
+
+
+        parts.append(f"Win Rate: {metrics.get('win_rate', 0):.2%}\n")
+
+
+        parts.append(f"Profit Factor: {metrics.get('profit_factor', 0):.2f}\n")
+
+
+        parts.append(f"Average Profit: {metrics.get('avg_profit', 0):.2%}\n")
+
+
+        parts.append(f"Average Loss: {metrics.get('avg_loss', 0):.2%}\n")
+
+
+        parts.append(f"Maximum Consecutive Wins: {metrics.get('max_consecutive_wins', 0)}\n")
+
+
+        parts.append(f"Maximum Consecutive Losses: {metrics.get('max_consecutive_losses', 0)}\n")
+
+
+        
+
+
+        # Risk metrics
+
+
+        parts.append(f"\nRisk Metrics:\n")
+
+
+        parts.append(f"Volatility: {metrics.get('volatility', 0):.2%}\n")
+
+
+        parts.append(f"Sortino Ratio: {metrics.get('sortino_ratio', 0):.2f}\n")
+
+
+        parts.append(f"Beta: {metrics.get('beta', 0):.2f}\n")
+
+
+        parts.append(f"Information Ratio: {metrics.get('information_ratio', 0):.2f}\n")
+
+
+        
+
+
+        return "".join(parts)
+
+
+    
+
+
+    def _format_trade_summary(self, backtest_result: Dict[str, Any]) -> str:
+
+
+        """Format trade summary as text summary"""
+
+
+        trades = backtest_result.get("trades", [])
+
+
+        if not trades:
+
+
+            return "No trade records"
+
+
+        
+
+
+        # Top 5 and worst 5 trades by performance
+
+
+        top_trades, bottom_trades = self._top_bottom_trades(trades, 5)
+
+
+        
+
+
+        parts = ["Top Trade Samples:\n"]
+
+
+        parts.extend(self._format_trade_lines(top_trades))
+
+
+        
+
+
+        parts.append("\nWorst Trade Samples:\n")
+
+
+        parts.extend(self._format_trade_lines(bottom_trades))
+
+
+        
+
+
+        # Trade distribution statistics
+
+
+        parts.append("\nTrade Distribution Statistics:\n")
+
+
+        
+
+
+        # Monthly analysis
+
+
+        if "monthly_returns" in backtest_result:
+
+
+            parts.append("Monthly Performance (Top 5):\n")
+
+
+            monthly = backtest_result["monthly_returns"]
+
+
+            for month, value in heapq.nlargest(5, monthly.items(), key=itemgetter(1)):
+
+
+                parts.append(f"- {month}: {value:.2%}\n")
+
+
+        
+
+
+        # Signal type analysis
+
+
+        if "signal_performance" in backtest_result:
+
+
+            parts.append("\nSignal Type Performance:\n")
+
+
+            for signal, perf in backtest_result["signal_performance"].items():
+
+
+                parts.append(f"- {signal}: Trade Count {perf.get('count', 0)}, Win Rate {perf.get('win_rate', 0):.2%}, Average PnL {perf.get('avg_return', 0):.2%}\n")
+
+
+        
+
+
+        return "".join(parts)
+
+
+    
+
+
+    def _format_trade_lines(self, trades: List[Dict[str, Any]], with_exit_reason: bool = False) -> List[str]:
+
+
+        """Format trades as numbered lines, reading the fields from one DataFrame instead of per-row dict lookups"""
+
+
+        # object dtype keeps the original values (e.g. integer durations) for formatting
+
+
+        tdf = pd.DataFrame(trades, dtype=object).reindex(columns=[*TRADE_FIELD_DEFAULTS, "exit_reason"])
+
+
+        tdf = tdf.astype(object).fillna(TRADE_FIELD_DEFAULTS)
+
+
+        
+
+
+        lines = []
+
+
+        for i, trade in enumerate(tdf.itertuples(index=False), 1):
+
+
+            lines.append(
+
+
+                f"{i}. {trade.entry_date} {str(trade.direction).upper()} {trade.symbol} @ {trade.entry_price:.2f}, "
+
+
+                f"Exit @ {trade.exit_price:.2f}, PnL {trade.pnl:.2%}, Holding {trade.duration} days\n"
+
+
+            )
+
+
+            if with_exit_reason and pd.notna(trade.exit_reason):
+
+
+                lines.append(f"    Exit Reason: {trade.exit_reason}\n")
+
+
+        return lines
+
+
+    
+
+
+    def _has_sufficient_losing_trades(self, backtest_result: Dict[str, Any]) -> bool:
+
+
+        """Determine if there are enough losing trades for pattern analysis"""
+
+
+        trades = backtest_result.get("trades", [])
+
+
+        losing_trades = [t for t in trades if t.get("pnl", 0) < 0]
+
+
+        return len(losing_trades) >= 5  # At least 5 losing trades are needed
+
+
+    
+
+
+    def _analyze_trade_patterns(self, backtest_result: Dict[str, Any], 
+
+
+                               market_data: Optional[pd.DataFrame] = None) -> Optional[str]:
+
+
+        """Analyze losing trade patterns"""
+
+
+        prompt = self._build_trade_pattern_prompt(backtest_result, market_data)
+
+
+        if prompt is None:
+
+
+            return None
+
+
+        
+
+
+        return get_deepseek_response(
+
+
+            prompt=prompt,
+
+
+            api_key=self.api_key, 
+
+
+            system_prompt=TRADE_PATTERN_SYSTEM_PROMPT, 
+
+
+            max_tokens=1200,
+
+
+            temperature=0.3
+
+
+        )
+
+
+    
+
+
+    def _build_trade_pattern_prompt(self, backtest_result: Dict[str, Any], 
+
+
+                                    market_data: Optional[pd.DataFrame] = None) -> Optional[str]:
+
+
+        """Build the losing trade pattern analysis prompt, None if there are no losing trades"""
+
+
+        # The 10 worst losing trades, avoid too long prompt
+
+
+        losing_trades = self._worst_losing_trades(backtest_result.get("trades", []), 10)
+
+
+        
+
+
+        if not losing_trades:
+
+
+            return None
+
+
+        
+
+
+        # Format losing trades
+
+
+        losing_parts = ["Losing Trade Details:\n"]
+
+
+        losing_parts.extend(self._format_trade_lines(losing_trades, with_exit_reason=True))
+
+
+        
+
+
+        # Format market environment data (if available)
+
+
+        condition_parts = ["Market Environment Data:\n"]
+
+
+        if market_data is not None:
+
+
+            # Slice the underlying arrays directly, no Series copies per trade
+
+
+            close = market_data['close'].to_numpy(dtype=np.float64) if 'close' in market_data.columns else None
+
+
+            volume = market_data['volume'].to_numpy(dtype=np.float64) if 'volume' in market_data.columns else None
+
+
+            positions = self._index_positions(market_data.index)
+
+
+            
+
+
+            # Extract market data around each trade time point
+
+
+            for trade in losing_trades[:5]:  # Only analyze market environment around the 5 worst losing trades
+
+
+                entry_date = trade.get("entry_date")
+
+
+                idx = self._lookup_position(positions, market_data.index, entry_date) if entry_date else None
+
+
+                if idx is not None:
+
+
+                    # Get data from 5 trading days before and after the trade
+
+
+                    start_idx = max(0, idx - 5)
+
+
+                    end_idx = min(len(market_data), idx + 5)
+
+
+                    
+
+
+                    # Add market state description
+
+
+                    condition_parts.append(f"\nMarket State Around Trade {entry_date}:\n")
+
+
+                    
+
+
+                    if close is not None:
+
+
+                        window = close[start_idx:end_idx]
+
+
+                        
+
+
+                        # Price movement
+
+
+                        price_change = (window[-1] / window[0] - 1) * 100
+
+
+                        condition_parts.append(f"- Price Change: {price_change:.2f}%\n")
+
+
+                        
+
+
+                        # Volatility (sample standard deviation of returns)
+
+
+                        returns = np.diff(window) / window[:-1]
+
+
+                        volatility = returns.std(ddof=1) * 100 if len(returns) > 1 else np.nan
+
+
+                        condition_parts.append(f"- Volatility: {volatility:.2f}%\n")
+
+
+                    
+
+
+                    # Volume
+
+
+                    if volume is not None:
+
+
+                        window = volume[start_idx:end_idx]
+
+
+                        avg_volume = window.mean()
+
+
+                        volume_change = (window[-1] / window[0] - 1) * 100
+
+
+                        condition_parts.append(f"- Average Volume: {avg_volume:.0f}, Volume Change: {volume_change:.2f}%\n")
+
+
+        else:
+
+
+            condition_parts.append("No available market environment data\n")
+
+
+        
+
+
+        # Build pattern analysis prompt
+
+
+        return TRADE_PATTERN_TEMPLATE.format(
+
+
+            losing_trades="".join(losing_parts),
+
+
+            market_conditions="".join(condition_parts)
+
+
+        )
+
+
+    
+
+
+    @staticmethod
+
+
+    def _index_positions(index: pd.Index) -> Dict[Any, int]:
+
+
+        """Map each index label to its first position, built once instead of a get_loc search per trade"""
+
+
+        positions = {}
+
+
+        for i, label in enumerate(index):
+
+
+            positions.setdefault(label, i)
+
+
+        return positions
+
+
+    
+
+
+    @staticmethod
+
+
+    def _lookup_position(positions: Dict[Any, int], index: pd.Index, key: Any) -> Optional[int]:
+
+
+        """Position of key in the index, None if missing; date strings are matched against a DatetimeIndex"""
+
+
+        idx = positions.get(key)
+
+
+        if idx is None and isinstance(key, str) and isinstance(index, pd.DatetimeIndex):
+
+
+            timestamp = pd.to_datetime(key, errors="coerce")
+
+
+            if timestamp is not pd.NaT:
+
+
+                if index.tz is not None and timestamp.tz is None:
+
+
+                    timestamp = timestamp.tz_localize(index.tz)
+
+
+                idx = positions.get(timestamp)
+
+
+        return idx
+
+
+    
+
+
+    def _extract_improvement_suggestions(self, analysis_text: str) -> List[str]:
+
+
+        """Extract improvement suggestions from analysis text"""
+
+
+        match = _SUGGESTION_SECTION_RE.search(analysis_text)
+
+
+        return _SUGGESTION_ITEM_RE.findall(match.group(1)) if match else []
 
 
     
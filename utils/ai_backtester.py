@@ -8,15 +8,25 @@ evaluate and improve AI trading strategies.
 """
 
 import os
+import csv
 import json
 import logging
+import time
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import bottleneck as bn
+except ImportError:
+    bn = None
 
 # Add project root to path if needed
 from utils.ai_knowledge_base import AIKnowledgeBase
@@ -25,6 +35,19 @@ from utils.ai_knowledge_base import AIKnowledgeBase
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("AIBacktester")
 
+# 置信度分组区间（左闭右开）及名称
+CONFIDENCE_BINS = [0.5, 0.7, 0.85, 1.0]
+CONFIDENCE_LEVELS = ['low', 'medium', 'high']
+
+# 分组统计的动作类型
+SIGNAL_ACTIONS = ['Call', 'Put', 'Hold']
+
+# 回测结果缓存时间（秒）
+REVIEW_CACHE_TTL = 60
+
+# pandas 2.0 起需显式指定 ISO8601，否则按第一条记录推断格式，带微秒或时区的时间戳会被解析为 NaT
+_TIMESTAMP_FORMAT = {'format': 'ISO8601'} if int(pd.__version__.split('.')[0]) >= 2 else {}
+
 class AIBacktester:
     """
     AI策略回测器
@@ -39,9 +62,15 @@ class AIBacktester:
             knowledge_base_dir: 知识库数据目录
         """
         self.knowledge_base = AIKnowledgeBase(data_dir=knowledge_base_dir)
+        self.knowledge_base_dir = Path(knowledge_base_dir)
         self.results_dir = Path("data/backtest_results")
         self.results_dir.mkdir(exist_ok=True, parents=True)
         
+        # 信号缓存 {symbol: (知识库文件修改时间, 信号列表)}，知识库文件更新后失效
+        self._signal_cache: Dict[Optional[str], Tuple[float, List[Dict[str, Any]]]] = {}
+        # 回测结果缓存 {(symbol, days, min_confidence): (生成时间, 报告)}
+        self._review_cache: Dict[Tuple, Tuple[float, Dict[str, Any]]] = {}
+        
     def review(self, symbol=None, days=30, min_confidence=0.5) -> Dict[str, Any]:
         """
         回测AI策略并计算命中率、收益分布等指标
@@ -55,17 +84,13 @@ class AIBacktester:
             包含回测结果的字典
         """
         # 获取所有信号
-        signals = self.knowledge_base.query_signals(symbol=symbol)
+        signals = self._get_signals(symbol)
         
-        # 按时间过滤最近N天的信号
-        cutoff_date = datetime.now() - timedelta(days=days)
-        recent_signals = [
-            signal for signal in signals 
-            if datetime.fromisoformat(signal.get('timestamp', '2000-01-01T00:00:00')).replace(tzinfo=None) > cutoff_date
-            and float(signal.get('confidence', 0)) >= min_confidence
-        ]
+        # 一次性转为 DataFrame，按时间过滤最近N天的信号
+        df = self._signals_frame(signals)
+        df = df[(df['timestamp'] > self._cutoff(days)) & (df['confidence'] >= min_confidence)]
         
-        if not recent_signals:
+        if df.empty:
             logger.warning(f"没有找到符合条件的信号进行回测 (symbol={symbol}, days={days})")
             return {
                 "status": "warning",
@@ -75,76 +100,32 @@ class AIBacktester:
             }
         
         # 计算命中率
-        hit_count = sum(1 for signal in recent_signals if signal.get('hit', False))
-        hit_rate = hit_count / len(recent_signals) if recent_signals else 0
+        hit_count = int(df['hit'].sum())
+        hit_rate = hit_count / len(df)
         
         # 按置信度分组分析
-        confidence_bins = {
-            'low': [0.5, 0.7],
-            'medium': [0.7, 0.85],
-            'high': [0.85, 1.0]
-        }
-        
-        confidence_performance = {}
-        for level, (lower, upper) in confidence_bins.items():
-            level_signals = [
-                signal for signal in recent_signals
-                if lower <= float(signal.get('confidence', 0)) < upper
-            ]
-            
-            level_hit_count = sum(1 for signal in level_signals if signal.get('hit', False))
-            level_hit_rate = level_hit_count / len(level_signals) if level_signals else 0
-            
-            confidence_performance[level] = {
-                'count': len(level_signals),
-                'hit_rate': level_hit_rate,
-                'avg_profit': self._calculate_avg_profit(level_signals)
-            }
+        # np.digitize 一次算出区间编号，区间外（<0.5 或 >=1.0）的编号为 -1，不计入任何分组
+        codes = np.digitize(df['confidence'].to_numpy(dtype=np.float64), CONFIDENCE_BINS) - 1
+        codes[codes >= len(CONFIDENCE_LEVELS)] = -1
+        df['conf_bin'] = pd.Categorical.from_codes(codes, categories=CONFIDENCE_LEVELS)
+        confidence_performance = self._group_performance(df, 'conf_bin', CONFIDENCE_LEVELS)
         
         # 按动作分组分析 (Call/Put/Hold)
-        action_performance = {}
-        for action in ['Call', 'Put', 'Hold']:
-            action_signals = [
-                signal for signal in recent_signals
-                if signal.get('action') == action
-            ]
-            
-            action_hit_count = sum(1 for signal in action_signals if signal.get('hit', False))
-            action_hit_rate = action_hit_count / len(action_signals) if action_signals else 0
-            
-            action_performance[action] = {
-                'count': len(action_signals),
-                'hit_rate': action_hit_rate,
-                'avg_profit': self._calculate_avg_profit(action_signals)
-            }
+        action_performance = self._group_performance(df, 'action', SIGNAL_ACTIONS)
             
         # 按股票代码分组
         symbol_performance = {}
         if not symbol:  # 只有在回测所有股票时才分析
-            symbols = set(signal.get('symbol') for signal in recent_signals)
-            for sym in symbols:
-                sym_signals = [
-                    signal for signal in recent_signals
-                    if signal.get('symbol') == sym
-                ]
-                
-                sym_hit_count = sum(1 for signal in sym_signals if signal.get('hit', False))
-                sym_hit_rate = sym_hit_count / len(sym_signals) if sym_signals else 0
-                
-                symbol_performance[sym] = {
-                    'count': len(sym_signals),
-                    'hit_rate': sym_hit_rate,
-                    'avg_profit': self._calculate_avg_profit(sym_signals)
-                }
+            symbol_performance = self._group_performance(df, 'symbol')
         
         # 生成回测报告
         report = {
             "status": "success",
             "timestamp": datetime.now().isoformat(),
-            "signals_count": len(recent_signals),
+            "signals_count": len(df),
             "hit_count": hit_count,
             "hit_rate": hit_rate,
-            "avg_profit": self._calculate_avg_profit(recent_signals),
+            "avg_profit": self._calculate_avg_profit(df['profit_pct']),
             "confidence_performance": confidence_performance,
             "action_performance": action_performance,
             "symbol_performance": symbol_performance,
@@ -153,25 +134,104 @@ class AIBacktester:
         
         # 保存回测结果
         self._save_report(report, symbol)
+        self._review_cache[(symbol, days, min_confidence)] = (time.monotonic(), report)
         
         return report
     
-    def _calculate_avg_profit(self, signals):
-        """计算平均收益率"""
-        profits = [float(signal.get('profit_pct', 0)) for signal in signals if 'profit_pct' in signal]
-        return sum(profits) / len(profits) if profits else 0
+    def _cached_review(self, symbol=None, days=30, min_confidence=0.5) -> Dict[str, Any]:
+        """返回 REVIEW_CACHE_TTL 秒内相同参数的回测结果，过期或信号更新后重新回测"""
+        cached = self._review_cache.get((symbol, days, min_confidence))
+        if (cached is not None 
+                and time.monotonic() - cached[0] < REVIEW_CACHE_TTL 
+                and symbol in self._signal_cache 
+                and self._signal_cache[symbol][0] == self._knowledge_base_mtime()):
+            return cached[1]
+        return self.review(symbol=symbol, days=days, min_confidence=min_confidence)
+    
+    def _knowledge_base_mtime(self) -> float:
+        """知识库数据文件的最新修改时间"""
+        return max((p.stat().st_mtime for p in self.knowledge_base_dir.glob('*.json')), default=0)
+    
+    def _get_signals(self, symbol=None) -> List[Dict[str, Any]]:
+        """查询信号，知识库文件未修改时复用上次的结果"""
+        mtime = self._knowledge_base_mtime()
+        cached = self._signal_cache.get(symbol)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        
+        signals = self.knowledge_base.query_signals(symbol=symbol)
+        self._signal_cache[symbol] = (mtime, signals)
+        return signals
+    
+    def _signals_frame(self, signals: List[Dict[str, Any]]) -> pd.DataFrame:
+        """信号列表转为 DataFrame，补齐缺失列并转换数值和时间列"""
+        df = pd.DataFrame(signals)
+        defaults = {'timestamp': None, 'confidence': 0, 'hit': False, 'action': None, 'symbol': None, 'profit_pct': np.nan}
+        for column, default in defaults.items():
+            if column not in df.columns:
+                df[column] = default
+        
+        df['timestamp'] = self._parse_timestamps(df['timestamp'])
+        df['confidence'] = pd.to_numeric(df['confidence'], errors='coerce').fillna(0.0)
+        df['hit'] = df['hit'].fillna(False).astype(bool)
+        df['profit_pct'] = pd.to_numeric(df['profit_pct'], errors='coerce')
+        return df
+    
+    def _parse_timestamps(self, timestamps: pd.Series) -> pd.Series:
+        """一次解析整列 ISO 时间戳，统一转换为不带时区的 UTC 时间，无法解析的为 NaT"""
+        return pd.to_datetime(timestamps, errors='coerce', utc=True, **_TIMESTAMP_FORMAT).dt.tz_convert(None)
+    
+    def _cutoff(self, days) -> pd.Timestamp:
+        """最近N天的起始时间（不带时区的 UTC 时间）"""
+        return pd.Timestamp.now(tz='UTC').tz_convert(None) - pd.Timedelta(days=days)
+    
+    def _group_performance(self, df: pd.DataFrame, by: str, keys: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+        """按列分组统计信号数量、命中率和平均收益，keys 指定时没有信号的分组也会列出"""
+        grouped = df.groupby(by, observed=False).agg(
+            count=('hit', 'size'),
+            hit_rate=('hit', 'mean'),
+            avg_profit=('profit_pct', 'mean')
+        )
+        if keys is not None:
+            grouped = grouped.reindex(keys)
+        grouped = grouped.fillna(0)
+        
+        return {
+            key: {'count': int(count), 'hit_rate': float(hit_rate), 'avg_profit': float(avg_profit)}
+            for key, count, hit_rate, avg_profit in zip(
+                grouped.index, grouped['count'], grouped['hit_rate'], grouped['avg_profit']
+            )
+        }
+    
+    def _calculate_avg_profit(self, profits: pd.Series) -> float:
+        """计算平均收益率，忽略缺失值"""
+        values = profits.to_numpy(dtype=np.float64)
+        if np.isnan(values).all():
+            return 0
+        return float(bn.nanmean(values) if bn is not None else np.nanmean(values))
     
     def _save_report(self, report, symbol=None):
         """保存回测报告"""
         filename = f"backtest_{symbol or 'all'}_{datetime.now().strftime('%Y%m%d')}.json"
-        with open(self.results_dir / filename, 'w') as f:
-            json.dump(report, f, indent=2)
+        if orjson is not None:
+            data = orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        else:
+            data = json.dumps(report, indent=2).encode()
+        
+        # 先写临时文件再替换，写入中途出错不会损坏已有报告
+        path = self.results_dir / filename
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
         logger.info(f"回测报告已保存: {filename}")
     
     def generate_performance_chart(self, report=None, symbol=None, days=30):
         """生成性能图表"""
+        # plotly 导入较慢，只在生成图表时加载
+        import plotly.graph_objects as go
+        
         if report is None:
-            report = self.review(symbol=symbol, days=days)
+            report = self._cached_review(symbol=symbol, days=days)
         
         # 创建图表
         fig = go.Figure()
@@ -226,8 +286,8 @@ class AIBacktester:
     
     def get_symbol_performance(self, days=30, min_signals=5):
         """获取每个标的的性能数据"""
-        report = self.review(days=days)
-        symbol_perf = report['symbol_performance']
+        report = self._cached_review(days=days)
+        symbol_perf = report.get('symbol_performance', {})
         
         # 过滤掉信号数量少于阈值的标的
         filtered_perf = {
@@ -249,26 +309,27 @@ class AIBacktester:
     
     def export_to_csv(self, symbol=None, days=30):
         """导出回测结果到CSV"""
-        signals = self.knowledge_base.query_signals(symbol=symbol)
+        signals = self._get_signals(symbol)
         
-        # 按时间过滤最近N天的信号
-        cutoff_date = datetime.now() - timedelta(days=days)
-        recent_signals = [
-            signal for signal in signals 
-            if datetime.fromisoformat(signal.get('timestamp', '2000-01-01T00:00:00')).replace(tzinfo=None) > cutoff_date
-        ]
+        # 只解析时间戳列，按时间过滤最近N天的信号
+        timestamps = self._parse_timestamps(pd.Series([signal.get('timestamp') for signal in signals], dtype=object))
+        keep = (timestamps > self._cutoff(days)).to_numpy()
+        recent_signals = [signal for signal, kept in zip(signals, keep) if kept]
         
         if not recent_signals:
             logger.warning(f"没有找到符合条件的信号导出 (symbol={symbol}, days={days})")
             return None
         
-        # 转换为DataFrame
-        df = pd.DataFrame(recent_signals)
-        
-        # 导出到CSV
+        # 直接逐行写出CSV，不构建完整的DataFrame；列按字段首次出现的顺序排列
+        fieldnames = list(dict.fromkeys(key for signal in recent_signals for key in signal))
         filename = f"ai_signals_{symbol or 'all'}_{datetime.now().strftime('%Y%m%d')}.csv"
         export_path = self.results_dir / filename
-        df.to_csv(export_path, index=False)
+        tmp_path = export_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(recent_signals)
+        os.replace(tmp_path, export_path)
         logger.info(f"信号数据已导出: {export_path}")
         
         return export_path
@@ -2,15 +2,29 @@
 AI Chart Analyzer for generating technical analysis insights using DeepSeek AI.
 """
 
+import time
+from collections import OrderedDict
+
 from utils.deepseek_agent import DeepSeekAgent
 from utils.market_data_provider import MarketDataProvider
 from utils.technical_indicator_lib import TechnicalIndicatorLib
 
+# Seconds an analysis is reused for the same symbol/parameters and unchanged market data
+ANALYSIS_CACHE_TTL = 300
+
+# Maximum number of cached analyses, the least recently used entry is dropped first
+ANALYSIS_CACHE_SIZE = 512
+
+# Indicator columns whose latest value goes into the prompt
+SNAPSHOT_COLUMNS = ('close', 'rsi', 'fisher', 'macd', 'macd_signal', 'upper_band', 'lower_band')
+
 class AIChartAnalyzer:
     def __init__(self):
         self.agent = DeepSeekAgent(model="deepseek-ai/DeepSeek-V3")
         self.data_provider = MarketDataProvider()
         self.indicators = TechnicalIndicatorLib()
+        # {(symbol, days, brief, prompt): (created time, analysis)}
+        self._analysis_cache = OrderedDict()
     
     def analyze(self, symbol, days=30, brief=False):
         """
@@ -31,21 +45,24 @@ class AIChartAnalyzer:
             # Calculate technical indicators
             df = self.indicators.add_indicators(df)
             
-            # Extract key metrics for the prompt
-            current_price = df['close'].iloc[-1]
-            price_change = (df['close'].iloc[-1] - df['close'].iloc[-5]) / df['close'].iloc[-5] * 100
-            rsi = df['rsi'].iloc[-1] if 'rsi' in df.columns else "Unknown"
-            fisher = df['fisher'].iloc[-1] if 'fisher' in df.columns else "Unknown"
-            macd = df['macd'].iloc[-1] if 'macd' in df.columns else "Unknown"
-            signal = df['macd_signal'].iloc[-1] if 'macd_signal' in df.columns else "Unknown"
+            # Extract key metrics for the prompt, snapshotting the last row once instead of an .iloc per column
+            tail = df.tail(5)
+            last = {col: float(tail[col].to_numpy()[-1]) for col in SNAPSHOT_COLUMNS if col in tail.columns}
+            current_price = last['close']
+            close_5d_ago = float(tail['close'].to_numpy()[-5])
+            price_change = (current_price - close_5d_ago) / close_5d_ago * 100
+            rsi = last.get('rsi', "Unknown")
+            fisher = last.get('fisher', "Unknown")
+            macd = last.get('macd', "Unknown")
+            signal = last.get('macd_signal', "Unknown")
             
             # Get trend information
             trend_direction = self.indicators.get_trend_direction(df)
             trend_strength = self.indicators.get_trend_strength(df)
             
             # Check if price is near Bollinger Bands
-            upper_band = df['upper_band'].iloc[-1]
-            lower_band = df['lower_band'].iloc[-1]
+            upper_band = last['upper_band']
+            lower_band = last['lower_band']
             band_position = (current_price - lower_band) / (upper_band - lower_band) * 100
             
             # Create prompt for AI
@@ -57,14 +74,28 @@ class AIChartAnalyzer:
                                                    rsi, fisher, macd, signal, 
                                                    trend_direction, trend_strength, band_position)
             
-            # Get AI analysis
-            analysis = self.agent.ask(prompt)
-            
-            return analysis
+            # Get AI analysis, the prompt embeds the latest prices so new data misses the cache
+            return self._ask_cached((symbol, days, brief, prompt), prompt)
         
         except Exception as e:
             return f"无法分析 {symbol}：{str(e)}"
     
+    def _ask_cached(self, key, prompt):
+        """Return the cached analysis for key if younger than ANALYSIS_CACHE_TTL, otherwise ask the agent"""
+        cached = self._analysis_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < ANALYSIS_CACHE_TTL:
+            self._analysis_cache.move_to_end(key)
+            return cached[1]
+        
+        analysis = self.agent.ask(prompt)
+        # Failed requests are not cached so the next refresh retries
+        if not analysis.startswith("分析错误"):
+            self._analysis_cache[key] = (time.monotonic(), analysis)
+            self._analysis_cache.move_to_end(key)
+            if len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+                self._analysis_cache.popitem(last=False)
+        return analysis
+    
     def _create_brief_prompt(self, symbol, price, change, rsi, trend, band_position):
         """Create a brief analysis prompt"""
         prompt = f"""
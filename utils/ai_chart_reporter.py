@@ -3,22 +3,81 @@ AI图表报告生成器
 生成交易策略绩效的可视化图表，并支持发送到Telegram
 """
 
+import io
 import os
+import asyncio
+import inspect
 import logging
+import functools
+import contextlib
+import threading
 from pathlib import Path
 from datetime import datetime
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import seaborn as sns
-from typing import Optional, Dict, List, Any, Union, Tuple
+import matplotlib
+import matplotlib.style
+from matplotlib.figure import Figure
+from typing import Optional, Dict, List, Any, Union, Tuple, BinaryIO
 import json
 import telegram
 from telegram import Bot
+from utils.pnl_numba import NUMBA_AVAILABLE, pnl_stats_kernel
+from utils.fast_pnl_render import render_pnl_png
 
 logger = logging.getLogger(__name__)
 
+# 支持的图表格式：png 由 matplotlib 渲染（用于 Telegram），plotly 返回图表数据由前端渲染
+CHART_FORMATS = ("png", "plotly")
+
+# seaborn darkgrid 样式在 dark_background 基础上修改的 rcParams，直接设置以免导入 seaborn（会连带导入 scipy）
+_DARKGRID_RC = {
+    "axes.facecolor": "#EAEAF2",
+    "axes.axisbelow": True,
+    "axes.grid": True,
+    "axes.labelcolor": ".15",
+    "figure.facecolor": "white",
+    "font.sans-serif": ["Arial", "DejaVu Sans", "Liberation Sans", "Bitstream Vera Sans", "sans-serif"],
+    "lines.solid_capstyle": "round",
+    "patch.edgecolor": "w",
+    "patch.force_edgecolor": True,
+    "text.color": ".15",
+    "xtick.bottom": False,
+    "xtick.color": ".15",
+    "ytick.color": ".15",
+    "ytick.left": False,
+}
+
+def _apply_matplotlib_style():
+    """
+    设置Matplotlib图表样式，rcParams 是进程内全局的，模块导入时设置一次即可，不必每次创建实例都重新校验
+    图表都直接由 Figure 绘制并输出 PNG，不导入 pyplot，也就不会初始化 Qt/Tk 等交互式后端
+    """
+    matplotlib.style.use('dark_background')
+    matplotlib.rcParams.update(_DARKGRID_RC)
+    
+    # 自定义样式设定
+    matplotlib.rcParams.update({
+        'figure.figsize': (10, 6),
+        'axes.titlesize': 16,
+        'axes.labelsize': 12,
+        'xtick.labelsize': 10,
+        'ytick.labelsize': 10,
+        'legend.fontsize': 10,
+        'axes.grid': True,
+        'grid.alpha': 0.3,
+    })
+
+_apply_matplotlib_style()
+
+def _figure_locked(method):
+    """matplotlib 不是线程安全的，复用的图表对象同一时间只允许一个调用绘制"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._figure_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class AIChartReporter:
     """AI图表报告生成器"""
     
@@ -39,46 +98,161 @@ class AIChartReporter:
         if not self.telegram_chat_id:
             logger.warning("未设置TELEGRAM_CHAT_ID环境变量，Telegram推送功能将被禁用")
         
-        # 创建图表临时目录
+        # 同步版 python-telegram-bot 的 Bot，首次发送时创建并复用其 HTTP 连接池
+        self._bot: Optional[Bot] = None
+        
+        # 图表临时目录，只在保存图表文件时创建
         self.charts_dir = Path("temp_charts")
-        self.charts_dir.mkdir(exist_ok=True)
         
-        # 设置默认样式
-        self._set_matplotlib_style()
-    
-    def _set_matplotlib_style(self):
-        """设置Matplotlib图表样式"""
-        plt.style.use('dark_background')
-        sns.set_style("darkgrid")
-        
-        # 自定义样式设定
-        plt.rcParams['figure.figsize'] = (10, 6)
-        plt.rcParams['axes.titlesize'] = 16
-        plt.rcParams['axes.labelsize'] = 12
-        plt.rcParams['xtick.labelsize'] = 10
-        plt.rcParams['ytick.labelsize'] = 10
-        plt.rcParams['legend.fontsize'] = 10
-        plt.rcParams['axes.grid'] = True
-        plt.rcParams['grid.alpha'] = 0.3
+        # 按图表类型复用的 Figure，每次绘制前清空，避免重复创建和销毁图表
+        self._figures: Dict[str, Figure] = {}
+        self._figure_lock = threading.RLock()
     
     def _get_chart_path(self, chart_type: str) -> str:
         """生成图表文件路径"""
+        self.charts_dir.mkdir(exist_ok=True)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         return str(self.charts_dir / f"{chart_type}_{timestamp}.png")
     
+    def _get_figure(self, chart_type: str, figsize: Tuple[float, float]) -> Figure:
+        """
+        获取该类型图表复用的 Figure 并清空内容
+        Figure 不经过 pyplot 创建，不注册到 pyplot 的图表管理器，无需关闭
+        """
+        fig = self._figures.get(chart_type)
+        if fig is None:
+            fig = self._figures[chart_type] = Figure(figsize=figsize)
+        else:
+            fig.clear()
+        return fig
+    
+    def _save_chart(self, fig: Figure, chart_type: str, save_to_disk: bool) -> Dict[str, Any]:
+        """
+        将 matplotlib 图表保存为 PNG
+        
+        Returns:
+            save_to_disk 为 True 时返回 {"chart_path": 文件路径}，否则返回 {"chart_buffer": 内存中的 PNG}
+        """
+        if save_to_disk:
+            chart_path = self._get_chart_path(chart_type)
+            fig.savefig(chart_path, dpi=100, bbox_inches='tight')
+            return {"chart_path": chart_path}
+        
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+        buffer.seek(0)
+        return {"chart_buffer": buffer}
+    
+    def _store_png(self, png: bytes, chart_type: str, save_to_disk: bool) -> Dict[str, Any]:
+        """保存已编码的 PNG 数据，返回值同 _save_chart"""
+        if save_to_disk:
+            chart_path = self._get_chart_path(chart_type)
+            Path(chart_path).write_bytes(png)
+            return {"chart_path": chart_path}
+        return {"chart_buffer": io.BytesIO(png)}
+    
+    def _plotly_pnl_figure(self, cum_pnl: pd.Series, max_dd_idx: int, high_idx: int, title: str):
+        """生成盈亏曲线的 plotly 图表"""
+        # plotly 导入较慢，只在生成图表时加载
+        import plotly.graph_objects as go
+        
+        x = cum_pnl.index.tolist()
+        y = cum_pnl.to_numpy(dtype=np.float64)
+        fig = go.Figure()
+        
+        # 正负区域分别填充到零线
+        fig.add_trace(go.Scatter(x=x, y=np.where(y > 0, y, 0).tolist(), mode='none', fill='tozeroy',
+                                 fillcolor='rgba(0, 128, 0, 0.3)', hoverinfo='skip', showlegend=False))
+        fig.add_trace(go.Scatter(x=x, y=np.where(y < 0, y, 0).tolist(), mode='none', fill='tozeroy',
+                                 fillcolor='rgba(255, 0, 0, 0.3)', hoverinfo='skip', showlegend=False))
+        
+        # 累积盈亏曲线
+        fig.add_trace(go.Scatter(x=x, y=y.tolist(), mode='lines+markers', name='累计盈亏',
+                                 line=dict(width=2), marker=dict(size=4)))
+        fig.add_hline(y=0, line_dash='dash', line_color='gray', opacity=0.5)
+        
+        # 标记最大回撤区域
+        if max_dd_idx > 0:
+            fig.add_shape(type='rect', x0=x[high_idx], x1=x[max_dd_idx], y0=y[max_dd_idx], y1=y[high_idx],
+                          fillcolor='red', opacity=0.2, line_width=0)
+            fig.add_trace(go.Scatter(x=[x[high_idx], x[max_dd_idx]], y=[y[high_idx], y[max_dd_idx]],
+                                     mode='lines', name='最大回撤', line=dict(color='red', dash='dash')))
+        
+        fig.update_layout(title=title, xaxis_title='时间/交易次数', yaxis_title='累计盈亏 ($)', template='plotly_dark')
+        return fig
+    
+    def _plotly_strategy_figure(self, labels: List[str], values: np.ndarray, title: str):
+        """生成策略盈亏占比饼图和盈亏条形图的 plotly 图表"""
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+        
+        fig = make_subplots(rows=1, cols=2, specs=[[{"type": "domain"}, {"type": "xy"}]],
+                            subplot_titles=("策略盈亏占比", "策略具体盈亏"))
+        
+        # 饼图 - 按盈亏比例分布，总和为零时均分避免除以零
+        sizes = np.abs(values)
+        if sizes.sum() == 0:
+            sizes = np.ones_like(sizes)
+        fig.add_trace(go.Pie(labels=[f"{l} (${v:.0f})" for l, v in zip(labels, values)], values=sizes.tolist(),
+                             marker=dict(colors=np.where(values > 0, 'green', 'red').tolist()),
+                             textinfo='percent', sort=False), row=1, col=1)
+        
+        # 条形图 - 按盈亏金额排序
+        order = np.argsort(values, kind='stable')
+        sorted_values = values[order]
+        fig.add_trace(go.Bar(x=sorted_values.tolist(), y=[labels[i] for i in order], orientation='h',
+                             marker_color=np.where(sorted_values >= 0, 'green', 'red').tolist(),
+                             text=[f"${v:.0f}" for v in sorted_values], textposition='outside',
+                             showlegend=False), row=1, col=2)
+        fig.add_shape(type='line', x0=0, x1=0, y0=0, y1=1, xref='x', yref='y domain',
+                      line=dict(color='gray', dash='dash'), opacity=0.7)
+        
+        fig.update_layout(title=title, xaxis_title='盈亏金额 ($)', template='plotly_dark')
+        return fig
+    
+    def _plotly_metrics_figure(self, categories: List[str], values: List[float], norm_values: List[float],
+                               comp_norm_values: Optional[List[float]], title: str):
+        """生成绩效指标雷达图的 plotly 图表，norm_values 已按首点闭合"""
+        import plotly.graph_objects as go
+        
+        theta = [f"{category}: {value:.2f}" for category, value in zip(categories, values)]
+        theta += theta[:1]
+        
+        fig = go.Figure()
+        fig.add_trace(go.Scatterpolar(r=norm_values, theta=theta, fill='toself', name='当前策略',
+                                      line=dict(color='green', width=2)))
+        if comp_norm_values is not None:
+            fig.add_trace(go.Scatterpolar(r=comp_norm_values, theta=theta, fill='toself', name='基准',
+                                          line=dict(color='blue', width=2), opacity=0.5))
+        
+        fig.update_layout(title=title, template='plotly_dark',
+                          polar=dict(radialaxis=dict(range=[0, 1], showticklabels=False)),
+                          showlegend=comp_norm_values is not None)
+        return fig
+    
+    @_figure_locked
     def generate_pnl_chart(self, 
                          pnl_data: Union[pd.Series, List[float], Dict[str, float]], 
-                         title: str = "交易盈亏走势") -> Dict[str, Any]:
+                         title: str = "交易盈亏走势",
+                         fmt: str = "png",
+                         save_to_disk: bool = True,
+                         fast: bool = False) -> Dict[str, Any]:
         """
         生成盈亏曲线图
         
         Args:
             pnl_data: 盈亏数据，可以是Series、List或者带时间戳的Dict
             title: 图表标题
+            fmt: 图表格式，png 生成 PNG 图片，plotly 返回 chart_json 图表数据
+            save_to_disk: PNG 是否写入 temp_charts 目录（返回 chart_path），否则返回内存中的 chart_buffer
+            fast: 用 Pillow 直接绘制简化的 PNG（适合 Telegram 推送），不经过 matplotlib
             
         Returns:
-            包含图表路径和状态的字典
+            包含图表路径（或图表缓冲区、图表数据）和状态的字典
         """
+        if fmt not in CHART_FORMATS:
+            return {"success": False, "error": f"不支持的图表格式: {fmt}"}
+        
         try:
             # 将不同格式的输入转换为pandas Series
             if isinstance(pnl_data, list):
@@ -88,14 +262,38 @@ class AIChartReporter:
             else:
                 pnl_series = pnl_data
             
-            # 计算累积盈亏
-            if not pnl_series.empty:
-                cum_pnl = pnl_series.cumsum()
-            else:
+            # 计算累积盈亏及最大回撤
+            if pnl_series.empty:
                 return {"success": False, "error": "盈亏数据为空"}
+            cum_pnl, drawdown_min, max_dd_idx, high_idx, wins = self._pnl_stats(pnl_series)
+            
+            # 关键统计信息
+            total_pnl = cum_pnl.iloc[-1]
+            max_drawdown = abs(drawdown_min) * 100
+            win_rate = wins / len(pnl_series) * 100
+            stats = {
+                "total_pnl": float(total_pnl),
+                "max_drawdown": float(max_drawdown),
+                "win_rate": float(win_rate)
+            }
+            
+            stats_text = (
+                f"总盈亏: ${total_pnl:.2f}\n"
+                f"最大回撤: {max_drawdown:.2f}%\n"
+                f"胜率: {win_rate:.1f}%"
+            )
+            
+            if fmt == "plotly":
+                fig = self._plotly_pnl_figure(cum_pnl, max_dd_idx, high_idx, title)
+                return {"success": True, "chart_json": fig.to_dict(), "stats": stats}
+            
+            if fast:
+                png = render_pnl_png(cum_pnl.to_numpy(dtype=np.float64), title, stats_text, max_dd_idx, high_idx)
+                return {"success": True, **self._store_png(png, 'pnl_chart', save_to_disk), "stats": stats}
             
             # 创建图表
-            fig, ax = plt.subplots(figsize=(10, 6))
+            fig = self._get_figure('pnl_chart', (10, 6))
+            ax = fig.add_subplot()
             
             # 绘制累积盈亏曲线
             ax.plot(cum_pnl.index, cum_pnl.values, 
@@ -116,16 +314,7 @@ class AIChartReporter:
                           color='red', alpha=0.3)
             
             # 标记最大回撤区域
-            def calculate_drawdown(equity_curve):
-                """计算回撤序列"""
-                running_max = np.maximum.accumulate(equity_curve)
-                drawdown = (equity_curve - running_max) / running_max
-                return drawdown
-            
-            drawdown = calculate_drawdown(cum_pnl.values)
-            max_dd_idx = np.argmin(drawdown)
             if max_dd_idx > 0:
-                high_idx = np.argmax(cum_pnl.values[:max_dd_idx+1])
                 ax.plot([cum_pnl.index[high_idx], cum_pnl.index[max_dd_idx]],
                        [cum_pnl.values[high_idx], cum_pnl.values[max_dd_idx]],
                        'r--', linewidth=1.5, alpha=0.7)
@@ -141,89 +330,105 @@ class AIChartReporter:
             ax.legend()
             ax.grid(True, alpha=0.3)
             
-            # 显示关键统计信息
-            total_pnl = cum_pnl.iloc[-1] if len(cum_pnl) > 0 else 0
-            max_drawdown = abs(np.min(drawdown)) * 100 if len(drawdown) > 0 else 0
-            win_rate = np.sum(pnl_series > 0) / len(pnl_series) * 100 if len(pnl_series) > 0 else 0
-            
-            stats_text = (
-                f"总盈亏: ${total_pnl:.2f}\n"
-                f"最大回撤: {max_drawdown:.2f}%\n"
-                f"胜率: {win_rate:.1f}%"
-            )
-            
             # 添加统计信息文本框
             ax.text(0.02, 0.05, stats_text, transform=ax.transAxes,
                   bbox=dict(facecolor='black', alpha=0.7, boxstyle='round,pad=0.5'))
             
             # 调整布局
-            plt.tight_layout()
+            fig.tight_layout()
             
             # 保存图表
-            chart_path = self._get_chart_path('pnl_chart')
-            plt.savefig(chart_path, dpi=100, bbox_inches='tight')
-            plt.close()
+            chart = self._save_chart(fig, 'pnl_chart', save_to_disk)
             
             return {
                 "success": True,
-                "chart_path": chart_path,
-                "stats": {
-                    "total_pnl": float(total_pnl),
-                    "max_drawdown": float(max_drawdown),
-                    "win_rate": float(win_rate)
-                }
+                **chart,
+                "stats": stats
             }
         except Exception as e:
             logger.error(f"生成盈亏图表时出错: {str(e)}")
             return {"success": False, "error": str(e)}
     
+    def _pnl_stats(self, pnl_series: pd.Series) -> Tuple[pd.Series, float, int, int, int]:
+        """
+        计算累积盈亏、最大回撤、回撤起止位置和盈利笔数
+        安装了 numba 时由 pnl_stats_kernel 一次遍历完成，否则使用 numpy 分步计算
+        
+        Returns:
+            (累积盈亏, 最大回撤比例, 最大回撤位置, 回撤前高点位置, 盈利笔数)
+        """
+        if NUMBA_AVAILABLE:
+            cum, max_dd, max_dd_idx, high_idx, wins = pnl_stats_kernel(np.asarray(pnl_series, dtype=np.float64))
+            return pd.Series(cum, index=pnl_series.index), max_dd, max_dd_idx, high_idx, wins
+        
+        cum_pnl = pnl_series.cumsum()
+        running_max = np.maximum.accumulate(cum_pnl.values)
+        drawdown = (cum_pnl.values - running_max) / running_max
+        max_dd_idx = np.argmin(drawdown)
+        high_idx = np.argmax(cum_pnl.values[:max_dd_idx+1])
+        wins = np.sum(pnl_series > 0)
+        return cum_pnl, np.min(drawdown), max_dd_idx, high_idx, wins
+    
+    @_figure_locked
     def generate_strategy_distribution_chart(self, 
                                           strategy_results: Dict[str, float],
-                                          title: str = "策略盈亏分布") -> Dict[str, Any]:
+                                          title: str = "策略盈亏分布",
+                                          fmt: str = "png",
+                                          save_to_disk: bool = True) -> Dict[str, Any]:
         """
         生成策略盈亏分布饼图
         
         Args:
             strategy_results: 策略名称到盈亏金额的映射字典
             title: 图表标题
+            fmt: 图表格式，png 生成 PNG 图片，plotly 返回 chart_json 图表数据
+            save_to_disk: PNG 是否写入 temp_charts 目录（返回 chart_path），否则返回内存中的 chart_buffer
             
         Returns:
-            包含图表路径和状态的字典
+            包含图表路径（或图表缓冲区、图表数据）和状态的字典
         """
+        if fmt not in CHART_FORMATS:
+            return {"success": False, "error": f"不支持的图表格式: {fmt}"}
+        
         try:
-            # 分离正负盈亏
-            positive_results = {k: v for k, v in strategy_results.items() if v > 0}
-            negative_results = {k: v for k, v in strategy_results.items() if v < 0}
-            
             # 如果没有数据，返回错误
             if not strategy_results:
                 return {"success": False, "error": "策略结果数据为空"}
             
+            # 转换为数组，统计和绘图所需的各项数据都按数组计算
+            labels = list(strategy_results.keys())
+            values = np.fromiter(strategy_results.values(), dtype=np.float64, count=len(labels))
+            
+            # 总盈亏统计
+            total_pnl = values.sum()
+            total_pos = values[values > 0].sum()
+            total_neg = values[values < 0].sum()
+            stats = {
+                "total_pnl": float(total_pnl),
+                "total_positive": float(total_pos),
+                "total_negative": float(total_neg),
+                "best_strategy": labels[int(values.argmax())],
+                "worst_strategy": labels[int(values.argmin())]
+            }
+            
+            if fmt == "plotly":
+                fig = self._plotly_strategy_figure(labels, values, title)
+                return {"success": True, "chart_json": fig.to_dict(), "stats": stats}
+            
             # 创建图表（2个子图：饼图和条形图）
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 7))
+            fig = self._get_figure('strategy_distribution', (14, 7))
+            ax1, ax2 = fig.subplots(1, 2)
             
             # 饼图 - 按盈亏比例分布
-            abs_values = {k: abs(v) for k, v in strategy_results.items()}
-            labels = list(abs_values.keys())
-            sizes = list(abs_values.values())
-            # 确保所有盈亏的总和为100%
-            total = sum(sizes)
-            if total == 0:
-                sizes = [1] * len(sizes)  # 避免除以零
-                
-            # 计算每个策略占总盈亏的百分比
-            percentages = [s/sum(sizes)*100 for s in sizes]
+            sizes = np.abs(values)
+            if sizes.sum() == 0:
+                sizes = np.ones_like(sizes)  # 避免除以零
             
             # 计算高亮突出显示 (将最大的策略突出)
-            explode = [0.1 if s == max(sizes) else 0.0 for s in sizes]
+            explode = np.where(sizes == sizes.max(), 0.1, 0.0)
             
             # 为正负盈亏设置不同颜色
-            colors = []
-            for k in labels:
-                if k in positive_results:
-                    colors.append('green')
-                else:
-                    colors.append('red')
+            colors = np.where(values > 0, 'green', 'red')
             
             # 绘制饼图
             wedges, texts, autotexts = ax1.pie(
@@ -242,7 +447,7 @@ class AIChartReporter:
                 autotext.set_fontsize(9)
             
             # 添加图例
-            labels_with_values = [f"{l} (${strategy_results[l]:.0f})" for l in labels]
+            labels_with_values = [f"{l} (${v:.0f})" for l, v in zip(labels, values)]
             ax1.legend(wedges, labels_with_values, 
                      title="策略贡献",
                      loc="center left",
@@ -250,26 +455,17 @@ class AIChartReporter:
             
             ax1.set_title("策略盈亏占比", fontweight='bold')
             
-            # 绘制条形图 - 各策略具体盈亏金额
-            strategies = list(strategy_results.keys())
-            values = list(strategy_results.values())
-            
-            # 按盈亏金额排序
-            sorted_indices = sorted(range(len(values)), key=lambda i: values[i])
-            strategies = [strategies[i] for i in sorted_indices]
-            values = [values[i] for i in sorted_indices]
-            
-            bars = ax2.barh(strategies, values)
+            # 绘制条形图 - 各策略具体盈亏金额，按盈亏金额排序
+            order = np.argsort(values, kind='stable')
+            sorted_values = values[order]
+            bars = ax2.barh([labels[i] for i in order], sorted_values)
             
             # 为正负值设置不同颜色
-            for i, v in enumerate(values):
-                if v >= 0:
-                    bars[i].set_color('green')
-                else:
-                    bars[i].set_color('red')
+            for bar, color in zip(bars, np.where(sorted_values >= 0, 'green', 'red')):
+                bar.set_color(color)
             
             # 添加数值标签
-            for i, v in enumerate(values):
+            for i, v in enumerate(sorted_values):
                 ax2.text(v + (5 if v >= 0 else -5), 
                        i, 
                        f"${v:.0f}", 
@@ -284,11 +480,6 @@ class AIChartReporter:
             ax2.axvline(x=0, color='gray', linestyle='--', alpha=0.7)
             ax2.grid(True, alpha=0.3)
             
-            # 总盈亏统计
-            total_pnl = sum(strategy_results.values())
-            total_pos = sum(v for v in strategy_results.values() if v > 0)
-            total_neg = sum(v for v in strategy_results.values() if v < 0)
-            
             stats_text = (
                 f"总盈亏: ${total_pnl:.0f}\n"
                 f"盈利策略: ${total_pos:.0f}\n"
@@ -300,36 +491,31 @@ class AIChartReporter:
                    bbox=dict(facecolor='black', alpha=0.7, boxstyle='round,pad=0.5'))
             
             # 设置整体标题
-            plt.suptitle(title, fontsize=16, fontweight='bold')
+            fig.suptitle(title, fontsize=16, fontweight='bold')
             
             # 调整布局
-            plt.tight_layout()
+            fig.tight_layout()
             fig.subplots_adjust(top=0.9)
             
             # 保存图表
-            chart_path = self._get_chart_path('strategy_distribution')
-            plt.savefig(chart_path, dpi=100, bbox_inches='tight')
-            plt.close()
+            chart = self._save_chart(fig, 'strategy_distribution', save_to_disk)
             
             return {
                 "success": True,
-                "chart_path": chart_path,
-                "stats": {
-                    "total_pnl": float(total_pnl),
-                    "total_positive": float(total_pos),
-                    "total_negative": float(total_neg),
-                    "best_strategy": max(strategy_results.items(), key=lambda x: x[1])[0],
-                    "worst_strategy": min(strategy_results.items(), key=lambda x: x[1])[0]
-                }
+                **chart,
+                "stats": stats
             }
         except Exception as e:
             logger.error(f"生成策略分布图表时出错: {str(e)}")
             return {"success": False, "error": str(e)}
     
+    @_figure_locked
     def generate_performance_metrics_chart(self,
                                         metrics: Dict[str, float],
                                         comparison_metrics: Optional[Dict[str, float]] = None,
-                                        title: str = "策略绩效指标") -> Dict[str, Any]:
+                                        title: str = "策略绩效指标",
+                                        fmt: str = "png",
+                                        save_to_disk: bool = True) -> Dict[str, Any]:
         """
         生成绩效指标雷达图
         
@@ -337,10 +523,15 @@ class AIChartReporter:
             metrics: 绩效指标字典，如 {'Sharpe': 1.2, 'Sortino': 1.5, ...}
             comparison_metrics: 可选的对比指标，如基准指标
             title: 图表标题
+            fmt: 图表格式，png 生成 PNG 图片，plotly 返回 chart_json 图表数据
+            save_to_disk: PNG 是否写入 temp_charts 目录（返回 chart_path），否则返回内存中的 chart_buffer
             
         Returns:
-            包含图表路径和状态的字典
+            包含图表路径（或图表缓冲区、图表数据）和状态的字典
         """
+        if fmt not in CHART_FORMATS:
+            return {"success": False, "error": f"不支持的图表格式: {fmt}"}
+        
         try:
             if not metrics:
                 return {"success": False, "error": "绩效指标数据为空"}
@@ -366,9 +557,16 @@ class AIChartReporter:
                 comp_values = [comparison_metrics.get(cat, 0) for cat in categories]
                 comp_norm_values = [cv / max_v for cv, max_v in zip(comp_values, max_values)]
                 comp_norm_values += comp_norm_values[:1]  # 闭合
+            else:
+                comp_norm_values = None
+            
+            if fmt == "plotly":
+                fig = self._plotly_metrics_figure(categories, values, norm_values, comp_norm_values, title)
+                return {"success": True, "chart_json": fig.to_dict(), "metrics": metrics}
             
             # 创建图表
-            fig, ax = plt.subplots(figsize=(8, 8), subplot_kw=dict(polar=True))
+            fig = self._get_figure('performance_metrics', (8, 8))
+            ax = fig.add_subplot(polar=True)
             
             # 绘制背景网格
             ax.fill(angles, [1]*len(angles), color='gray', alpha=0.1)
@@ -403,25 +601,23 @@ class AIChartReporter:
                 ax.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1))
             
             # 保存图表
-            chart_path = self._get_chart_path('performance_metrics')
-            plt.savefig(chart_path, dpi=100, bbox_inches='tight')
-            plt.close()
+            chart = self._save_chart(fig, 'performance_metrics', save_to_disk)
             
             return {
                 "success": True,
-                "chart_path": chart_path,
+                **chart,
                 "metrics": metrics
             }
         except Exception as e:
             logger.error(f"生成绩效指标图表时出错: {str(e)}")
             return {"success": False, "error": str(e)}
     
-    def send_chart_to_telegram(self, chart_path: str, caption: Optional[str] = None) -> bool:
+    def send_chart_to_telegram(self, chart: Union[str, Path, BinaryIO], caption: Optional[str] = None) -> bool:
         """
         发送图表到Telegram
         
         Args:
-            chart_path: 图表文件路径
+            chart: 图表文件路径，或内存中的 PNG（如 chart_buffer）
             caption: 可选的图表说明
             
         Returns:
@@ -431,22 +627,78 @@ class AIChartReporter:
             logger.warning("未设置Telegram配置，图表发送失败")
             return False
         
+        # 同步 Bot（python-telegram-bot v13）直接阻塞发送
+        if not inspect.iscoroutinefunction(Bot.send_photo):
+            return self._send_photo_sync(self._get_bot(), chart, caption)
+        
+        # v20+ 的异步 Bot 需要事件循环，已在事件循环中时无法阻塞等待，应改用 send_chart_async
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.send_chart_async(chart, caption))
+        logger.error("发送图表到Telegram时出错: 事件循环中请使用 send_chart_async")
+        return False
+    
+    async def send_chart_async(self, chart: Union[str, Path, BinaryIO], caption: Optional[str] = None) -> bool:
+        """异步发送单张图表到Telegram，参数同 send_chart_to_telegram"""
+        results = await self.send_many([(chart, caption)])
+        return results[0]
+    
+    async def send_many(self, charts: List[Tuple[Union[str, Path, BinaryIO], Optional[str]]]) -> List[bool]:
+        """
+        并发发送多张图表到Telegram，共用同一个 Bot 的连接
+        
+        Args:
+            charts: (图表文件路径或内存中的 PNG, 图表说明) 列表
+            
+        Returns:
+            每张图表是否发送成功
+        """
+        if not self.telegram_token or not self.telegram_chat_id:
+            logger.warning("未设置Telegram配置，图表发送失败")
+            return [False] * len(charts)
+        
+        if not inspect.iscoroutinefunction(Bot.send_photo):
+            bot = self._get_bot()
+            return list(await asyncio.gather(*[self._send_photo(bot, chart, caption) for chart, caption in charts]))
+        
+        # python-telegram-bot v20+ 的 Bot 是异步的，连接池绑定当前事件循环，只在本次发送内共享
+        try:
+            async with Bot(token=self.telegram_token) as bot:
+                return list(await asyncio.gather(*[self._send_photo(bot, chart, caption) for chart, caption in charts]))
+        except Exception as e:
+            logger.error(f"发送图表到Telegram时出错: {str(e)}")
+            return [False] * len(charts)
+    
+    def _get_bot(self) -> Bot:
+        """返回复用的同步 Bot，首次调用时创建"""
+        if self._bot is None:
+            self._bot = Bot(token=self.telegram_token)
+        return self._bot
+    
+    def _send_photo_sync(self, bot: Bot, chart: Union[str, Path, BinaryIO], caption: Optional[str]) -> bool:
+        """使用同步 Bot 发送单张图表"""
+        try:
+            with open(chart, 'rb') if isinstance(chart, (str, Path)) else contextlib.nullcontext(chart) as photo:
+                bot.send_photo(chat_id=self.telegram_chat_id, photo=photo, caption=caption)
+            
+            logger.info(f"成功发送图表到Telegram: {chart}" if isinstance(chart, (str, Path)) else "成功发送图表到Telegram")
+            return True
+        except Exception as e:
+            logger.error(f"发送图表到Telegram时出错: {str(e)}")
+            return False
+    
+    async def _send_photo(self, bot: Bot, chart: Union[str, Path, BinaryIO], caption: Optional[str]) -> bool:
+        """发送单张图表，同步 Bot 的阻塞请求放到线程池中执行，以便多张图表并发发送"""
+        if not inspect.iscoroutinefunction(bot.send_photo):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._send_photo_sync, bot, chart, caption)
+        
         try:
-            bot = Bot(token=self.telegram_token)
-            with open(chart_path, 'rb') as chart_file:
-                if caption:
-                    bot.send_photo(
-                        chat_id=self.telegram_chat_id, 
-                        photo=chart_file, 
-                        caption=caption
-                    )
-                else:
-                    bot.send_photo(
-                        chat_id=self.telegram_chat_id, 
-                        photo=chart_file
-                    )
-            
-            logger.info(f"成功发送图表到Telegram: {chart_path}")
+            with open(chart, 'rb') if isinstance(chart, (str, Path)) else contextlib.nullcontext(chart) as photo:
+                await bot.send_photo(chat_id=self.telegram_chat_id, photo=photo, caption=caption)
+            
+            logger.info(f"成功发送图表到Telegram: {chart}" if isinstance(chart, (str, Path)) else "成功发送图表到Telegram")
             return True
         except Exception as e:
             logger.error(f"发送图表到Telegram时出错: {str(e)}")
@@ -455,7 +707,8 @@ class AIChartReporter:
     def generate_and_send_pnl_chart(self, 
                                   pnl_data: Union[pd.Series, List[float], Dict[str, float]], 
                                   title: str = "交易盈亏走势",
-                                  caption: Optional[str] = None) -> Dict[str, Any]:
+                                  caption: Optional[str] = None,
+                                  fast: bool = True) -> Dict[str, Any]:
         """
         生成并发送盈亏曲线图到Telegram
         
@@ -463,12 +716,13 @@ class AIChartReporter:
             pnl_data: 盈亏数据
             title: 图表标题
             caption: Telegram消息说明
+            fast: 使用 Pillow 快速绘制，False 时使用 matplotlib 生成完整图表
             
         Returns:
             操作结果字典
         """
         # 生成图表
-        result = self.generate_pnl_chart(pnl_data, title)
+        result = self.generate_pnl_chart(pnl_data, title, save_to_disk=False, fast=fast)
         
         if not result["success"]:
             return result
@@ -484,18 +738,11 @@ class AIChartReporter:
             )
         
         # 发送到Telegram
-        sent = self.send_chart_to_telegram(result["chart_path"], caption)
+        sent = self.send_chart_to_telegram(result["chart_buffer"], caption)
         
         # 更新结果
         result["telegram_sent"] = sent
         
-        # 清理临时文件
-        try:
-            if os.path.exists(result["chart_path"]):
-                os.unlink(result["chart_path"])
-        except OSError:
-            pass
-        
         return result
     
     def generate_and_send_strategy_chart(self, 
@@ -514,7 +761,7 @@ class AIChartReporter:
             操作结果字典
         """
         # 生成图表
-        result = self.generate_strategy_distribution_chart(strategy_results, title)
+        result = self.generate_strategy_distribution_chart(strategy_results, title, save_to_disk=False)
         
         if not result["success"]:
             return result
@@ -530,18 +777,11 @@ class AIChartReporter:
             )
         
         # 发送到Telegram
-        sent = self.send_chart_to_telegram(result["chart_path"], caption)
+        sent = self.send_chart_to_telegram(result["chart_buffer"], caption)
         
         # 更新结果
         result["telegram_sent"] = sent
         
-        # 清理临时文件
-        try:
-            if os.path.exists(result["chart_path"]):
-                os.unlink(result["chart_path"])
-        except OSError:
-            pass
-        
         return result
 
 # 单例模式，方便直接导入使用
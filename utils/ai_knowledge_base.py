@@ -240,6 +240,24 @@ class AIKnowledgeBase:
                 "data": {}
             }
     
+    def query_signals(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        查询知识库中的全部历史信号
+        
+        Args:
+            symbol: 股票代码，为None时返回所有股票的信号
+            
+        Returns:
+            信号列表
+        """
+        signals = []
+        for date_signals in self._signal_cache.values():
+            if symbol is None:
+                signals.extend(date_signals)
+            else:
+                signals.extend(s for s in date_signals if s.get("symbol") == symbol)
+        return signals
+    
     def get_symbol_history(self, symbol: str, days: int = 30) -> List[Dict[str, Any]]:
         """
         获取特定股票的历史信号
@@ -4,6 +4,7 @@ from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
 import pandas as pd
 import numpy as np
+from utils.prompt_compactor import frame_to_csv
 
 class DeepSeekAgent:
     """
@@ -150,7 +151,7 @@ class DeepSeekAnalyst(DeepSeekAgent):
         # Prepare context
         context = self._prepare_market_context(df)
         if include_data:
-            context += f"\n最近行情数据：\n{df.tail(10).to_string()}"
+            context += f"\n最近行情数据：\n{frame_to_csv(df.tail(10))}"
         
         # Prepare prompt
         system_prompt = (
@@ -6,12 +6,27 @@ DeepSeek API 工具模块
 
 import os
 import json
+import random
+import asyncio
 import logging
+import time
 import requests
 from typing import Dict, Any, List, Optional, Union
 
 logger = logging.getLogger(__name__)
 
+# get_deepseek_response 请求失败时返回的提示文本前缀
+_ERROR_PREFIXES = (
+    "无法连接DeepSeek API",
+    "DeepSeek API返回了空响应",
+    "DeepSeek API请求失败",
+    "请求DeepSeek API时出错",
+)
+
+def is_error_response(text: Optional[str]) -> bool:
+    """判断 get_deepseek_response 的返回值是否为请求失败的提示，而不是模型回复"""
+    return not text or text.startswith(_ERROR_PREFIXES)
+
 def get_deepseek_response(
     prompt: str,
     api_key: Optional[str] = None,
@@ -87,6 +102,215 @@ def get_deepseek_response(
         logger.error(f"请求DeepSeek API时出错: {str(e)}")
         return f"请求DeepSeek API时出错: {str(e)}"
 
+# 限流和服务端错误可以重试，4xx 其余状态码重试也不会成功
+_RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+def _retry_delay(attempt: int, initial: float = 1.0, maximum: float = 30.0) -> float:
+    """第 attempt 次重试前的等待秒数：指数退避加最多 1 秒的随机抖动"""
+    return min(maximum, initial * 2 ** attempt + random.random())
+
+async def aget_deepseek_response(
+    prompt: str,
+    api_key: Optional[str] = None,
+    model: Optional[str] = None,
+    max_tokens: int = 500,
+    temperature: float = 0.7,
+    system_prompt: Optional[str] = None,
+    client=None,
+    max_retries: int = 0
+) -> str:
+    """
+    get_deepseek_response 的异步版本，多个请求可以用 asyncio.gather 并发等待
+    
+    Args:
+        prompt: 用户提示
+        api_key: DeepSeek API密钥，如不提供则从环境变量获取
+        model: DeepSeek模型名称，如不提供则使用默认模型
+        max_tokens: 最大生成token数量
+        temperature: 温度参数，影响生成多样性
+        system_prompt: 系统提示，为模型提供上下文
+        client: 共享的 httpx.AsyncClient，不提供时为本次请求单独创建
+        max_retries: 遇到 429/5xx 或网络错误时的重试次数，按指数退避加随机抖动等待
+        
+    Returns:
+        模型生成的文本
+    """
+    import httpx
+    
+    api_key = api_key or os.environ.get("DEEPSEEK_API_KEY")
+    api_url = os.environ.get("DEEPSEEK_API_URL", "https://api.siliconflow.cn/v1")
+    model = model or os.environ.get("DEEPSEEK_MODEL", "deepseek-ai/DeepSeek-V3")
+    
+    if not api_key:
+        logger.error("未提供DeepSeek API密钥")
+        return "无法连接DeepSeek API：未提供API密钥"
+    
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+    
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    
+    data = {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature
+    }
+    
+    if client is None:
+        async with httpx.AsyncClient(timeout=60) as own_client:
+            return await aget_deepseek_response(
+                prompt, api_key, model, max_tokens, temperature, system_prompt,
+                client=own_client, max_retries=max_retries
+            )
+    
+    for attempt in range(max_retries + 1):
+        retrying = attempt < max_retries
+        try:
+            response = await client.post(f"{api_url}/chat/completions", headers=headers, json=data, timeout=60)
+        except httpx.TransportError as e:
+            if retrying:
+                logger.warning(f"请求DeepSeek API时出错，第{attempt + 1}次重试: {str(e)}")
+                await asyncio.sleep(_retry_delay(attempt))
+                continue
+            logger.error(f"请求DeepSeek API时出错: {str(e)}")
+            return f"请求DeepSeek API时出错: {str(e)}"
+        except Exception as e:
+            logger.error(f"请求DeepSeek API时出错: {str(e)}")
+            return f"请求DeepSeek API时出错: {str(e)}"
+        
+        if response.status_code in _RETRY_STATUS_CODES and retrying:
+            logger.warning(f"DeepSeek API返回状态码 {response.status_code}，第{attempt + 1}次重试")
+            await asyncio.sleep(_retry_delay(attempt))
+            continue
+        
+        if response.status_code == 200:
+            try:
+                result = response.json()
+            except ValueError as e:
+                logger.error(f"DeepSeek API响应解析失败: {str(e)}")
+                return f"请求DeepSeek API时出错: {str(e)}"
+            if "choices" in result and len(result["choices"]) > 0:
+                return result["choices"][0]["message"]["content"]
+            else:
+                logger.error(f"DeepSeek API响应格式错误: {result}")
+                return "DeepSeek API返回了空响应"
+        else:
+            logger.error(f"DeepSeek API请求失败: 状态码 {response.status_code}, 响应: {response.text}")
+            return f"DeepSeek API请求失败: {response.text}"
+
+def run_deepseek_batch(
+    requests_by_id: Dict[str, Dict[str, Any]],
+    api_key: Optional[str] = None,
+    model: Optional[str] = None,
+    poll_interval: float = 5.0,
+    timeout: float = 24 * 3600
+) -> Dict[str, str]:
+    """
+    通过 OpenAI 兼容的 Batch API 离线提交一批请求并等待完成
+    适合对延迟不敏感的批量任务（批量价格更低且不受同步接口的限流影响），服务商需支持 /files 与 /batches
+    
+    Args:
+        requests_by_id: {custom_id: 请求参数}，请求参数包括 prompt，以及可选的 system_prompt、max_tokens、temperature
+        api_key: DeepSeek API密钥，如不提供则从环境变量获取
+        model: DeepSeek模型名称，如不提供则使用默认模型
+        poll_interval: 首次轮询间隔（秒），之后指数增长，最长 60 秒
+        timeout: 等待批处理完成的最长时间（秒）
+        
+    Returns:
+        {custom_id: 模型生成的文本}，单条请求失败时不包含该 custom_id
+        
+    Raises:
+        ValueError: 未提供API密钥
+        RuntimeError: 批处理失败、过期或被取消
+        TimeoutError: 超时仍未完成
+    """
+    api_key = api_key or os.environ.get("DEEPSEEK_API_KEY")
+    api_url = os.environ.get("DEEPSEEK_API_URL", "https://api.siliconflow.cn/v1")
+    model = model or os.environ.get("DEEPSEEK_MODEL", "deepseek-ai/DeepSeek-V3")
+    
+    if not api_key:
+        raise ValueError("未提供DeepSeek API密钥")
+    
+    # 每行一个 /chat/completions 请求
+    lines = []
+    for custom_id, params in requests_by_id.items():
+        messages = []
+        if params.get("system_prompt"):
+            messages.append({"role": "system", "content": params["system_prompt"]})
+        messages.append({"role": "user", "content": params["prompt"]})
+        lines.append(json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": model,
+                "messages": messages,
+                "max_tokens": params.get("max_tokens", 500),
+                "temperature": params.get("temperature", 0.7)
+            }
+        }, ensure_ascii=False))
+    
+    with requests.Session() as session:
+        session.headers["Authorization"] = f"Bearer {api_key}"
+        
+        response = session.post(
+            f"{api_url}/files",
+            files={"file": ("batch.jsonl", "\n".join(lines).encode(), "application/jsonl")},
+            data={"purpose": "batch"},
+            timeout=60
+        )
+        response.raise_for_status()
+        input_file_id = response.json()["id"]
+        
+        response = session.post(
+            f"{api_url}/batches",
+            json={
+                "input_file_id": input_file_id,
+                "endpoint": "/v1/chat/completions",
+                "completion_window": "24h"
+            },
+            timeout=60
+        )
+        response.raise_for_status()
+        batch = response.json()
+        
+        # 指数退避轮询批处理状态
+        deadline = time.monotonic() + timeout
+        interval = poll_interval
+        while batch["status"] not in ("completed", "failed", "expired", "cancelled"):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Batch {batch['id']} not finished after {timeout}s")
+            time.sleep(interval)
+            interval = min(interval * 2, 60)
+            response = session.get(f"{api_url}/batches/{batch['id']}", timeout=60)
+            response.raise_for_status()
+            batch = response.json()
+        
+        if batch["status"] != "completed":
+            raise RuntimeError(f"Batch {batch['id']} ended with status {batch['status']}")
+        
+        response = session.get(f"{api_url}/files/{batch['output_file_id']}/content", timeout=60)
+        response.raise_for_status()
+    
+    results = {}
+    for line in response.text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        body = (item.get("response") or {}).get("body") or {}
+        choices = body.get("choices")
+        if item.get("custom_id") in requests_by_id and choices:
+            results[item["custom_id"]] = choices[0]["message"]["content"]
+        else:
+            logger.error(f"批处理请求 {item.get('custom_id')} 失败: {item.get('error')}")
+    return results
+
 def generate_strategy(
     strategy_type: str,
     parameters: Optional[Dict[str, Any]] = None,
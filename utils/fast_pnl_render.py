@@ -0,0 +1,120 @@
+"""
+Pillow renderer drawing the cumulative PnL chart straight onto an image.
+
+Used for Telegram pushes, where a plain line chart is enough and matplotlib's
+figure construction, text layout and PNG encoding dominate the send latency.
+"""
+
+import io
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Colors follow the matplotlib chart: darkgrid background, 30% green/red fills
+BACKGROUND = (234, 234, 242)
+GRID = (255, 255, 255)
+TEXT = (38, 38, 38)
+LINE = (31, 119, 180)
+POSITIVE_FILL = (164, 202, 169)
+NEGATIVE_FILL = (240, 164, 169)
+DRAWDOWN = (214, 39, 40)
+ZERO_LINE = (128, 128, 128)
+
+# CJK-capable fonts first so Chinese titles render, DejaVu as the last TrueType option
+FONT_CANDIDATES = ("msyh.ttc", "simhei.ttf", "NotoSansCJK-Regular.ttc", "wqy-microhei.ttc", "DejaVuSans.ttf")
+
+MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 80, 30, 60, 40
+MAX_MARKERS = 100
+
+
+@lru_cache(maxsize=8)
+def _font(size):
+    """Load the first available font of the given size, Pillow's default font otherwise."""
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def render_pnl_png(cum_pnl, title, stats_text, max_dd_idx=0, high_idx=0, size=(1000, 600)):
+    """
+    Render a cumulative PnL curve with positive/negative fills, the maximum
+    drawdown segment and a stats box.
+
+    Args:
+        cum_pnl: float64 cumulative PnL values, NaN points are skipped
+        title: Chart title
+        stats_text: Multi-line text shown in the lower-left box
+        max_dd_idx: Position of the maximum drawdown trough, 0 for none
+        high_idx: Position of the equity high preceding the trough
+        size: Image size in pixels (width, height)
+
+    Returns:
+        PNG bytes
+    """
+    width, height = size
+    left, right = MARGIN_LEFT, width - MARGIN_RIGHT
+    top, bottom = MARGIN_TOP, height - MARGIN_BOTTOM
+
+    img = Image.new("RGB", size, BACKGROUND)
+    draw = ImageDraw.Draw(img)
+
+    values = np.asarray(cum_pnl, dtype=np.float64)
+    n = len(values)
+    finite = np.isfinite(values)
+    lo = min(float(values[finite].min()), 0.0) if finite.any() else -1.0
+    hi = max(float(values[finite].max()), 0.0) if finite.any() else 1.0
+    if hi == lo:
+        lo, hi = lo - 1.0, hi + 1.0
+
+    # Map data to pixel space, y grows downwards
+    xs = np.linspace(left, right, n) if n > 1 else np.array([(left + right) / 2.0])
+    ys = np.interp(values, [lo, hi], [bottom, top])
+    zero_y = float(np.interp(0.0, [lo, hi], [bottom, top]))
+
+    # Horizontal grid lines with value labels
+    label_font = _font(12)
+    for value in np.linspace(lo, hi, 5):
+        y = float(np.interp(value, [lo, hi], [bottom, top]))
+        draw.line([(left, y), (right, y)], fill=GRID, width=1)
+        draw.text((left - 8, y), f"{value:,.0f}", fill=TEXT, font=label_font, anchor="rm")
+
+    # Positive and negative regions filled down to the zero line
+    points_x, points_y = xs[finite], ys[finite]
+    if len(points_x) > 1:
+        for fill, clipped in ((POSITIVE_FILL, np.minimum(points_y, zero_y)),
+                              (NEGATIVE_FILL, np.maximum(points_y, zero_y))):
+            polygon = list(zip(points_x.tolist(), clipped.tolist()))
+            polygon += [(float(points_x[-1]), zero_y), (float(points_x[0]), zero_y)]
+            draw.polygon(polygon, fill=fill)
+
+    draw.line([(left, zero_y), (right, zero_y)], fill=ZERO_LINE, width=1)
+
+    # Cumulative PnL curve, with markers for short series
+    curve = list(zip(points_x.tolist(), points_y.tolist()))
+    if len(curve) > 1:
+        draw.line(curve, fill=LINE, width=2, joint="curve")
+    if len(curve) <= MAX_MARKERS:
+        for x, y in curve:
+            draw.ellipse([x - 3, y - 3, x + 3, y + 3], fill=LINE)
+
+    # Maximum drawdown from the preceding high to the trough
+    if 0 < max_dd_idx < n and finite[max_dd_idx] and finite[high_idx]:
+        draw.line([(float(xs[high_idx]), float(ys[high_idx])), (float(xs[max_dd_idx]), float(ys[max_dd_idx]))],
+                  fill=DRAWDOWN, width=2)
+
+    draw.text((width / 2, top / 2), title, fill=TEXT, font=_font(20), anchor="mm")
+
+    # Stats box in the lower-left corner
+    stats_font = _font(14)
+    box = draw.multiline_textbbox((left + 12, bottom - 12), stats_text, font=stats_font, anchor="ld", spacing=6)
+    draw.rectangle([box[0] - 8, box[1] - 8, box[2] + 8, box[3] + 8], fill=(0, 0, 0))
+    draw.multiline_text((left + 12, bottom - 12), stats_text, fill=(255, 255, 255), font=stats_font,
+                        anchor="ld", spacing=6)
+
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG", optimize=False)
+    return buffer.getvalue()
@@ -0,0 +1,78 @@
+"""
+Numba kernel computing cumulative PnL and drawdown statistics in one pass.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback decorator used when numba is not installed."""
+        def decorator(func):
+            return func
+        return decorator
+
+
+@njit(cache=True, error_model="numpy")
+def pnl_stats_kernel(pnl):
+    """
+    Walk a PnL array once, accumulating the equity curve and its maximum drawdown.
+
+    Matches the numpy formulation (cumsum skipping NaN, np.maximum.accumulate,
+    drawdown relative to the running max, np.argmin / np.argmax) including its
+    NaN propagation.
+
+    Args:
+        pnl: float64 per-trade PnL values, must not be empty
+
+    Returns:
+        Tuple of (cum, max_dd, max_dd_idx, peak_idx, wins) where max_dd is the
+        most negative relative drawdown, peak_idx the position of the equity
+        high preceding it and wins the number of positive entries
+    """
+    n = pnl.shape[0]
+    cum = np.empty(n)
+    total = 0.0
+    run_max = 0.0
+    run_max_idx = 0
+    max_dd = np.inf
+    max_dd_idx = 0
+    peak_idx = 0
+    dd_is_nan = False
+    wins = 0
+
+    for i in range(n):
+        p = pnl[i]
+        if np.isnan(p):
+            c = np.nan
+        else:
+            total += p
+            c = total
+            if p > 0:
+                wins += 1
+        cum[i] = c
+
+        # NaN sticks in the running max like np.maximum.accumulate
+        if i == 0 or np.isnan(c) or c > run_max:
+            if not np.isnan(run_max) or i == 0:
+                run_max = c
+                run_max_idx = i
+
+        if dd_is_nan:
+            continue
+        dd = (c - run_max) / run_max
+        if np.isnan(dd):
+            dd_is_nan = True
+            max_dd = dd
+            max_dd_idx = i
+            peak_idx = run_max_idx
+        elif dd < max_dd:
+            max_dd = dd
+            max_dd_idx = i
+            peak_idx = run_max_idx
+
+    return cum, max_dd, max_dd_idx, peak_idx, wins
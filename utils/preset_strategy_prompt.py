@@ -1,13 +1,13 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Optional, Sequence
 from dataclasses import dataclass
 from datetime import datetime
-import json
+from .prompt_compactor import compact_json, trim_options_chain
 
 @dataclass
 class StrategyPromptContext:
     """策略提示词上下文"""
     symbol: str
-    timeframes: List[str]
+    timeframes: Sequence[str]
     market_sentiment: str
     volatility: str
     news_summary: str
@@ -363,7 +363,7 @@ ETF对比分析：
     
     def _format_options_chain(self, chain: Dict[str, Any]) -> str:
         """格式化期权链数据"""
-        return json.dumps(chain, indent=2, ensure_ascii=False)
+        return compact_json(trim_options_chain(chain))
     
     def build_prompt(self, context: StrategyPromptContext, scenario: str) -> str:
         """构建策略提示词"""
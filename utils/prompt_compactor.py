@@ -0,0 +1,165 @@
+"""
+Prompt 数据压缩工具
+
+把嵌入 LLM 提示词的结构化数据压缩成更少的 token：紧凑 JSON、浮点数取整、
+期权链只保留成交量最大的行权价，超出 token 预算时按优先级删除字段。
+"""
+
+import json
+from functools import lru_cache
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+KeyPath = Union[str, Tuple[str, ...]]
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """tiktoken 编码器，未安装时返回 None"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str) -> int:
+    """
+    统计文本的 token 数
+    未安装 tiktoken 时按字符数估算（中文约 1 字 1 token，JSON 约 3 字符 1 token）
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    ascii_chars = sum(1 for c in text if c < "\x80")
+    return (len(text) - ascii_chars) + ascii_chars // 3 + 1
+
+def _round_floats(obj: Any, ndigits: int, max_list_len: int) -> Any:
+    """递归地将浮点数取整，并截断过长的列表"""
+    if isinstance(obj, float):
+        return round(obj, ndigits)
+    if isinstance(obj, dict):
+        return {k: _round_floats(v, ndigits, max_list_len) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_round_floats(v, ndigits, max_list_len) for v in obj[:max_list_len]]
+    return obj
+
+def _volume(entry: Any) -> float:
+    """读取期权行的成交量，缺失时视为 0"""
+    if isinstance(entry, dict):
+        try:
+            return float(entry.get("volume") or 0)
+        except (TypeError, ValueError):
+            return 0.0
+    return 0.0
+
+def top_strikes(options: Any, top_k: int = 10) -> Any:
+    """
+    保留成交量最大的 top_k 个行权价，并去掉零成交量的行权价
+    Args:
+        options: {行权价: {...}} 字典、行记录列表或 DataFrame
+        top_k: 保留的行权价数量
+    """
+    if isinstance(options, pd.DataFrame):
+        if "volume" not in options.columns:
+            return options.head(top_k)
+        traded = options[options["volume"].fillna(0) > 0]
+        return traded.nlargest(top_k, "volume")
+    if isinstance(options, dict):
+        traded = [(k, v) for k, v in options.items() if _volume(v) > 0]
+        traded.sort(key=lambda kv: _volume(kv[1]), reverse=True)
+        return dict(traded[:top_k])
+    if isinstance(options, list):
+        traded = [v for v in options if _volume(v) > 0]
+        traded.sort(key=_volume, reverse=True)
+        return traded[:top_k]
+    return options
+
+def trim_options_chain(chain: Dict[str, Any], top_k: int = 10) -> Dict[str, Any]:
+    """对期权链的 calls/puts 做 top_strikes 截取，其余字段保持不变"""
+    return {
+        k: top_strikes(v, top_k) if k in ("calls", "puts") else v
+        for k, v in chain.items()
+    }
+
+def _trim_options_chain(obj: Any, top_k: int) -> Any:
+    """找到数据中所有的 options_chain 字段并截取"""
+    if not isinstance(obj, dict):
+        return obj
+    result = {}
+    for key, value in obj.items():
+        if key == "options_chain" and isinstance(value, dict):
+            value = trim_options_chain(value, top_k)
+        result[key] = _trim_options_chain(value, top_k)
+    return result
+
+def _drop_path(obj: Dict[str, Any], path: KeyPath) -> bool:
+    """按键路径删除字段，返回是否删除成功"""
+    keys = (path,) if isinstance(path, str) else tuple(path)
+    for key in keys[:-1]:
+        obj = obj.get(key) if isinstance(obj, dict) else None
+    if isinstance(obj, dict) and keys[-1] in obj:
+        del obj[keys[-1]]
+        return True
+    return False
+
+def _to_jsonable(obj: Any) -> Any:
+    """DataFrame 转为行记录，其他对象保持不变"""
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient="records")
+    if isinstance(obj, dict):
+        return {k: _to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_jsonable(v) for v in obj]
+    return obj
+
+def compact_json(obj: Any,
+                 max_tokens: Optional[int] = 1500,
+                 ndigits: int = 4,
+                 top_k_strikes: int = 10,
+                 max_list_len: int = 20,
+                 drop_order: Sequence[KeyPath] = ()) -> str:
+    """
+    将数据序列化为紧凑的 JSON 字符串用于 prompt
+    Args:
+        obj: 要序列化的数据
+        max_tokens: token 预算，None 表示不限制
+        ndigits: 浮点数保留的小数位数
+        top_k_strikes: options_chain 中 calls/puts 保留的行权价数量
+        max_list_len: 列表最多保留的元素数量
+        drop_order: 超出预算时依次删除的字段（键或键路径元组），优先级最低的放在前面
+    Returns:
+        JSON 字符串
+    """
+    data = _trim_options_chain(_to_jsonable(obj), top_k_strikes)
+    data = _round_floats(data, ndigits, max_list_len)
+
+    def dump(value: Any) -> str:
+        if orjson is not None:
+            return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+    text = dump(data)
+    if max_tokens is None or not isinstance(data, dict):
+        return text
+
+    for path in drop_order:
+        if count_tokens(text) <= max_tokens:
+            break
+        if _drop_path(data, path):
+            text = dump(data)
+    return text
+
+def frame_to_csv(df: pd.DataFrame, decimals: int = 2, index: bool = True) -> str:
+    """
+    DataFrame 转为 CSV 文本用于 prompt，比 to_string() 的空格对齐少很多 token
+    Args:
+        df: 数据
+        decimals: 数值列保留的小数位数
+        index: 是否保留索引（行情数据的日期索引需要保留）
+    """
+    return df.round(decimals).to_csv(index=index)
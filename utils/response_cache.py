@@ -0,0 +1,53 @@
+"""
+LLM 响应缓存
+"""
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class ResponseCache:
+    """按提示词缓存 LLM 响应，ttl 秒后过期，超出 maxsize 时淘汰最久未使用的条目，线程安全"""
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        """
+        Args:
+            maxsize: 缓存的响应数量上限
+            ttl: 相同提示词的响应缓存时间（秒）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # {提示词摘要: (写入时间, 结果)}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(prompt: str) -> bytes:
+        """按提示词内容生成缓存键"""
+        return hashlib.blake2b(prompt.encode(), digest_size=16).digest()
+    
+    def get(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的响应，过期或不存在时返回 None"""
+        key = self._key(prompt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # 调用方会修改返回的结果，缓存中保留独立的副本
+        return copy.deepcopy(entry[1])
+    
+    def put(self, prompt: str, result: Dict[str, Any]):
+        """缓存响应，超出 maxsize 时淘汰最久未使用的条目"""
+        key = self._key(prompt)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
@@ -2,7 +2,7 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from data.itch_loader import itch_loader
+from data.itch_loader import get_itch_loader
 from utils.telegram_notifier import notifier
 import pandas as pd
 from datetime import datetime
@@ -37,7 +37,7 @@ def generate_test_message() -> bool:
     try:
         # Load sample data
         print("Loading sample ITCH data...")
-        df = itch_loader.load_mbo_data()
+        df = get_itch_loader().load_mbo_data()
         
         # Create market summary
         summary = create_market_summary(df)